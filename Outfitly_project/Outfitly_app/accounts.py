@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Lower
+
+# Email and username are unique case-insensitively through the functional
+# indexes from migration 0011, which these lookups are written to hit.
+
+
+def find_user_by_identifier(identifier):
+    """
+    Resolves an email or a username to a user in one query. An email match
+    wins over another account whose username happens to equal the same text.
+    """
+    identifier = identifier.strip().lower()
+    if not identifier:
+        return None
+    by_email = Q(email_lower=identifier, email__gt='')
+    return (
+        User.objects.alias(email_lower=Lower('email'), username_lower=Lower('username'))
+        .filter(by_email | Q(username_lower=identifier))
+        .order_by(Case(When(by_email, then=Value(0)), default=Value(1), output_field=IntegerField()))
+        .first()
+    )
+
+
+EMAIL_INDEX = 'auth_user_email_lower_uniq'
+
+
+def duplicate_identifier_field(error):
+    """Names the identifier an IntegrityError from creating a user is about"""
+    # psycopg names the violated constraint; other drivers put it on the message's
+    # first line. Anything after that (PostgreSQL's DETAIL) quotes the user's values.
+    diag = getattr(error.__cause__, 'diag', None)
+    constraint = getattr(diag, 'constraint_name', None) or str(error).split('\n', 1)[0]
+    return 'email' if EMAIL_INDEX in constraint else 'username'
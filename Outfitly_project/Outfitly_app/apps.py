@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class OutfitlyAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Outfitly_app'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+        from . import outfit_engine  # noqa: F401  (registers its job tasks)
@@ -0,0 +1,107 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+
+from .authentication import CachedTokenAuthentication
+from .counters import alikes_count, aprofile_counts
+from .models import Post
+from .fieldsets import shaped_list
+from .pagination import InvalidCursor, apaginate_keyset
+from .serializers import PostSerializer
+from .social import toggle_follow as toggle_follow_rows, toggle_like
+from .timeline import afollowing_feed_page, backfill_followee, remove_followee
+
+# Async twins of the feed and social views in views.py, selected by the
+# OUTFITLY_ASYNC_VIEWS setting. Reads go through Django's async ORM; anything
+# that needs a transaction or may touch the ORM lazily (serializers) runs in
+# sync_to_async. Responses match the sync views field for field.
+
+
+def async_api_view(methods):
+    """Method check and token authentication for plain async Django views (DRF views are sync only)"""
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+            authentication = CachedTokenAuthentication()
+            try:
+                result = await sync_to_async(authentication.authenticate)(request)
+            except exceptions.AuthenticationFailed as e:
+                result, detail = None, str(e.detail)
+            else:
+                detail = 'Authentication credentials were not provided.'
+            if result is None:
+                response = JsonResponse({'detail': detail}, status=status.HTTP_401_UNAUTHORIZED)
+                response['WWW-Authenticate'] = authentication.authenticate_header(request)
+                return response
+            request.user, request.auth = result
+            try:
+                return await view(request, *args, **kwargs)
+            except exceptions.ValidationError as e:
+                return JsonResponse(e.detail, status=status.HTTP_400_BAD_REQUEST)
+        return wrapper
+    return decorator
+
+
+async def serialize(serializer):
+    return await sync_to_async(lambda: serializer.data)()
+
+
+# ✅ Public feed (async)
+@async_api_view(['GET'])
+async def get_all_posts(request):
+    serializer = shaped_list(PostSerializer, request, Post.objects.all(), 'created_at')
+    try:
+        serializer.instance, next_cursor = await apaginate_keyset(serializer.instance, request)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+    return JsonResponse({'results': await serialize(serializer), 'next_cursor': next_cursor})
+
+
+# ✅ Following feed (async)
+@async_api_view(['GET'])
+async def get_following_feed(request):
+    serializer = shaped_list(PostSerializer, request, Post.objects.all())
+    try:
+        serializer.instance, next_cursor = await afollowing_feed_page(request.user, request, serializer.instance)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+    return JsonResponse({'results': await serialize(serializer), 'next_cursor': next_cursor})
+
+
+# ✅ Like / unlike (async)
+@async_api_view(['POST'])
+async def toggle_like_post(request, post_id):
+    if not await Post.objects.filter(id=post_id).aexists():
+        return JsonResponse({'error': 'Post not found'}, status=status.HTTP_404_NOT_FOUND)
+    created = await sync_to_async(toggle_like)(request.user.id, post_id)
+    count = await alikes_count(post_id)
+    if not created:
+        return JsonResponse({'message': 'Unliked post', 'likes_count': count}, status=status.HTTP_200_OK)
+    return JsonResponse({'message': 'Liked post', 'likes_count': count}, status=status.HTTP_201_CREATED)
+
+
+# ✅ Follow / unfollow (async)
+@async_api_view(['POST'])
+async def toggle_follow(request, user_id):
+    if not await User.objects.filter(id=user_id).aexists():
+        return JsonResponse({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+    if request.user.id == user_id:
+        return JsonResponse({'error': 'Cannot follow yourself'}, status=status.HTTP_400_BAD_REQUEST)
+
+    created = await sync_to_async(toggle_follow_rows)(request.user.id, user_id)
+    counts = {
+        'followers_count': (await aprofile_counts(user_id))['followers_count'],
+        'following_count': (await aprofile_counts(request.user.id))['following_count'],
+    }
+    if not created:
+        await sync_to_async(remove_followee)(request.user.id, user_id)
+        return JsonResponse({'message': 'Unfollowed user', **counts}, status=status.HTTP_200_OK)
+    await sync_to_async(backfill_followee)(request.user.id, user_id)
+    return JsonResponse({'message': 'Followed user', **counts}, status=status.HTTP_201_CREATED)
@@ -0,0 +1,155 @@
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# Token -> user lookups are kept in a per-process LRU with a TTL. Each entry
+# remembers the token's revocation stamp (held in a shared cache) as it was
+# before the database read; logout, password changes and user edits replace the
+# stamp. The worker handling the change drops its copy at once, and the others
+# compare stamps at most every AUTH_TOKEN_REVOCATION_CHECK_INTERVAL seconds, so
+# a hit between checks costs no query even when the shared cache is a database
+# table. An entry whose stamp has gone (expired or evicted) is treated as a miss,
+# never as a match.
+
+USER_FIELDS = [field.attname for field in User._meta.concrete_fields]
+TOKEN_FIELDS = ['key', 'user_id', 'created']
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+_stats = Counter()
+
+
+class CachedToken:
+    __slots__ = ('token_values', 'user_values', 'stamp', 'expires_at', 'checked_at')
+
+    def __init__(self, token, stamp):
+        self.token_values = tuple(getattr(token, name) for name in TOKEN_FIELDS)
+        self.user_values = tuple(getattr(token.user, name) for name in USER_FIELDS)
+        self.stamp = stamp
+        self.checked_at = time.monotonic()
+        self.expires_at = self.checked_at + settings.AUTH_TOKEN_CACHE_TTL
+
+    def build(self):
+        # Fresh instances per request, so nothing a view caches on request.user leaks into the next one
+        user = User.from_db('default', USER_FIELDS, self.user_values)
+        token = Token.from_db('default', TOKEN_FIELDS, self.token_values)
+        token.user = user
+        return user, token
+
+
+def revocation_cache():
+    return caches[settings.AUTH_TOKEN_REVOCATION_CACHE]
+
+
+def revocation_key(key):
+    return f'auth:token:{key}'
+
+
+def revocation_stamp(key):
+    return revocation_cache().get(revocation_key(key))
+
+
+def stamp_timeout():
+    return settings.AUTH_TOKEN_CACHE_TTL + 60
+
+
+def current_stamp(key):
+    """The token's stamp, created if missing"""
+    stamp = revocation_stamp(key)
+    if stamp is None:
+        # add() keeps a stamp a concurrent revocation has just written
+        revocation_cache().add(revocation_key(key), uuid.uuid4().hex, stamp_timeout())
+        stamp = revocation_stamp(key)
+    return stamp
+
+
+def revoke_tokens(keys):
+    """Invalidates cached lookups of these token keys in every worker once the transaction commits"""
+    keys = list(keys)
+    if not keys:
+        return
+    def revoke():
+        revocation_cache().set_many({revocation_key(key): uuid.uuid4().hex for key in keys}, stamp_timeout())
+        with _lock:
+            for key in keys:
+                _entries.pop(key, None)
+    transaction.on_commit(revoke)
+
+
+def revoke_user_tokens(user_id):
+    revoke_tokens(Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+
+
+def cache_stats():
+    with _lock:
+        stats = {name: _stats[name] for name in ('hits', 'misses', 'expired', 'revoked', 'evicted')}
+        stats['size'] = len(_entries)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else None
+    return stats
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that skips the Token JOIN User query for recently seen tokens"""
+
+    def authenticate_credentials(self, key):
+        now = time.monotonic()
+        with _lock:
+            entry = _entries.get(key)
+        expired = entry is not None and entry.expires_at <= now
+        checked = entry is not None and not expired and (
+            now - entry.checked_at >= settings.AUTH_TOKEN_REVOCATION_CHECK_INTERVAL
+        )
+        stamp = revocation_stamp(key) if checked else None
+        with _lock:
+            if entry is not None:
+                if expired:
+                    outcome = 'expired'
+                elif checked and entry.stamp != stamp:
+                    outcome = 'revoked'
+                else:
+                    outcome = 'hits'
+                    if checked:
+                        entry.checked_at = now
+                    if _entries.get(key) is entry:
+                        _entries.move_to_end(key)
+                _stats[outcome] += 1
+                if outcome != 'hits':
+                    if _entries.get(key) is entry:
+                        del _entries[key]
+                    entry = None
+            if entry is None:
+                _stats['misses'] += 1
+        if entry is not None:
+            return entry.build()
+
+        # Read before the database, so a revocation landing in between replaces it
+        stamp = current_stamp(key)
+        try:
+            token = Token.objects.select_related('user').get(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        entry = CachedToken(token, stamp)
+        if stamp is None:
+            # The stamp vanished again straight away; serve this request uncached
+            return entry.build()
+        with _lock:
+            _entries[key] = entry
+            _entries.move_to_end(key)
+            while len(_entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                _entries.popitem(last=False)
+                _stats['evicted'] += 1
+        return entry.build()
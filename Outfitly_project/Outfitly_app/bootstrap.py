@@ -0,0 +1,81 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from .fieldsets import Shape, planned_queryset
+from .models import Outfit, OutfitPlanner, UserProfile, Wardrobe
+from .serializers import OutfitPlannerSerializer, OutfitSerializer, UserProfileSerializer, UserSerializer, WardrobeSerializer
+from .taxonomy import get_taxonomy
+
+# Everything the app loads on launch, in one normalized payload: each wardrobe
+# item, outfit and plan appears once, and relations between them are ids.
+# The independent queries run concurrently on a small pool, one database
+# connection per worker thread.
+
+# Empty shape: every field, with relations collapsed to ids (see fieldsets.py)
+REFERENCES = Shape()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.BOOTSTRAP_WORKERS, thread_name_prefix='bootstrap')
+        return _executor
+
+
+def _in_worker(task):
+    close_old_connections()
+    try:
+        return task()
+    finally:
+        close_old_connections()
+
+
+def run_concurrently(tasks):
+    """
+    Runs the callables in `tasks` (a dict) on the pool and returns their results
+    under the same keys. Inside a transaction they run inline instead, since
+    other connections cannot see its uncommitted rows.
+    """
+    if connection.in_atomic_block:
+        return {key: task() for key, task in tasks.items()}
+    futures = {key: get_executor().submit(_in_worker, task) for key, task in tasks.items()}
+    return {key: future.result() for key, future in futures.items()}
+
+
+def serialize_list(serializer_class, queryset):
+    serializer = serializer_class(many=True, shape=REFERENCES)
+    serializer.instance = planned_queryset(queryset, serializer)
+    return serializer.data
+
+
+def load_profile(user_id):
+    profile = UserProfile.objects.select_related('user').filter(user_id=user_id).first()
+    return UserProfileSerializer(profile).data if profile else None
+
+
+def build_bootstrap(user):
+    """The profile, wardrobe, outfits, recent and upcoming plans, and taxonomy of `user`"""
+    since = timezone.localdate() - timedelta(days=settings.BOOTSTRAP_PLAN_HISTORY_DAYS)
+    results = run_concurrently({
+        'profile': lambda: load_profile(user.id),
+        'wardrobe': lambda: serialize_list(WardrobeSerializer, Wardrobe.objects.filter(user_id=user.id).order_by('id')),
+        'outfits': lambda: serialize_list(OutfitSerializer, Outfit.objects.filter(user_id=user.id).order_by('id')),
+        'plans': lambda: serialize_list(
+            OutfitPlannerSerializer, OutfitPlanner.objects.filter(user_id=user.id, date__gte=since).order_by('date', 'id')
+        ),
+    })
+    taxonomy = get_taxonomy()
+    return {
+        'user': UserSerializer(user).data,
+        **results,
+        'taxonomy': {'etag': taxonomy.etag, 'categories': taxonomy.tree},
+    }
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+# Caches whose contents every worker process must see (see settings.CACHES)
+PROCESS_LOCAL_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+DATABASE_BACKEND = 'django.core.cache.backends.db.DatabaseCache'
+
+
+def shared_cache_aliases():
+    """Cache alias -> the settings that rely on it being shared"""
+    aliases = {'default': ['CACHES["default"]']}
+    aliases.setdefault(settings.AUTH_TOKEN_REVOCATION_CACHE, []).append('AUTH_TOKEN_REVOCATION_CACHE')
+    if settings.TAXONOMY_CACHE_ALIAS:
+        aliases.setdefault(settings.TAXONOMY_CACHE_ALIAS, []).append('TAXONOMY_CACHE_ALIAS')
+    return aliases
+
+
+@register(Tags.caches)
+def check_shared_caches(app_configs, **kwargs):
+    errors = []
+    for alias, used_by in shared_cache_aliases().items():
+        backend = settings.CACHES.get(alias, {}).get('BACKEND')
+        if backend in PROCESS_LOCAL_BACKENDS or backend is None:
+            errors.append(Error(
+                f"Cache {alias!r} ({backend or 'not configured'}) is not shared between processes.",
+                hint=f"{', '.join(used_by)} need a cache every worker sees, such as Redis or DatabaseCache.",
+                id='Outfitly_app.E001',
+            ))
+    return errors
+
+
+@register(Tags.caches)
+def check_version_cache(app_configs, **kwargs):
+    if settings.CACHES.get('default', {}).get('BACKEND') != DATABASE_BACKEND:
+        return []
+    return [Warning(
+        "The default cache is a database table, so every ETag check reads the data versions with a query.",
+        hint="Set REDIS_URL so conditional GETs can answer 304 without touching the database.",
+        id='Outfitly_app.W001',
+    )]
@@ -0,0 +1,42 @@
+from django.db.models import F
+
+from .models import Post, UserProfile
+
+PROFILE_COUNTERS = ('followers_count', 'following_count', 'posts_count')
+
+
+def _adjust(queryset, field, delta):
+    """
+    Applies `field = field + delta` as a single UPDATE so concurrent writers
+    never overwrite each other. Decrements never go below zero.
+    """
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def adjust_likes(post_id, delta):
+    _adjust(Post.objects.filter(pk=post_id), 'likes_count', delta)
+
+
+def adjust_profile(user_id, field, delta):
+    _adjust(UserProfile.objects.filter(user_id=user_id), field, delta)
+
+
+def likes_count(post_id):
+    return Post.objects.filter(pk=post_id).values_list('likes_count', flat=True).first() or 0
+
+
+def profile_counts(user_id):
+    """Current counter values for a user, zeros if they have no profile"""
+    counts = UserProfile.objects.filter(user_id=user_id).values(*PROFILE_COUNTERS).first()
+    return counts or dict.fromkeys(PROFILE_COUNTERS, 0)
+
+
+async def alikes_count(post_id):
+    return await Post.objects.filter(pk=post_id).values_list('likes_count', flat=True).afirst() or 0
+
+
+async def aprofile_counts(user_id):
+    counts = await UserProfile.objects.filter(user_id=user_id).values(*PROFILE_COUNTERS).afirst()
+    return counts or dict.fromkeys(PROFILE_COUNTERS, 0)
@@ -0,0 +1,108 @@
+import csv
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class Echo:
+    """File-like object that hands each written line straight back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def flatten(value):
+    """Collapses nested serializer output into a single CSV cell"""
+    if isinstance(value, dict):
+        return value.get('name', value.get('id'))
+    if isinstance(value, list):
+        return ';'.join(str(flatten(v)) for v in value)
+    return value
+
+
+def serialized_rows(queryset, serializer_class):
+    """Serializes a queryset one row at a time, fetching it in chunks"""
+    for obj in queryset.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+        yield serializer_class(obj).data
+
+
+def ndjson_stream(rows):
+    for row in rows:
+        yield json.dumps(row, default=str) + '\n'
+
+
+def csv_stream(rows, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([flatten(row.get(column)) for column in columns])
+
+
+def streaming_export(queryset, serializer_class, export_format, filename):
+    """
+    Builds a StreamingHttpResponse so the first rows go out while the rest of
+    the query is still being read, and memory stays flat however many rows exist.
+    """
+    rows = serialized_rows(queryset, serializer_class)
+    if export_format == 'csv':
+        columns = [name for name, field in serializer_class().fields.items() if not field.write_only]
+        content = csv_stream(rows, columns)
+    else:
+        content = ndjson_stream(rows)
+
+    response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
+
+
+def ics_escape(text):
+    return (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def ics_fold(line):
+    """Splits a content line into 75-octet pieces joined by CRLF + space"""
+    pieces, current, size = [], '', 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > 75:
+            pieces.append(current)
+            current, size = ' ', 1
+        current += char
+        size += width
+    pieces.append(current)
+    return '\r\n'.join(pieces)
+
+
+def ics_stream(plans):
+    """One all-day VEVENT per planner row (dicts from .values()); lines end in CRLF as RFC 5545 requires"""
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%SZ')
+    yield 'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Outfitly//Outfit Planner//EN\r\nCALSCALE:GREGORIAN\r\n'
+    for plan in plans.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+        summary = f"Outfit #{plan['outfit_id']} ({plan['outfit__type']})"
+        lines = [
+            'BEGIN:VEVENT',
+            f"UID:outfit-plan-{plan['id']}@outfitly",
+            f'DTSTAMP:{stamp}',
+            f"DTSTART;VALUE=DATE:{plan['date']:%Y%m%d}",
+            f"DTEND;VALUE=DATE:{plan['date'] + timedelta(days=1):%Y%m%d}",
+            f'SUMMARY:{ics_escape(summary)}',
+        ]
+        if plan['outfit__description']:
+            lines.append(f"DESCRIPTION:{ics_escape(plan['outfit__description'])}")
+        lines.append('END:VEVENT')
+        yield ''.join(ics_fold(line) + '\r\n' for line in lines)
+    yield 'END:VCALENDAR\r\n'
+
+
+def streaming_ics(plans, filename):
+    response = StreamingHttpResponse(ics_stream(plans), content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.ics"'
+    return response
@@ -0,0 +1,174 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+# Sparse fieldsets for list endpoints. ?fields= picks the fields to render and
+# ?expand= the relations to embed, both as comma-separated dotted paths:
+#
+#   ?fields=id,caption,user.username,outfit.photo_path_thumb
+#   ?expand=outfit.selected_items
+#
+# A dotted path in ?fields= expands every relation along it. Once either
+# parameter is given, relations that are not expanded render as ids. Without
+# them, responses keep their full nested shape. Either way the queryset is
+# planned from the bound serializer, so fields that are not rendered are never
+# loaded. Paths naming fields the serializer does not have are rejected with a
+# 400 listing them.
+
+
+def path_tree(value):
+    """'a,b.c,b.d' -> {'a': {}, 'b': {'c': {}, 'd': {}}}"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for part in filter(None, (part.strip() for part in path.split('.'))):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def add_implied_expansions(fields, expand):
+    for name, children in fields.items():
+        if children:
+            add_implied_expansions(children, expand.setdefault(name, {}))
+
+
+class Shape:
+    """The requested fields (None for all) and expanded relations of one serializer level"""
+
+    def __init__(self, fields=None, expand=None, path='', invalid=None):
+        self.fields = fields
+        self.expand = expand or {}
+        self.path = path
+        # Shared by every level, so the top-level serializer can report them all
+        self.invalid = {'fields': [], 'expand': []} if invalid is None else invalid
+
+    @classmethod
+    def from_request(cls, request):
+        """Reads ?fields= and ?expand=; None when neither is given"""
+        if 'fields' not in request.GET and 'expand' not in request.GET:
+            return None
+        fields = path_tree(request.GET['fields']) if 'fields' in request.GET else None
+        expand = path_tree(request.GET.get('expand', ''))
+        if fields:
+            add_implied_expansions(fields, expand)
+        return cls(fields or None, expand)
+
+    def child(self, name):
+        return Shape((self.fields or {}).get(name) or None, self.expand.get(name), self.path + name + '.', self.invalid)
+
+    def errors(self):
+        return {
+            parameter: [f'Unknown field: {path}' for path in paths]
+            for parameter, paths in self.invalid.items() if paths
+        }
+
+
+class ShapedSerializerMixin:
+    """Accepts a `shape` argument and trims/collapses its fields to match it"""
+
+    def __init__(self, *args, shape=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if shape is not None:
+            self.apply_shape(shape)
+            if not shape.path and shape.errors():
+                raise serializers.ValidationError(shape.errors())
+
+    def apply_shape(self, shape):
+        fields = self.fields
+        shape.invalid['expand'] += [shape.path + name for name in shape.expand if name not in fields]
+        if shape.fields is not None:
+            for name, children in shape.fields.items():
+                if name not in fields:
+                    shape.invalid['fields'].append(shape.path + name)
+                elif children and not is_relation(fields[name]):
+                    shape.invalid['fields'] += [f'{shape.path}{name}.{child}' for child in children]
+            for name in [name for name in fields if name not in shape.fields]:
+                fields.pop(name)
+        for name, field in list(fields.items()):
+            if getattr(field, 'expandable', False):
+                # Lookup-backed fields (e.g. cached taxonomy) render their stored id unless expanded
+                if name not in shape.expand:
+                    fields[name] = serializers.ReadOnlyField(source=field.source)
+                continue
+            many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if many else field
+            if not isinstance(nested, serializers.BaseSerializer):
+                continue
+            source = field.source if field.source != name else None
+            if name in shape.expand:
+                fields[name] = type(nested)(many=many, read_only=True, source=source, shape=shape.child(name))
+            else:
+                fields[name] = serializers.PrimaryKeyRelatedField(many=many, read_only=True, source=source)
+
+
+def is_relation(field):
+    nested = field.child if isinstance(field, serializers.ListSerializer) else field
+    return getattr(field, 'expandable', False) or isinstance(nested, serializers.BaseSerializer)
+
+
+def rendered_fields(serializer):
+    """(name, field) pairs `serializer` will actually output"""
+    skipped = ()
+    if hasattr(serializer, 'in_list') and serializer.in_list():
+        skipped = getattr(serializer, 'original_image_fields', ())
+    return [
+        (name, field) for name, field in serializer.fields.items()
+        if not field.write_only and name not in skipped
+    ]
+
+
+def plan_lookups(serializer, prefix=''):
+    """(only, select_related, prefetch_related) lookups that load exactly what `serializer` renders"""
+    model = serializer.Meta.model
+    only, select, prefetch = [], [], []
+    for name, field in rendered_fields(serializer):
+        if not field.source_attrs:  # source='*'
+            continue
+        try:
+            model_field = model._meta.get_field(field.source_attrs[0])
+        except FieldDoesNotExist:
+            continue  # computed attribute, nothing to load
+        lookup = prefix + model_field.name
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+
+        if model_field.many_to_many or model_field.one_to_many:
+            related = model_field.related_model.objects.all()
+            if isinstance(nested, serializers.ModelSerializer):
+                related = planned_queryset(related, nested)
+            else:
+                related = related.only('pk')
+            prefetch.append(Prefetch(lookup, queryset=related))
+        elif isinstance(nested, serializers.ModelSerializer):
+            inner_only, inner_select, inner_prefetch = plan_lookups(nested, lookup + '__')
+            # The key and the related pk always load: with no other field of the
+            # relation rendered, deferring them would clash with select_related
+            only += [lookup, lookup + '__' + model_field.related_model._meta.pk.name] + inner_only
+            select += [lookup] + inner_select
+            prefetch += inner_prefetch
+        elif len(field.source_attrs) > 1 and model_field.is_relation:
+            select.append(lookup)
+            only.append(prefix + '__'.join(field.source_attrs))
+        elif model_field.concrete:
+            only.append(lookup)
+    return only, select, prefetch
+
+
+def planned_queryset(queryset, serializer, *also):
+    """
+    Restricts `queryset` to what `serializer` (a list serializer or its child)
+    renders, plus the `also` fields the caller needs itself (e.g. a cursor column).
+    """
+    child = getattr(serializer, 'child', serializer)
+    only, select, prefetch = plan_lookups(child)
+    return queryset.select_related(*select).prefetch_related(*prefetch).only(*only, *also)
+
+
+def shaped_list(serializer_class, request, queryset, *also, **kwargs):
+    """
+    A many=True serializer in the shape requested by `request`, with `queryset`
+    planned for it as its instance. Paginating views slice serializer.instance
+    and assign the page back before reading .data.
+    """
+    serializer = serializer_class(many=True, shape=Shape.from_request(request), **kwargs)
+    serializer.instance = planned_queryset(queryset, serializer, *also)
+    return serializer
@@ -0,0 +1,13 @@
+# Vocabularies shared by the synthetic data generator (generate_data) and the
+# load harness (loadtest), so the rows they create look alike.
+
+COLORS = ['black', 'white', 'navy', 'beige', 'red', 'green', 'blue', 'pink']
+MATERIALS = ['cotton', 'linen', 'wool', 'denim', 'silk', 'polyester']
+SEASONS = ['Winter', 'Spring', 'Summer', 'Autumn', 'All-Season']
+TAGS = ['casual', 'formal', 'work', 'party', 'sport', 'summer', 'vintage', 'minimal']
+TAXONOMY = {
+    'Tops': ['Shirt', 'Blouse', 'T-Shirt'],
+    'Bottoms': ['Jeans', 'Skirt', 'Trousers'],
+    'Shoes': ['Sneakers', 'Boots'],
+    'Outerwear': ['Coat', 'Jacket'],
+}
@@ -0,0 +1,114 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .storage import release_files
+
+logger = logging.getLogger(__name__)
+
+# Sent with the model class and pk once a row's renditions are saved; update() skips post_save
+derivatives_built = Signal()
+
+# Rendition name -> (bounding box, crop to exactly that box)
+RENDITIONS = {
+    'thumb': ((256, 256), True),
+    'medium': ((1024, 1024), False),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_DERIVATIVE_WORKERS, thread_name_prefix='image-derivatives'
+            )
+        return _executor
+
+
+def drain_executor():
+    """Waits for every scheduled job to finish; the next schedule starts a fresh pool"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def cleared_derivatives(field_name):
+    """
+    Values emptying the renditions of `field_name`. Saved together with a new
+    original, so the row never pairs it with the old image's renditions; the
+    file-release signals drop the old renditions when that save commits.
+    """
+    return {f'{field_name}_{rendition}': None for rendition in RENDITIONS}
+
+
+def schedule_derivatives(instance, field_name):
+    """
+    Queues thumb/medium renditions of `instance.<field_name>` once the current
+    transaction commits. The request never waits on image decoding.
+    """
+    source = getattr(instance, field_name)
+    if not source:
+        return
+    model, pk, source_name = type(instance), instance.pk, source.name
+    transaction.on_commit(lambda: get_executor().submit(_run, model, pk, field_name, source_name))
+
+
+def _run(model, pk, field_name, source_name):
+    close_old_connections()
+    try:
+        build_derivatives(model, pk, field_name, source_name)
+    except Exception:
+        logger.exception("Failed to build derivatives for %s %s.%s", model.__name__, pk, field_name)
+    finally:
+        close_old_connections()
+
+
+def render(image, size, crop):
+    """Returns a WebP-encoded rendition of a PIL image"""
+    rendition = ImageOps.fit(image, size) if crop else ImageOps.contain(image, size)
+    buffer = BytesIO()
+    rendition.save(buffer, 'WEBP', quality=settings.IMAGE_DERIVATIVE_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def build_derivatives(model, pk, field_name, source_name):
+    """Builds every rendition of one stored image and records them on the row"""
+    with default_storage.open(source_name) as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image = image.convert('RGB')
+
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    updates = {}
+    previous = model.objects.filter(pk=pk).values(*[f'{field_name}_{rendition}' for rendition in RENDITIONS]).first() or {}
+    for rendition, (size, crop) in RENDITIONS.items():
+        name = f"derivatives/{model._meta.model_name}/{stem}_{rendition}.webp"
+        updates[f'{field_name}_{rendition}'] = default_storage.save(name, ContentFile(render(image, size, crop)))
+
+    # update() skips auto_now; renditions count as a change for delta sync
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        updates['updated_at'] = timezone.now()
+
+    # Skip the write if the source was replaced while we were rendering
+    updated = model.objects.filter(pk=pk, **{field_name: source_name}).update(**updates)
+    if updated:
+        release_files(previous.values(), default_storage)
+        derivatives_built.send(sender=model, pk=pk)
+    else:
+        release_files([updates[f'{field_name}_{rendition}'] for rendition in RENDITIONS], default_storage)
+    return updated
@@ -0,0 +1,150 @@
+import logging
+import os
+import random
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# A job queue kept in the application database, so enqueueing is part of the
+# request's transaction and no broker is needed. Workers (manage.py run_worker)
+# claim queued jobs in priority order with SELECT ... FOR UPDATE SKIP LOCKED
+# where the backend supports it; elsewhere (SQLite) each candidate is claimed
+# with an UPDATE guarded on its status, and a worker that loses the race moves
+# on to the next one. A failed job is retried with exponential backoff until
+# it runs out of attempts. A claim is a lease: a job still running after
+# JOB_LEASE_SECONDS is assumed to have lost its worker and is queued again.
+
+# Task name -> (function, max attempts)
+TASKS = {}
+
+
+class JobFailed(Exception):
+    """Raised by a task for failures that retrying cannot fix"""
+
+
+def task(name, max_attempts=None):
+    """Registers a function as a job task; it is called with the payload as keyword arguments"""
+    def register(fn):
+        TASKS[name] = (fn, max_attempts or settings.JOB_MAX_ATTEMPTS)
+        return fn
+    return register
+
+
+def enqueue(name, payload=None, user=None, priority=0, delay=0):
+    """Queues a job; it runs only if the current transaction commits"""
+    if name not in TASKS:
+        raise ValueError(f'Unknown task {name!r}')
+    return Job.objects.create(
+        task=name, payload=payload or {}, user=user, priority=priority,
+        run_at=timezone.now() + timedelta(seconds=delay), max_attempts=TASKS[name][1],
+    )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def queued(now):
+    return Job.objects.filter(status='queued', run_at__lte=now).order_by('-priority', 'run_at', 'id')
+
+
+def claim_jobs(worker, limit=1):
+    """Marks up to `limit` due jobs as running under `worker` and returns them"""
+    now = timezone.now()
+    claim = {'status': 'running', 'locked_by': worker, 'locked_at': now, 'attempts': F('attempts') + 1}
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(queued(now).select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            Job.objects.filter(id__in=ids).update(**claim)
+    else:
+        ids = []
+        # A few extra candidates, since other workers may claim some of them first
+        for job_id in queued(now).values_list('id', flat=True)[:limit * 4]:
+            if Job.objects.filter(id=job_id, status='queued').update(**claim):
+                ids.append(job_id)
+                if len(ids) == limit:
+                    break
+    return list(Job.objects.filter(id__in=ids).order_by('-priority', 'run_at', 'id'))
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, so jobs that failed together do not retry together"""
+    delay = min(settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def finish(job, **fields):
+    # Guarded on the lease, in case the job was requeued while it ran
+    Job.objects.filter(id=job.id, status='running', locked_by=job.locked_by).update(locked_by='', **fields)
+
+
+def run_job(job):
+    entry = TASKS.get(job.task)
+    if entry is None:
+        finish(job, status='failed', error=f'Unknown task {job.task!r}', finished_at=timezone.now())
+        return
+    try:
+        result = entry[0](**job.payload)
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+        if isinstance(e, JobFailed) or job.attempts >= job.max_attempts:
+            logger.warning("Job %s (%s) failed: %s", job.id, job.task, error)
+            finish(job, status='failed', error=error, finished_at=timezone.now())
+        else:
+            logger.info("Job %s (%s) will retry: %s", job.id, job.task, error)
+            finish(job, status='queued', error=error, run_at=timezone.now() + timedelta(seconds=retry_delay(job.attempts)))
+        return
+    finish(job, status='succeeded', result=result, error='', finished_at=timezone.now())
+
+
+def requeue_expired():
+    """Queues jobs whose worker's lease ran out again, or fails them if they are out of attempts"""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    expired = Job.objects.filter(status='running', locked_at__lt=cutoff)
+    failed = expired.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', locked_by='', error='Worker lease expired', finished_at=timezone.now()
+    )
+    return failed + expired.update(status='queued', locked_by='', run_at=timezone.now())
+
+
+def prune_finished():
+    cutoff = timezone.now() - timedelta(days=settings.JOB_RETENTION_DAYS)
+    return Job.objects.filter(status__in=['succeeded', 'failed'], finished_at__lt=cutoff).delete()[0]
+
+
+def work(stop, poll_interval=None, burst=False):
+    """
+    Claims and runs jobs one at a time until `stop` (a threading or
+    multiprocessing Event) is set. With `burst` it returns once the queue is empty.
+    """
+    poll_interval = settings.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+    worker = worker_name()
+    next_housekeeping = 0
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            if timezone.now().timestamp() >= next_housekeeping:
+                requeue_expired()
+                prune_finished()
+                next_housekeeping = timezone.now().timestamp() + settings.JOB_LEASE_SECONDS / 2
+            jobs = claim_jobs(worker)
+        except Exception:
+            logger.exception("Worker %s could not claim jobs", worker)
+            jobs = []
+        if not jobs:
+            if burst:
+                break
+            stop.wait(poll_interval)
+            continue
+        for job in jobs:
+            run_job(job)
+    close_old_connections()
@@ -0,0 +1,445 @@
+import hashlib
+import html
+import io
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from .fixtures_vocab import COLORS, MATERIALS, SEASONS, TAGS, TAXONOMY
+from .models import Category, SubCategory
+from .suggestions import build_suggestions
+
+# A load harness that drives the API through the full Django stack (middleware,
+# authentication, serializers) with DRF's test client. Virtual users sign up
+# through register_user/login_user and then replay a weighted mix of scenarios,
+# one per named route in Outfitly_app/urls.py. Every request is timed and its
+# SQL queries counted, including those it runs on pools it waits for (the
+# bootstrap endpoint's). Work a request only schedules, such as thumbnails and
+# embeddings, runs after it returns and is not counted against it.
+
+PASSWORD = 'Load!test1'
+
+
+# Threads of pools whose results a request waits for, so their queries are the request's
+REQUEST_POOL_PREFIXES = ('bootstrap',)
+
+
+class QueryCounter:
+    """
+    Counts the queries of the request in flight. It is an execute wrapper on
+    every connection, as pool threads each hold their own, and counts those
+    from the requesting thread and from REQUEST_POOL_PREFIXES pools.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.count = 0
+
+    def install(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __call__(self, execute, sql, params, many, context):
+        thread = threading.current_thread()
+        if thread is self.thread or thread.name.startswith(REQUEST_POOL_PREFIXES):
+            with self.lock:
+                self.count += 1
+        return execute(sql, params, many, context)
+
+    def start(self):
+        self.install(connection)
+        self.thread, self.count = threading.current_thread(), 0
+
+    def stop(self):
+        self.thread = None
+        return self.count
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)  # route name -> [(ms, queries, status)]
+        self.wall_s = defaultdict(float)  # route name -> seconds of the scenarios that issued it
+        self.touched = set()
+
+    def add(self, name, elapsed_ms, queries, status_code):
+        self.samples[name].append((elapsed_ms, queries, status_code))
+        self.touched.add(name)
+
+    def timed(self, scenario, vu):
+        """Runs a scenario, charging its wall-clock time to every route it recorded"""
+        self.touched = set()
+        start = time.perf_counter()
+        scenario(vu)
+        elapsed = time.perf_counter() - start
+        for name in self.touched:
+            self.wall_s[name] += elapsed
+
+
+class VirtualUser:
+    def __init__(self, harness, index):
+        self.harness = harness
+        self.rng = harness.rng
+        self.username = f'vu{index}_{harness.run_id}'
+        self.client = APIClient()
+        self.user_id = None
+        self.item_ids, self.outfit_ids, self.plan_ids = [], [], []
+        self.sync_token = None
+        self.job_ids = []
+
+    def call(self, name, method, path, record=True, **kwargs):
+        """Issues one request, drains streamed bodies, and records latency and query count"""
+        self.harness.queries.start()
+        start = time.perf_counter()
+        response = getattr(self.client, method)(path, **kwargs)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        queries = self.harness.queries.stop()
+        if record:
+            self.harness.recorder.add(name, elapsed_ms, queries, response.status_code)
+        return response
+
+    def authenticate(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+    def sign_up(self, record=True):
+        response = self.call('register_user', 'post', reverse('register_user'), record=record, data={
+            'username': self.username, 'email': f'{self.username}@example.com', 'password': PASSWORD,
+        })
+        self.user_id = response.data['user_id']
+        self.authenticate(response.data['token'])
+
+    def log_in(self, record=True):
+        self.client.credentials()
+        response = self.call('login_user', 'post', reverse('login_user'), record=record, data={
+            'username': f'{self.username}@example.com', 'password': PASSWORD,
+        })
+        self.authenticate(response.data['token'])
+
+    def item_data(self):
+        category = self.rng.choice(self.harness.categories)
+        return {
+            'category_id': category,
+            'subcategory_id': self.rng.choice(self.harness.subcategories[category]),
+            'color': self.rng.choice(COLORS),
+            'size': self.rng.choice(['S', 'M', 'L']),
+            'material': self.rng.choice(MATERIALS),
+            'season': self.rng.choice(SEASONS),
+            'tags': ', '.join(self.rng.sample(TAGS, 2)),
+        }
+
+    def upload_item(self, record=True):
+        data = self.item_data()
+        if self.harness.photos:
+            data['photo_path'] = self.harness.photo()
+        response = self.call('upload_clothing', 'post', reverse('upload_clothing'), record=record, data=data)
+        self.item_ids.append(response.data['id'])
+
+    def resumable_upload(self, record_as=None):
+        """Uploads a photo in two chunks, last one first; records only the step named `record_as`"""
+        body = self.harness.photo().getvalue()
+        half = len(body) // 2
+        response = self.call('create_upload', 'post', reverse('create_upload'), record=record_as == 'create_upload', data={
+            'filename': 'photo.png', 'size': len(body), 'sha256': hashlib.sha256(body).hexdigest(),
+        })
+        path = reverse('upload_session', args=[response.data['id']])
+        for first, last in ((half, len(body) - 1), (0, half - 1)):
+            self.call('upload_session', 'put', path, record=record_as == 'upload_session', data=body[first:last + 1],
+                      content_type='application/octet-stream', HTTP_CONTENT_RANGE=f'bytes {first}-{last}/{len(body)}')
+        self.call('complete_upload', 'post', reverse('complete_upload', args=[response.data['id']]),
+                  record=record_as == 'complete_upload')
+        return response.data['id']
+
+    def create_outfit(self, record=True):
+        items = self.rng.sample(self.item_ids, min(3, len(self.item_ids)))
+        response = self.call('create_outfit', 'post', reverse('create_outfit'), record=record, data={
+            'type': 'User-created', 'selected_item_ids': items, 'description': 'Load test outfit',
+        })
+        self.outfit_ids.append(response.data['id'])
+
+    def plan(self, record=True):
+        day = f'2026-{self.rng.randint(1, 12):02d}-{self.rng.randint(1, 28):02d}'
+        response = self.call('plan_outfit', 'post', reverse('plan_outfit'), record=record, data={
+            'outfit_id': self.rng.choice(self.outfit_ids), 'date': day,
+        })
+        self.plan_ids.append(response.data['id'])
+
+    def post(self, record=True):
+        response = self.call('create_post', 'post', reverse('create_post'), record=record, data={
+            'outfit_id': self.rng.choice(self.outfit_ids), 'caption': 'Load test post',
+        })
+        self.harness.post_ids.append(response.data['id'])
+
+
+def scenario_logout(vu):
+    vu.call('logout_user', 'post', reverse('logout_user'))
+    vu.log_in()
+
+
+def scenario_register(vu):
+    # A throwaway account; the virtual user keeps its own token
+    vu.harness.signups += 1
+    name = f'signup{vu.harness.signups}_{vu.harness.run_id}'
+    vu.call('register_user', 'post', reverse('register_user'), data={
+        'username': name, 'email': f'{name}@example.com', 'password': PASSWORD,
+    })
+
+
+def scenario_update_plan(vu):
+    if not vu.plan_ids:
+        vu.plan(record=False)
+    plan_id = vu.rng.choice(vu.plan_ids)
+    vu.call('update_planned_outfit', 'put', reverse('update_planned_outfit', args=[plan_id]), data={
+        'date': f'2026-{vu.rng.randint(1, 12):02d}-{vu.rng.randint(1, 28):02d}',
+    })
+
+
+def scenario_delete_plan(vu):
+    if not vu.plan_ids:
+        vu.plan(record=False)
+    plan_id = vu.plan_ids.pop(vu.rng.randrange(len(vu.plan_ids)))
+    vu.call('delete_planned_outfit', 'delete', reverse('delete_planned_outfit', args=[plan_id]))
+
+
+def scenario_sync(vu):
+    # Incremental after the first call, like the app between launches
+    response = vu.call('sync_changes', 'get', reverse('sync_changes'), data={'since': vu.sync_token} if vu.sync_token else None)
+    if response.status_code == 200:
+        vu.sync_token = response.data['token']
+
+
+def scenario_job(vu):
+    # Polls a queued outfit generation; no worker runs here, so it stays queued
+    if not vu.job_ids:
+        response = vu.call('ai_generate_outfit', 'post', reverse('ai_generate_outfit'), record=False, HTTP_PREFER='respond-async')
+        vu.job_ids.append(response.data['id'])
+    vu.call('get_job', 'get', reverse('get_job', args=[vu.rng.choice(vu.job_ids)]))
+
+
+def scenario_admin(vu):
+    vu.harness.admin.call('get_auth_cache_stats', 'get', reverse('get_auth_cache_stats'))
+
+
+def get(name, *args, **params):
+    """Scenario for a plain GET; args are callables of the virtual user giving URL arguments"""
+    def scenario(vu):
+        vu.call(name, 'get', reverse(name, args=[arg(vu) for arg in args]), data=params or None)
+    return scenario
+
+
+def random_item(vu):
+    return vu.rng.choice(vu.item_ids)
+
+
+def random_subcategory(vu):
+    return vu.rng.choice(vu.harness.subcategories[vu.rng.choice(vu.harness.categories)])
+
+
+def random_category(vu):
+    return vu.rng.choice(vu.harness.categories)
+
+
+def random_other_user(vu):
+    return vu.rng.choice([other.user_id for other in vu.harness.users if other is not vu])
+
+
+def random_post(vu):
+    return vu.rng.choice(vu.harness.post_ids)
+
+
+# Route name -> (default weight, scenario)
+SCENARIOS = {
+    'register_user': (1, scenario_register),
+    'login_user': (2, lambda vu: vu.log_in()),
+    'logout_user': (1, scenario_logout),
+    'get_auth_cache_stats': (1, scenario_admin),
+    'get_user_profile': (10, get('get_user_profile')),
+    'update_user_profile': (2, lambda vu: vu.call('update_user_profile', 'put', reverse('update_user_profile'), data={
+        'bio': f'Bio {vu.rng.random():.6f}', 'location': 'Amman',
+    })),
+    'get_bootstrap': (6, get('get_bootstrap')),
+    'sync_changes': (8, scenario_sync),
+    'upload_clothing': (4, lambda vu: vu.upload_item()),
+    'create_upload': (1, lambda vu: vu.resumable_upload('create_upload')),
+    'upload_session': (1, lambda vu: vu.resumable_upload('upload_session')),
+    'complete_upload': (1, lambda vu: vu.resumable_upload('complete_upload')),
+    'upload_clothing_batch': (1, lambda vu: vu.call('upload_clothing_batch', 'post', reverse('upload_clothing_batch'), data={
+        'items': [vu.item_data() for _ in range(5)],
+    }, format='json')),
+    'get_wardrobe': (15, get('get_wardrobe')),
+    'export_wardrobe': (1, get('export_wardrobe', output='csv')),
+    'search_wardrobe': (6, lambda vu: vu.call('search_wardrobe', 'get', reverse('search_wardrobe'), data={
+        'color': vu.rng.choice(COLORS), 'tags': vu.rng.choice(TAGS),
+    })),
+    'update_clothing': (3, lambda vu: vu.call('update_clothing', 'put', reverse('update_clothing', args=[random_item(vu)]), data={
+        'color': vu.rng.choice(COLORS),
+    })),
+    'get_similar_items': (3, get('get_similar_items', random_item)),
+    'get_wardrobe_by_subcategory': (3, get('get_wardrobe_by_subcategory', random_subcategory)),
+    'get_category_tree': (5, get('get_category_tree')),
+    'get_subcategories_by_category': (2, get('get_subcategories_by_category', random_category)),
+    'create_outfit': (2, lambda vu: vu.create_outfit()),
+    'get_outfits': (10, get('get_outfits')),
+    'export_outfits': (1, get('export_outfits')),
+    'ai_generate_outfit': (3, lambda vu: vu.call('ai_generate_outfit', 'post', reverse('ai_generate_outfit'), data={
+        'season': vu.rng.choice(SEASONS[:4]),
+    })),
+    'get_job': (2, scenario_job),
+    'get_planned_outfits': (8, lambda vu: vu.call('get_planned_outfits', 'get', reverse('get_planned_outfits'), data={
+        'month': f'2026-{vu.rng.randint(1, 12):02d}',
+    })),
+    'plan_outfit': (2, lambda vu: vu.plan()),
+    'export_planned_outfits_ics': (1, get('export_planned_outfits_ics')),
+    'update_planned_outfit': (1, scenario_update_plan),
+    'delete_planned_outfit': (1, scenario_delete_plan),
+    'create_post': (2, lambda vu: vu.post()),
+    'get_all_posts': (15, get('get_all_posts')),
+    'toggle_like_post': (6, lambda vu: vu.call('toggle_like_post', 'post', reverse('toggle_like_post', args=[random_post(vu)]))),
+    'toggle_follow': (2, lambda vu: vu.call('toggle_follow', 'post', reverse('toggle_follow', args=[random_other_user(vu)]))),
+    'get_following_feed': (12, get('get_following_feed')),
+    'get_follow_suggestions': (4, get('get_follow_suggestions')),
+}
+
+
+def api_route_names():
+    from .urls import urlpatterns
+    return {pattern.name for pattern in urlpatterns if pattern.name}
+
+
+def parse_mix(text):
+    """'get_wardrobe=10,get_all_posts=5' -> weights overriding SCENARIOS' defaults; 0 disables a route"""
+    weights = {name: weight for name, (weight, _) in SCENARIOS.items()}
+    for part in filter(None, (text or '').split(',')):
+        name, _, weight = part.partition('=')
+        if name.strip() not in SCENARIOS:
+            raise ValueError(f'Unknown route {name.strip()!r}')
+        weights[name.strip()] = float(weight)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+class Harness:
+    def __init__(self, users=10, items_per_user=8, photos=True, seed=42):
+        self.rng = random.Random(seed)
+        self.run_id = f'{seed}'
+        self.photos = photos
+        self.recorder = Recorder()
+        self.queries = QueryCounter()
+        # Pool threads reconnect per task (bootstrap._in_worker), so new connections get the counter too
+        connection_created.connect(self.queries.install, weak=False)
+        self.post_ids = []
+        self.signups = 0
+        self.users = [VirtualUser(self, i) for i in range(users)]
+        self.items_per_user = items_per_user
+
+    def photo(self):
+        buffer = io.BytesIO()
+        color = tuple(self.rng.randrange(256) for _ in range(3))
+        Image.new('RGB', (64, 64), color).save(buffer, 'PNG')
+        buffer.seek(0)
+        buffer.name = f'item{self.rng.randrange(10 ** 9)}.png'
+        return buffer
+
+    def seed_taxonomy(self):
+        self.categories, self.subcategories = [], {}
+        for name, subs in TAXONOMY.items():
+            category, _ = Category.objects.get_or_create(name=name)
+            self.categories.append(category.id)
+            self.subcategories[category.id] = [
+                SubCategory.objects.get_or_create(category=category, name=sub)[0].id for sub in subs
+            ]
+
+    def set_up(self):
+        """Signs every virtual user up and gives them a wardrobe, outfits, plans, posts and follows"""
+        self.seed_taxonomy()
+        for vu in self.users:
+            vu.sign_up(record=False)
+            vu.log_in(record=False)
+            for _ in range(self.items_per_user):
+                vu.upload_item(record=False)
+            for _ in range(2):
+                vu.create_outfit(record=False)
+                vu.plan(record=False)
+                vu.post(record=False)
+        for vu in self.users:
+            for other in self.rng.sample(self.users, min(5, len(self.users))):
+                if other is not vu:
+                    vu.call('toggle_follow', 'post', reverse('toggle_follow', args=[other.user_id]), record=False)
+        build_suggestions(incremental=True)
+        # save() rather than update() so the signal handlers drop the cached token lookup
+        self.admin = self.users[0]
+        admin = User.objects.get(id=self.admin.user_id)
+        admin.is_staff = True
+        admin.save()
+
+    def run(self, requests, mix):
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        start = time.perf_counter()
+        for i in range(requests):
+            vu = self.users[i % len(self.users)]
+            self.recorder.timed(SCENARIOS[self.rng.choices(names, weights)[0]][1], vu)
+        return time.perf_counter() - start
+
+    def close(self):
+        connection_created.disconnect(self.queries.install)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder):
+    endpoints = {}
+    for name, samples in sorted(recorder.samples.items()):
+        latencies = sorted(ms for ms, _, _ in samples)
+        queries = [count for _, count, _ in samples]
+        statuses = Counter(str(code) for _, _, code in samples)
+        endpoints[name] = {
+            'requests': len(samples),
+            'errors': sum(1 for _, _, code in samples if code >= 400),
+            'statuses': dict(sorted(statuses.items())),
+            # Per second of wall clock spent in the scenarios issuing this route, their unrecorded requests included
+            'throughput_rps': round(len(samples) / recorder.wall_s[name], 2) if recorder.wall_s[name] else None,
+            'mean_ms': round(sum(latencies) / len(latencies), 3),
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+        }
+    return endpoints
+
+
+COLUMNS = ['requests', 'errors', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_mean', 'queries_max']
+
+
+def render_html(report):
+    meta = ''.join(f'<li><b>{html.escape(str(k))}</b>: {html.escape(str(v))}</li>' for k, v in report['meta'].items())
+    header = ''.join(f'<th>{column}</th>' for column in ['endpoint'] + COLUMNS)
+    rows = ''.join(
+        '<tr><td>{}</td>{}</tr>'.format(
+            html.escape(name), ''.join(f'<td>{stats[column]}</td>' for column in COLUMNS)
+        )
+        for name, stats in report['endpoints'].items()
+    )
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Outfitly load test</title>'
+        '<style>body{font-family:sans-serif}table{border-collapse:collapse}'
+        'td,th{border:1px solid #ccc;padding:4px 8px;text-align:right}td:first-child{text-align:left}</style>'
+        f'</head><body><h1>Outfitly load test</h1><ul>{meta}</ul>'
+        f'<table><thead><tr>{header}</tr></thead><tbody>{rows}</tbody></table></body></html>'
+    )
@@ -0,0 +1,132 @@
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+from asgiref.sync import ThreadSensitiveContext
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncRequestFactory, RequestFactory
+from rest_framework.authtoken.models import Token
+
+from Outfitly_app import async_views, views
+from Outfitly_app.models import Follow, Outfit, Post, UserProfile
+
+ENDPOINTS = {
+    'posts': ('get_all_posts', '/api/feed/posts/'),
+    'following': ('get_following_feed', '/api/feed/following/'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the sync and async feed views under concurrent load on a throwaway test database. "
+        "--db-latency-ms adds a per-query delay to stand in for a database across the network."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='posts')
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--concurrency', type=int, default=50, help="In-flight requests on the async path")
+        parser.add_argument('--threads', type=int, default=8, help="Worker threads on the sync path")
+        parser.add_argument('--db-latency-ms', type=float, default=2.0)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            keys = self.seed(options)
+            latency = options['db_latency_ms'] / 1000
+
+            def slow_execute(execute, sql, params, many, context):
+                time.sleep(latency)
+                return execute(sql, params, many, context)
+
+            def install(sender, connection, **kwargs):
+                connection.execute_wrappers.append(slow_execute)
+
+            if latency:
+                connection_created.connect(install)
+                install(None, connection)  # already open (an in-memory SQLite test DB is never reopened)
+            try:
+                view_name, path = ENDPOINTS[options['endpoint']]
+                self.stdout.write(f"{'path':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+                self.report('sync', *self.run_sync(getattr(views, view_name), path, keys, options))
+                self.report('async', *asyncio.run(self.run_async(getattr(async_views, view_name), path, keys, options)))
+            finally:
+                connection_created.disconnect(install)
+                if slow_execute in connection.execute_wrappers:
+                    connection.execute_wrappers.remove(slow_execute)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed(self, options):
+        rng = random.Random(options['seed'])
+        users = User.objects.bulk_create(User(username=f'bench_{i}', email=f'bench_{i}@example.com') for i in range(options['users']))
+        UserProfile.objects.bulk_create(UserProfile(user=user) for user in users)
+        Follow.objects.bulk_create(
+            Follow(follower=user, following=followee)
+            for user in users for followee in rng.sample(users, min(10, len(users))) if followee != user
+        )
+        outfits = Outfit.objects.bulk_create(Outfit(user=user, type='User-created') for user in users)
+        Post.objects.bulk_create(
+            Post(user_id=outfit.user_id, outfit=outfit, caption=f'post {i}')
+            for i, outfit in enumerate(rng.choices(outfits, k=options['posts']))
+        )
+        call_command('rebuild_timelines', stdout=StringIO())
+        return [Token.objects.create(user=user).key for user in users]
+
+    def run_sync(self, view, path, keys, options):
+        factory = RequestFactory()
+
+        def one(key):
+            start = time.perf_counter()
+            response = view(factory.get(path, HTTP_AUTHORIZATION=f'Token {key}'))
+            response.render()
+            assert response.status_code == 200, response.content
+            return (time.perf_counter() - start) * 1000
+
+        def worker(batch):
+            try:
+                return [one(key) for key in batch]
+            finally:
+                connections.close_all()
+
+        batches = [keys_for(keys, options['requests'])[i::options['threads']] for i in range(options['threads'])]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(options['threads']) as pool:
+            samples = [sample for batch in pool.map(worker, batches) for sample in batch]
+        return samples, time.perf_counter() - start
+
+    async def run_async(self, view, path, keys, options):
+        factory = AsyncRequestFactory()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def one(key):
+            async with semaphore:
+                # ASGIHandler gives every request its own context like this
+                async with ThreadSensitiveContext():
+                    start = time.perf_counter()
+                    response = await view(factory.get(path, headers={'Authorization': f'Token {key}'}))
+                    assert response.status_code == 200, response.content
+                    return (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        samples = await asyncio.gather(*(one(key) for key in keys_for(keys, options['requests'])))
+        return samples, time.perf_counter() - start
+
+    def report(self, label, samples, elapsed):
+        p95 = statistics.quantiles(samples, n=20)[-1]
+        self.stdout.write(f"{label:>6} {len(samples) / elapsed:>8.1f} {statistics.median(samples):>8.1f} {p95:>8.1f}")
+
+
+def keys_for(keys, count):
+    return [keys[i % len(keys)] for i in range(count)]
@@ -0,0 +1,68 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from Outfitly_app.accounts import find_user_by_identifier
+
+
+def legacy_lookup(identifier):
+    """The resolution login_user used before migration 0011: two sequential iexact queries"""
+    identifier = identifier.strip()
+    try:
+        return User.objects.get(email__iexact=identifier)
+    except User.DoesNotExist:
+        try:
+            return User.objects.get(username__iexact=identifier)
+        except User.DoesNotExist:
+            return None
+
+
+class Command(BaseCommand):
+    help = "Compares login identifier resolution before and after the lowercase indexes (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200_000)
+        parser.add_argument('--lookups', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        n = options['users']
+        with transaction.atomic():
+            # Password hashing is not what is measured, so every synthetic account shares one hash
+            password = make_password('Bench!123')
+            start = time.perf_counter()
+            User.objects.bulk_create(
+                (User(username=f'bench_user_{i}', email=f'Bench.User.{i}@example.com', password=password) for i in range(n)),
+                batch_size=5000,
+            )
+            self.stdout.write(f"Inserted {n} users in {time.perf_counter() - start:.1f} s")
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE auth_user')
+
+            picks = [rng.randrange(n) for _ in range(options['lookups'])]
+            workloads = [
+                ('email', [f'bench.user.{i}@EXAMPLE.com' for i in picks]),
+                ('username', [f'BENCH_USER_{i}' for i in picks]),
+                ('unknown', [f'nobody_{i}' for i in picks]),
+            ]
+            self.stdout.write(f"{'identifier':>10} {'before p50 ms':>14} {'after p50 ms':>13} {'speedup':>8}")
+            for label, identifiers in workloads:
+                before = self.measure(legacy_lookup, identifiers)
+                after = self.measure(find_user_by_identifier, identifiers)
+                self.stdout.write(f"{label:>10} {before:>14.3f} {after:>13.3f} {before / after:>7.1f}x")
+            transaction.set_rollback(True)
+
+    def measure(self, lookup, identifiers):
+        samples = []
+        for identifier in identifiers:
+            start = time.perf_counter()
+            lookup(identifier)
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
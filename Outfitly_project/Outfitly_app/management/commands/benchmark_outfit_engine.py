@@ -0,0 +1,58 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from Outfitly_app import outfit_engine
+
+COLORS = ['black', 'white', 'navy', 'beige', 'red', 'green', 'blue', 'pink', 'yellow', 'purple', 'olive', 'grey']
+MATERIALS = ['cotton', 'linen', 'wool', 'denim', 'silk', 'polyester', 'leather']
+SEASONS = outfit_engine.SEASONS + ['All-Season']
+SUBCATEGORIES = ['Shirt', 'Blouse', 'Tank Top', 'Jeans', 'Skirt', 'Shorts', 'Abaya', 'Sneakers', 'Hijab', 'Coat']
+TAGS = ['casual', 'formal', 'work', 'party', 'sport', 'summer', 'layering', 'vintage', 'minimal', 'sleeveless']
+
+
+def synthetic_rows(size, categories, rng):
+    return [
+        {
+            'id': i + 1,
+            'category_id': rng.randint(1, categories),
+            'subcategory__name': rng.choice(SUBCATEGORIES),
+            'color': rng.choice(COLORS),
+            'season': rng.choice(SEASONS),
+            'material': rng.choice(MATERIALS),
+            'tags': ', '.join(rng.sample(TAGS, rng.randint(0, 3))),
+        }
+        for i in range(size)
+    ]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+
+class Command(BaseCommand):
+    help = "Measures outfit engine latency on synthetic wardrobes (no database access)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 5000])
+        parser.add_argument('--categories', type=int, default=5, help="Category slots per outfit")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        repeat = options['repeat']
+        self.stdout.write(f"{'items':>8} {'features ms':>12} {'generate ms':>12} {'modest ms':>10} {'best score':>11}")
+        for size in options['sizes']:
+            rows = synthetic_rows(size, options['categories'], rng)
+            features, build_ms = timed(lambda: outfit_engine.build_features(rows), repeat)
+            outfits, generate_ms = timed(lambda: outfit_engine.generate_outfits(features, season='Summer'), repeat)
+            _, modest_ms = timed(lambda: outfit_engine.generate_outfits(features, modest=True), repeat)
+            self.stdout.write(f"{size:>8} {build_ms:>12.2f} {generate_ms:>12.2f} {modest_ms:>10.2f} {outfits[0][1]:>11.3f}")
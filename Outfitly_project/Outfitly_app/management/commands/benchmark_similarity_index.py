@@ -0,0 +1,69 @@
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from Outfitly_app.similarity import DIMENSIONS, META_COLUMNS, SimilarityIndex
+
+
+class Command(BaseCommand):
+    help = "Measures similarity search latency on a synthetic memory-mapped index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1_000_000)
+        parser.add_argument('--owners', type=int, default=20_000)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--k', type=int, default=10)
+        parser.add_argument('--clusters', type=int, default=settings.SIMILARITY_CLUSTERS, help="0 benchmarks brute force")
+        parser.add_argument('--nprobe', type=int, default=settings.SIMILARITY_NPROBE)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        n = options['items']
+
+        with tempfile.TemporaryDirectory() as directory:
+            index = SimilarityIndex(directory, nprobe=options['nprobe'])
+            vectors = rng.random((n, DIMENSIONS), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            meta = np.empty((n, META_COLUMNS), dtype=np.int64)
+            meta[:, 0] = np.arange(1, n + 1)
+            meta[:, 1] = rng.integers(1, options['owners'] + 1, n)
+            meta[:, 2] = rng.random(n) < 0.3
+            meta[:, 3] = -1
+            vectors.tofile(index.vectors_path)
+            meta.tofile(index.meta_path)
+            del meta
+
+            if options['clusters']:
+                start = time.perf_counter()
+                clusters = index.train(options['clusters'], seed=options['seed'])
+                self.stdout.write(f"Trained {clusters} centroids in {time.perf_counter() - start:.1f} s")
+
+            # Query with perturbed copies of stored vectors, like "more like this item" requests do
+            queries = vectors[rng.choice(n, options['queries'])] + rng.normal(0, 0.02, (options['queries'], DIMENSIONS))
+            queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+            exact = [set(np.argpartition(-(vectors @ q), options['k'])[:options['k']] + 1) for q in queries]
+            del vectors
+            index.search(queries[0], options['k'])  # map the files and warm the page cache
+
+            for label, kwargs in [
+                ('all items', {}),
+                ('public only', {'public_only': True}),
+                ('one wardrobe', {'owner_id': 1}),
+            ]:
+                samples, hits = [], 0
+                for query, truth in zip(queries, exact):
+                    start = time.perf_counter()
+                    found = index.search(query, options['k'], **kwargs)
+                    samples.append((time.perf_counter() - start) * 1000)
+                    hits += len(truth & {item_id for item_id, _ in found})
+                samples.sort()
+                recall = f", recall@{options['k']} {hits / (len(queries) * options['k']):.2f}" if not kwargs else ''
+                self.stdout.write(
+                    f"{label:>14}: p50 {statistics.median(samples):.2f} ms, "
+                    f"p95 {samples[int(len(samples) * 0.95) - 1]:.2f} ms over {n:,} items{recall}"
+                )
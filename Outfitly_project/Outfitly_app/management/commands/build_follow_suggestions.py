@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Outfitly_app.suggestions import build_suggestions
+
+
+class Command(BaseCommand):
+    help = "Computes follow suggestions from the Follow and Like graphs (all users, or only changed neighbourhoods)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help="Only users near those whose follows or likes changed since the last build",
+        )
+        parser.add_argument('--top-k', type=int, default=None, help="Suggestions kept per user (default FOLLOW_SUGGESTIONS_TOP_K)")
+        parser.add_argument(
+            '--batch-pairs', type=int, default=None,
+            help="Candidate pairs scored per batch (default FOLLOW_SUGGESTIONS_BATCH_PAIRS)",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        users, written = build_suggestions(options['incremental'], options['top_k'], options['batch_pairs'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} suggestions for {users} users in {time.perf_counter() - start:.1f}s"
+        ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from Outfitly_app.images import build_derivatives
+from Outfitly_app.models import Outfit, Post, UserProfile, Wardrobe
+
+SOURCES = [
+    (Wardrobe, 'photo_path'),
+    (Outfit, 'photo_path'),
+    (Post, 'image'),
+    (UserProfile, 'profile_picture'),
+]
+
+
+class Command(BaseCommand):
+    help = "Builds missing thumb/medium renditions for images uploaded before the derivative pipeline existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Rebuild renditions that already exist")
+
+    def handle(self, *args, **options):
+        for model, field in SOURCES:
+            rows = model.objects.exclude(Q(**{f'{field}__isnull': True}) | Q(**{field: ''}))
+            if not options['force']:
+                rows = rows.filter(Q(**{f'{field}_thumb__isnull': True}) | Q(**{f'{field}_thumb': ''}))
+
+            built = failed = 0
+            for pk, source_name in rows.values_list('pk', field).iterator(chunk_size=500):
+                try:
+                    build_derivatives(model, pk, field, source_name)
+                    built += 1
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"{model.__name__} {pk}: {e}")
+            self.stdout.write(f"{model.__name__}.{field}: built {built}, failed {failed}")
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from Outfitly_app.models import Wardrobe
+from Outfitly_app.similarity import get_index, index_item
+
+
+class Command(BaseCommand):
+    help = "Embeds wardrobe photos into the similarity index (all items, or only those not indexed yet)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing-only', action='store_true', help="Skip items that already have a vector")
+        parser.add_argument('--train', action='store_true', help="Retrain the coarse centroids afterwards")
+
+    def handle(self, *args, **options):
+        index = get_index()
+        items = Wardrobe.objects.exclude(Q(photo_path__isnull=True) | Q(photo_path='')).order_by('id')
+
+        indexed = skipped = failed = 0
+        for item_id, owner_id, photo_name in items.values_list('id', 'user_id', 'photo_path').iterator(chunk_size=1000):
+            if options['missing_only'] and index.vector_for(item_id) is not None:
+                skipped += 1
+                continue
+            try:
+                index_item(item_id, owner_id, photo_name)
+                indexed += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Wardrobe {item_id}: {e}")
+
+        self.stdout.write(f"Indexed {indexed}, skipped {skipped}, failed {failed}")
+
+        if options['train']:
+            clusters = index.train(settings.SIMILARITY_CLUSTERS)
+            self.stdout.write(f"Trained {clusters} centroids")
+        self.stdout.write(self.style.SUCCESS("Done"))
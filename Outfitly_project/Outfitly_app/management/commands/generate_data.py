@@ -0,0 +1,411 @@
+import io
+import multiprocessing
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from PIL import Image
+
+from Outfitly_app.bulk import insert_rows
+from Outfitly_app.fixtures_vocab import COLORS, MATERIALS, SEASONS, TAGS, TAXONOMY
+from Outfitly_app.images import RENDITIONS, render
+from Outfitly_app.models import (
+    Category, Follow, Like, Outfit, OutfitPlanner, Post, SubCategory, Tag, UserProfile, Wardrobe, WardrobeTag,
+)
+
+# Rows are generated in NumPy one chunk of users at a time. Every per-user
+# count is drawn up front from the seed, so ids and foreign keys can be
+# computed inside any chunk without coordination, and each chunk draws from its
+# own (seed, stage, chunk) generator: a given --seed and --chunk-users produce
+# the same rows for any number of --workers.
+
+SIZES = ['XS', 'S', 'M', 'L', 'XL']
+STAGES = ['users', 'profiles', 'wardrobe', 'outfits', 'outfit_items', 'posts', 'likes', 'follows', 'planner']
+
+PLAN = None  # set by the parent before workers fork
+
+
+def rng_for(stage, start):
+    return np.random.default_rng([PLAN['seed'], STAGES.index(stage), start])
+
+
+def owners(counts, start, end):
+    """User index of every row owned by users [start, end), given per-user row counts"""
+    return np.repeat(np.arange(start, end), counts[start:end])
+
+
+def timestamps(rng, size, days):
+    """Aware datetimes within the last `days` days, formatted for the active backend"""
+    if not size:
+        # np.char's string functions fail on empty arrays (e.g. --plans-per-user 0)
+        return []
+    seconds = rng.integers(0, days * 86400, size)
+    values = PLAN['now'] - seconds.astype('timedelta64[s]')
+    text = np.datetime_as_string(values, unit='us')
+    if PLAN['vendor'] == 'sqlite':
+        return np.char.replace(text, 'T', ' ').tolist()
+    return (np.char.add(text, '+00:00')).tolist()
+
+
+# --- row generators: each returns (model or table, columns, list of column lists) ---
+
+def gen_users(start, end):
+    index = np.arange(start, end)
+    prefix = PLAN['prefix']
+    joined = timestamps(rng_for('users', start), end - start, 720)
+    return User, ['id', 'username', 'email', 'password', 'is_superuser', 'is_staff', 'is_active',
+                  'first_name', 'last_name', 'date_joined'], [
+        (PLAN['user_base'] + index).tolist(),
+        [f'{prefix}_{i}' for i in index],
+        [f'{prefix}_{i}@example.com' for i in index],
+        [PLAN['password']] * len(index),
+        [False] * len(index), [False] * len(index), [True] * len(index),
+        [''] * len(index), [''] * len(index),
+        joined,
+    ]
+
+
+def gen_profiles(start, end):
+    rng = rng_for('profiles', start)
+    n = end - start
+    return UserProfile, ['user_id', 'gender', 'modesty_preference', 'followers_count', 'following_count', 'posts_count'], [
+        (PLAN['user_base'] + np.arange(start, end)).tolist(),
+        np.where(rng.random(n) < 0.6, 'female', 'male').tolist(),
+        np.where(rng.random(n) < 0.3, 'Hijab-Friendly', 'None').tolist(),
+        [0] * n, [0] * n, [0] * n,
+    ]
+
+
+def gen_wardrobe(start, end):
+    rng = rng_for('wardrobe', start)
+    user = owners(PLAN['items'], start, end)
+    n = len(user)
+    ids = PLAN['item_base'] + PLAN['item_offsets'][start] + np.arange(n)
+    categories, subcategories = PLAN['categories'], PLAN['subcategories']
+    cat_pos = rng.integers(0, len(categories), n)
+    sub_pick = rng.random(n)
+    subcategory = [
+        subs[int(pick * len(subs))] if subs else None
+        for subs, pick in zip((subcategories[categories[c]] for c in cat_pos), sub_pick)
+    ]
+
+    # 0-3 tags per item, kept consistent between the text column and the WardrobeTag rows
+    tag_names, tag_ids = PLAN['tag_names'], PLAN['tag_ids']
+    tag_mask = rng.random((n, len(tag_names))) < 1.5 / len(tag_names)
+    rows_with, cols_with = np.nonzero(tag_mask)
+    text = [None] * n
+    for row in np.flatnonzero(tag_mask.any(axis=1)):
+        text[row] = ', '.join(tag_names[c] for c in np.flatnonzero(tag_mask[row]))
+    links = [
+        ids[rows_with].tolist(),
+        [tag_ids[c] for c in cols_with],
+        (PLAN['user_base'] + user[rows_with]).tolist(),
+    ]
+    PLAN['pending_links'] = links
+
+    photos = [None] * n
+    thumbs = [None] * n
+    mediums = [None] * n
+    if PLAN['placeholders']:
+        pick = rng.integers(0, len(PLAN['placeholders']), n)
+        photos, thumbs, mediums = (
+            [PLAN['placeholders'][p][k] for p in pick] for k in range(3)
+        )
+    return Wardrobe, ['id', 'user_id', 'category_id', 'subcategory_id', 'color', 'size', 'material', 'season',
+                      'tags', 'photo_path', 'photo_path_thumb', 'photo_path_medium', 'updated_at'], [
+        ids.tolist(),
+        (PLAN['user_base'] + user).tolist(),
+        [categories[c] for c in cat_pos],
+        subcategory,
+        np.array(COLORS)[rng.integers(0, len(COLORS), n)].tolist(),
+        np.array(SIZES)[rng.integers(0, len(SIZES), n)].tolist(),
+        np.array(MATERIALS)[rng.integers(0, len(MATERIALS), n)].tolist(),
+        np.array(SEASONS)[rng.integers(0, len(SEASONS), n)].tolist(),
+        text, photos, thumbs, mediums,
+        timestamps(rng, n, 365),
+    ]
+
+
+def gen_outfits(start, end):
+    rng = rng_for('outfits', start)
+    user = owners(PLAN['outfits'], start, end)
+    n = len(user)
+    return Outfit, ['id', 'user_id', 'type', 'is_hijab_friendly', 'updated_at'], [
+        (PLAN['outfit_base'] + PLAN['outfit_offsets'][start] + np.arange(n)).tolist(),
+        (PLAN['user_base'] + user).tolist(),
+        np.where(rng.random(n) < 0.4, 'AI-generated', 'User-created').tolist(),
+        (rng.random(n) < 0.3).tolist(),
+        timestamps(rng, n, 365),
+    ]
+
+
+def gen_outfit_items(start, end):
+    rng = rng_for('outfit_items', start)
+    user = owners(PLAN['outfits'], start, end)
+    outfit = PLAN['outfit_base'] + PLAN['outfit_offsets'][start] + np.arange(len(user))
+    per_outfit = rng.integers(2, 6, len(user))
+    outfit, user = np.repeat(outfit, per_outfit), np.repeat(user, per_outfit)
+    item = (
+        PLAN['item_base'] + PLAN['item_offsets'][user]
+        + (rng.random(len(user)) * PLAN['items'][user]).astype(np.int64)
+    )
+    pairs = np.unique(np.stack([outfit, item], axis=1), axis=0)
+    through = Outfit.selected_items.through
+    return through, ['outfit_id', 'wardrobe_id'], [pairs[:, 0].tolist(), pairs[:, 1].tolist()]
+
+
+def gen_posts(start, end):
+    rng = rng_for('posts', start)
+    user = owners(PLAN['posts'], start, end)
+    n = len(user)
+    outfit = (
+        PLAN['outfit_base'] + PLAN['outfit_offsets'][user]
+        + (rng.random(n) * PLAN['outfits'][user]).astype(np.int64)
+    )
+    return Post, ['id', 'user_id', 'outfit_id', 'caption', 'created_at', 'likes_count'], [
+        (PLAN['post_base'] + PLAN['post_offsets'][start] + np.arange(n)).tolist(),
+        (PLAN['user_base'] + user).tolist(),
+        outfit.tolist(),
+        [f'Outfit of the day #{i}' for i in range(n)],
+        timestamps(rng, n, 365),
+        [0] * n,
+    ]
+
+
+def gen_likes(start, end):
+    rng = rng_for('likes', start)
+    first = PLAN['post_offsets'][start]
+    n_posts = PLAN['post_offsets'][end] - first
+    # Heavy-tailed popularity: most posts get a few likes, some get very many
+    per_post = np.minimum(rng.pareto(1.5, n_posts) * PLAN['likes_scale'], PLAN['users']).astype(np.int64)
+    post = np.repeat(PLAN['post_base'] + first + np.arange(n_posts), per_post)
+    liker = PLAN['user_base'] + rng.integers(0, PLAN['users'], len(post))
+    pairs = np.unique(np.stack([liker, post], axis=1), axis=0)
+    return Like, ['user_id', 'post_id', 'created_at'], [
+        pairs[:, 0].tolist(), pairs[:, 1].tolist(), timestamps(rng, len(pairs), 365),
+    ]
+
+
+def gen_follows(start, end):
+    rng = rng_for('follows', start)
+    follower = owners(PLAN['follows'], start, end)
+    # Followees are drawn from a Zipf-like popularity curve, so a few accounts collect most followers
+    followee = np.searchsorted(PLAN['popularity_cdf'], rng.random(len(follower)))
+    followee = PLAN['popularity_order'][np.minimum(followee, PLAN['users'] - 1)]
+    pairs = np.unique(np.stack([follower, followee], axis=1), axis=0)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]] + PLAN['user_base']
+    return Follow, ['follower_id', 'following_id', 'followed_at'], [
+        pairs[:, 0].tolist(), pairs[:, 1].tolist(), timestamps(rng, len(pairs), 720),
+    ]
+
+
+def gen_planner(start, end):
+    rng = rng_for('planner', start)
+    user = owners(PLAN['plans'], start, end)
+    n = len(user)
+    outfit = (
+        PLAN['outfit_base'] + PLAN['outfit_offsets'][user]
+        + (rng.random(n) * PLAN['outfits'][user]).astype(np.int64)
+    )
+    today = PLAN['today']
+    return OutfitPlanner, ['user_id', 'outfit_id', 'date', 'updated_at'], [
+        (PLAN['user_base'] + user).tolist(),
+        outfit.tolist(),
+        [(today + timedelta(days=int(d))).isoformat() for d in rng.integers(-180, 180, n)],
+        timestamps(rng, n, 180),
+    ]
+
+
+GENERATORS = {
+    'users': gen_users, 'profiles': gen_profiles, 'wardrobe': gen_wardrobe, 'outfits': gen_outfits,
+    'outfit_items': gen_outfit_items, 'posts': gen_posts, 'likes': gen_likes, 'follows': gen_follows,
+    'planner': gen_planner,
+}
+
+
+# --- writers ---
+
+def write(model, columns, data):
+    rows = list(zip(*data))
+    with transaction.atomic():
+        return insert_rows(model, columns, rows, use_copy=PLAN['use_copy'])
+
+
+def run_chunk(task):
+    stage, start, end = task
+    model, columns, data = GENERATORS[stage](start, end)
+    written = write(model, columns, data)
+    if stage == 'wardrobe':
+        written += write(WardrobeTag, ['wardrobe_id', 'tag_id', 'user_id'], PLAN.pop('pending_links'))
+    return written
+
+
+class Command(BaseCommand):
+    help = "Generates a large, deterministic synthetic dataset (users, wardrobes, outfits, posts, likes, follows, plans)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--items-per-user', type=float, default=20, help="Mean wardrobe size")
+        parser.add_argument('--outfits-per-user', type=float, default=5)
+        parser.add_argument('--posts-per-user', type=float, default=3)
+        parser.add_argument('--likes-per-post', type=float, default=8, help="Scale of the heavy-tailed likes distribution")
+        parser.add_argument('--follows-per-user', type=float, default=30)
+        parser.add_argument('--plans-per-user', type=float, default=4)
+        parser.add_argument('--zipf', type=float, default=1.1, help="Exponent of the followee popularity curve")
+        parser.add_argument('--images', type=int, default=0, help="Placeholder photos to create and share between items")
+        parser.add_argument('--chunk-users', type=int, default=5000, help="Users per batch transaction")
+        parser.add_argument('--workers', type=int, default=1, help="Processes (PostgreSQL only)")
+        parser.add_argument('--no-copy', action='store_true', help="Use batched INSERTs even on PostgreSQL")
+        parser.add_argument('--prefix', default='gen', help="Username prefix; change it to generate into a non-empty database")
+        parser.add_argument('--skip-counters', action='store_true', help="Leave denormalized counters at zero")
+        parser.add_argument('--timelines', action='store_true', help="Also build following-feed timelines (slow)")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def check_cache_tables(self):
+        # Taxonomy and version stamps are written to the cache as rows go in
+        tables = connection.introspection.table_names()
+        for alias, config in settings.CACHES.items():
+            if config.get('BACKEND') == 'django.core.cache.backends.db.DatabaseCache' and config['LOCATION'] not in tables:
+                raise CommandError(
+                    f"Cache table {config['LOCATION']!r} (cache {alias!r}) does not exist; "
+                    "run manage.py createcachetable first"
+                )
+
+    def handle(self, *args, **options):
+        global PLAN
+        n = options['users']
+        if n < 2:
+            raise CommandError("--users must be at least 2")
+        self.check_cache_tables()
+        if User.objects.filter(username=f"{options['prefix']}_0").exists():
+            raise CommandError(f"Users with prefix {options['prefix']!r} already exist; pick another --prefix")
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stderr.write("SQLite allows one writer at a time; using a single process")
+            workers = 1
+
+        rng = np.random.default_rng([options['seed'], len(STAGES)])
+
+        def counts(mean, minimum=0):
+            return np.maximum(rng.poisson(mean, n), minimum).astype(np.int64)
+
+        def offsets(per_user):
+            return np.concatenate([[0], np.cumsum(per_user)])
+
+        def base(model):
+            return (model.objects.aggregate(top=Max('id'))['top'] or 0) + 1
+
+        items, outfits, posts = counts(options['items_per_user'], 2), counts(options['outfits_per_user'], 1), counts(options['posts_per_user'])
+        ranks = np.arange(1, n + 1, dtype=np.float64) ** -options['zipf']
+        categories, subcategories = self.taxonomy()
+        tags = self.tags()
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+        PLAN = {
+            'seed': options['seed'],
+            'prefix': options['prefix'],
+            'vendor': connection.vendor,
+            'use_copy': connection.vendor == 'postgresql' and not options['no_copy'],
+            'users': n,
+            'now': np.datetime64(now, 'us'),
+            'today': date.today(),
+            'password': make_password('Generated!1'),
+            'user_base': base(User),
+            'item_base': base(Wardrobe),
+            'outfit_base': base(Outfit),
+            'post_base': base(Post),
+            'items': items, 'item_offsets': offsets(items),
+            'outfits': outfits, 'outfit_offsets': offsets(outfits),
+            'posts': posts, 'post_offsets': offsets(posts),
+            'follows': counts(options['follows_per_user']),
+            'plans': counts(options['plans_per_user']),
+            'likes_scale': options['likes_per_post'] / 2,  # pareto(1.5) has mean 2
+            'popularity_order': rng.permutation(n),
+            'popularity_cdf': np.cumsum(ranks) / ranks.sum(),
+            'categories': categories,
+            'subcategories': subcategories,
+            'tag_names': list(tags), 'tag_ids': list(tags.values()),
+            'placeholders': self.placeholders(options['images'], options['seed']),
+        }
+
+        if connection.vendor == 'sqlite':
+            # Bulk-load settings for this connection only; a crash mid-run loses the generated rows, nothing else
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous = OFF')
+                cursor.execute('PRAGMA cache_size = -262144')
+
+        chunk = options['chunk_users']
+        total_rows, started = 0, time.perf_counter()
+        for stage in STAGES:
+            tasks = [(stage, start, min(start + chunk, n)) for start in range(0, n, chunk)]
+            stage_started = time.perf_counter()
+            if workers > 1:
+                # Children open their own connections; none may be inherited across the fork
+                connections.close_all()
+                with multiprocessing.get_context('fork').Pool(workers) as pool:
+                    rows = sum(pool.imap_unordered(run_chunk, tasks))
+            else:
+                rows = sum(run_chunk(task) for task in tasks)
+            elapsed = time.perf_counter() - stage_started
+            total_rows += rows
+            self.stdout.write(f"{stage:>13}: {rows:>11,} rows in {elapsed:7.1f} s ({rows / max(elapsed, 1e-9):>11,.0f} rows/s)")
+
+        if connection.vendor == 'postgresql':
+            models = [User, UserProfile, Wardrobe, WardrobeTag, Outfit, Outfit.selected_items.through, Post, Like, Follow, OutfitPlanner]
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                    cursor.execute(sql)
+                cursor.execute('ANALYZE')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {total_rows:,} rows in {elapsed:.1f} s ({total_rows / elapsed:,.0f} rows/s)"
+        ))
+
+        if not options['skip_counters']:
+            call_command('reconcile_counters', stdout=self.stdout)
+        if PLAN['placeholders'] and getattr(default_storage, 'reference_counted', False):
+            # The raw inserts share each placeholder between many rows
+            call_command('reconcile_media', stdout=self.stdout)
+        if options['timelines']:
+            call_command('rebuild_timelines', stdout=self.stdout)
+
+    def taxonomy(self):
+        if not Category.objects.exists():
+            for name, subs in TAXONOMY.items():
+                category = Category.objects.create(name=name)
+                SubCategory.objects.bulk_create(SubCategory(category=category, name=sub) for sub in subs)
+        categories = list(Category.objects.order_by('id').values_list('id', flat=True))
+        subcategories = {category: [] for category in categories}
+        for sub_id, category_id in SubCategory.objects.order_by('id').values_list('id', 'category_id'):
+            subcategories[category_id].append(sub_id)
+        return categories, subcategories
+
+    def tags(self):
+        Tag.objects.bulk_create([Tag(name=name) for name in TAGS], ignore_conflicts=True)
+        return dict(Tag.objects.filter(name__in=TAGS).order_by('name').values_list('name', 'id'))
+
+    def placeholders(self, count, seed):
+        """Writes `count` solid-colour photos with their WebP renditions; returns (photo, thumb, medium) names"""
+        rng = np.random.default_rng([seed, len(STAGES) + 1])
+        names = []
+        for i in range(count):
+            image = Image.new('RGB', (800, 1000), tuple(int(c) for c in rng.integers(0, 256, 3)))
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=85)
+            photo = default_storage.save(f'wardrobe/placeholder_{seed}_{i}.jpg', ContentFile(buffer.getvalue()))
+            renditions = [
+                default_storage.save(f'derivatives/wardrobe/placeholder_{seed}_{i}_{name}.webp', ContentFile(render(image, size, crop)))
+                for name, (size, crop) in RENDITIONS.items()
+            ]
+            names.append((photo, *renditions))
+        return names
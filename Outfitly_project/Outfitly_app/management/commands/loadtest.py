@@ -0,0 +1,108 @@
+import json
+import subprocess
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from Outfitly_app import images
+from Outfitly_app.loadtest import COLUMNS, SCENARIOS, Harness, api_route_names, parse_mix, render_html, summarize
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays a weighted traffic mix over every API route on a throwaway test database and "
+        "writes per-endpoint throughput, p50/p95/p99 latency and SQL query counts as JSON and HTML"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help="Virtual users")
+        parser.add_argument('--requests', type=int, default=2000, help="Requests in the measured mix")
+        parser.add_argument('--items-per-user', type=int, default=8)
+        parser.add_argument('--mix', help="Weight overrides, e.g. get_wardrobe=20,export_outfits=0")
+        parser.add_argument('--no-photos', action='store_true', help="Upload items without photos")
+        parser.add_argument('--output', default='loadtest-report', help="Path prefix for the .json and .html reports")
+        parser.add_argument('--baseline', help="Earlier JSON report to print p50/p95 and query deltas against")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(e)
+        uncovered = sorted(api_route_names() - set(SCENARIOS))
+        if uncovered:
+            self.stderr.write(f"Routes without a scenario: {', '.join(uncovered)}")
+
+        with tempfile.TemporaryDirectory() as scratch, override_settings(
+            MEDIA_ROOT=scratch, SIMILARITY_INDEX_DIR=Path(scratch) / 'similarity_index', DEBUG=False
+        ):
+            if connection.vendor == 'sqlite':
+                # A file rather than shared-cache memory, so background thumbnail and
+                # embedding writers wait for locks instead of failing
+                connection.settings_dict['TEST']['NAME'] = str(Path(scratch) / 'loadtest.sqlite3')
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                harness = Harness(
+                    users=options['users'], items_per_user=options['items_per_user'],
+                    photos=not options['no_photos'], seed=options['seed'],
+                )
+                try:
+                    harness.set_up()
+                    images.drain_executor()  # start measuring with the setup's thumbnails already built
+                    started_at = timezone.now()
+                    elapsed = harness.run(options['requests'], mix)
+                    images.drain_executor()
+                finally:
+                    harness.close()
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'started_at': started_at.isoformat(),
+                'database': connection.vendor,
+                'async_views': settings.OUTFITLY_ASYNC_VIEWS,
+                'virtual_users': options['users'],
+                'requests': options['requests'],
+                'seed': options['seed'],
+                'elapsed_s': round(elapsed, 3),
+                'throughput_rps': round(options['requests'] / elapsed, 2),
+            },
+            'mix': mix,
+            'endpoints': summarize(harness.recorder),
+        }
+        json_path, html_path = Path(f"{options['output']}.json"), Path(f"{options['output']}.html")
+        json_path.write_text(json.dumps(report, indent=2))
+        html_path.write_text(render_html(report))
+
+        baseline = json.loads(Path(options['baseline']).read_text())['endpoints'] if options['baseline'] else {}
+        self.stdout.write(f"{'endpoint':<32}" + ''.join(f'{column:>15}' for column in COLUMNS))
+        for name, stats in report['endpoints'].items():
+            line = f'{name:<32}' + ''.join(f'{stats[column]:>15}' for column in COLUMNS)
+            if name in baseline:
+                before = baseline[name]
+                line += (
+                    f"   p50 {stats['p50_ms'] - before['p50_ms']:+.2f}"
+                    f"  p95 {stats['p95_ms'] - before['p95_ms']:+.2f}"
+                    f"  queries {stats['queries_mean'] - before['queries_mean']:+.2f}"
+                )
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['requests']} requests in {elapsed:.1f} s ({report['meta']['throughput_rps']} req/s); "
+            f"wrote {json_path} and {html_path}"
+        ))
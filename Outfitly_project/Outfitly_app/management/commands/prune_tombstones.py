@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from Outfitly_app.models import Tombstone
+from Outfitly_app.sync import retention_cutoff
+
+
+class Command(BaseCommand):
+    help = "Deletes sync tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would be deleted")
+
+    def handle(self, *args, **options):
+        expired = Tombstone.objects.filter(deleted_at__lt=retention_cutoff())
+        if options['dry_run']:
+            self.stdout.write(f"{expired.count()} tombstones would be pruned")
+            return
+
+        pruned = 0
+        while True:
+            # Short batches keep each DELETE's locks brief on a busy table
+            batch = list(expired.order_by('id').values_list('id', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            pruned += Tombstone.objects.filter(id__in=batch).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} tombstones"))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from Outfitly_app.models import UploadSession
+from Outfitly_app.uploads import discard_part
+
+
+class Command(BaseCommand):
+    help = "Deletes expired and already attached upload sessions with their part files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would be deleted")
+
+    def handle(self, *args, **options):
+        stale = UploadSession.objects.filter(Q(expires_at__lt=timezone.now()) | Q(status='attached'))
+        if options['dry_run']:
+            self.stdout.write(f"{stale.count()} upload sessions would be pruned")
+            return
+
+        pruned = 0
+        # One by one, so the delete signals release completed-but-unattached files
+        for session in stale.iterator():
+            if session.status == 'open':
+                discard_part(session)
+            session.delete()
+            pruned += 1
+        self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} upload sessions"))
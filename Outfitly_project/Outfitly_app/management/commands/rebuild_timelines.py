@@ -0,0 +1,37 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from Outfitly_app.models import Follow
+from Outfitly_app.timeline import backfill_followee, trim_timeline, trim_timelines
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfills following-feed timelines from the Follow table, or trims them to TIMELINE_MAX_LENGTH "
+        "(run --trim periodically, e.g. hourly from cron)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-ids', type=int, nargs='+', help="Only process these users")
+        parser.add_argument('--trim', action='store_true', help="Only trim existing timelines, don't backfill")
+
+    def handle(self, *args, **options):
+        if options['trim'] and not options['user_ids']:
+            trimmed, deleted = trim_timelines()
+            self.stdout.write(self.style.SUCCESS(f"Trimmed {trimmed} timelines ({deleted} entries)"))
+            return
+
+        users = User.objects.order_by('id')
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+
+        processed = 0
+        for user_id in users.values_list('id', flat=True).iterator(chunk_size=1000):
+            if options['trim']:
+                trim_timeline(user_id)
+            else:
+                for followee_id in Follow.objects.filter(follower_id=user_id).values_list('following_id', flat=True):
+                    backfill_followee(user_id, followee_id)
+            processed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} timelines"))
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from Outfitly_app.models import Follow, Like, Post, UserProfile
+
+
+def count_of(model, field, outer='pk'):
+    """Correlated COUNT(*) of `model` rows whose `field` points at the outer row"""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef(outer)})
+            .order_by()
+            .values(field)
+            .annotate(c=Count('*'))
+            .values('c')
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = "Recomputes denormalized like/follower/post counters in batches and fixes any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without writing")
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+
+        fixed = self.reconcile(Post.objects.all(), {'likes_count': count_of(Like, 'post')})
+        self.stdout.write(f"Posts with drifted likes_count: {fixed}")
+
+        fixed = self.reconcile(UserProfile.objects.all(), {
+            'followers_count': count_of(Follow, 'following', outer='user_id'),
+            'following_count': count_of(Follow, 'follower', outer='user_id'),
+            'posts_count': count_of(Post, 'user', outer='user_id'),
+        })
+        self.stdout.write(f"Profiles with drifted counters: {fixed}")
+
+        self.stdout.write(self.style.SUCCESS("Dry run complete" if self.dry_run else "Counters reconciled"))
+
+    def reconcile(self, queryset, expressions):
+        """Walks `queryset` in primary-key batches and rewrites rows whose counters are off"""
+        actual = {f'actual_{field}': expr for field, expr in expressions.items()}
+        drifted = Q()
+        for field in expressions:
+            drifted |= ~Q(**{field: F(f'actual_{field}')})
+
+        fixed = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:self.batch_size]
+            )
+            if not batch:
+                return fixed
+            last_pk = batch[-1]
+
+            stale = list(
+                queryset.filter(pk__in=batch).annotate(**actual).filter(drifted).values_list('pk', flat=True)
+            )
+            if stale and not self.dry_run:
+                # Recount inside the UPDATE itself so concurrent toggles are not overwritten
+                queryset.filter(pk__in=stale).update(**expressions)
+            fixed += len(stale)
@@ -0,0 +1,110 @@
+import os
+from collections import Counter
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, FileField
+from django.utils import timezone
+
+from Outfitly_app.models import MediaBlob
+from Outfitly_app.storage import CAS_PREFIX
+
+
+def counted_fields():
+    """(model, field) for every file field stored on a reference-counted storage"""
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, FileField) and getattr(field.storage, 'reference_counted', False):
+                yield model, field
+
+
+class Command(BaseCommand):
+    help = (
+        "Recounts references to content-addressed media, removes files nothing points at, "
+        "and optionally moves uploads from before the switch into the store"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--adopt-legacy', action='store_true', help="Re-store older uploads by content and delete the originals")
+        parser.add_argument('--dry-run', action='store_true', help="Report without writing or deleting")
+
+    def handle(self, *args, **options):
+        if not getattr(default_storage, 'reference_counted', False):
+            raise CommandError("The default storage is not ContentAddressedStorage")
+        self.dry_run = options['dry_run']
+        if options['adopt_legacy']:
+            self.adopt_legacy()
+
+        references = Counter()
+        for model, field in counted_fields():
+            rows = (
+                model.objects.filter(**{f'{field.attname}__startswith': f'{CAS_PREFIX}/'})
+                .order_by().values_list(field.attname).annotate(n=Count('pk'))
+            )
+            for name, n in rows:
+                references[name] += n
+
+        fixed = removed = 0
+        for pk, name, refcount in MediaBlob.objects.values_list('pk', 'name', 'refcount').iterator(chunk_size=2000):
+            actual = references.pop(name, 0)
+            if actual == refcount:
+                continue
+            if actual == 0:
+                removed += 1
+                if not self.dry_run:
+                    MediaBlob.objects.filter(pk=pk).delete()
+                    default_storage.purge(name)
+            else:
+                fixed += 1
+                if not self.dry_run:
+                    MediaBlob.objects.filter(pk=pk).update(refcount=actual)
+
+        # Referenced names without a blob row (e.g. bulk-generated data)
+        missing = adopted = 0
+        for name, n in references.items():
+            if not default_storage.exists(name):
+                missing += 1
+                continue
+            adopted += 1
+            if not self.dry_run:
+                digest = os.path.splitext(os.path.basename(name))[0]
+                MediaBlob.objects.update_or_create(
+                    name=name, defaults={'digest': digest, 'size': default_storage.size(name), 'refcount': n}
+                )
+
+        self.stdout.write(f"Blobs with drifted counts: {fixed}")
+        self.stdout.write(f"Unreferenced blobs removed: {removed}")
+        self.stdout.write(f"Referenced files without a blob row: {adopted}")
+        self.stdout.write(f"Referenced files missing on disk: {missing}")
+        self.stdout.write(self.style.SUCCESS("Dry run complete" if self.dry_run else "Media reconciled"))
+
+    def adopt_legacy(self):
+        moved, failed = 0, set()
+        legacy = set()
+        for model, field in counted_fields():
+            rows = (
+                model.objects.exclude(**{f'{field.attname}__isnull': True}).exclude(**{field.attname: ''})
+                .exclude(**{f'{field.attname}__startswith': f'{CAS_PREFIX}/'})
+            )
+            for pk, name in rows.values_list('pk', field.attname).iterator(chunk_size=500):
+                if not default_storage.exists(name):
+                    continue
+                legacy.add(name)
+                if self.dry_run:
+                    continue
+                with default_storage.open(name) as source:
+                    new_name = default_storage.save(name, source)
+                updates = {field.attname: new_name}
+                if any(f.name == 'updated_at' for f in model._meta.concrete_fields):
+                    updates['updated_at'] = timezone.now()  # the URL changed; let delta sync pick it up
+                # Skip rows that changed meanwhile; the recount below corrects the reference
+                if model.objects.filter(pk=pk, **{field.attname: name}).update(**updates):
+                    moved += 1
+                else:
+                    failed.add(name)
+
+        if not self.dry_run:
+            for name in legacy - failed:
+                default_storage.purge(name)
+        self.stdout.write(f"Legacy files {'found' if self.dry_run else 'moved'}: {len(legacy) if self.dry_run else moved}")
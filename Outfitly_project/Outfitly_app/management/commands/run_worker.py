@@ -0,0 +1,51 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from Outfitly_app.jobs import work
+
+
+class Command(BaseCommand):
+    help = "Runs background jobs from the database queue until interrupted"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None, help="Jobs run at once (default JOB_WORKERS)")
+        parser.add_argument(
+            '--processes', action='store_true',
+            help="One process per worker instead of threads, for CPU-bound tasks",
+        )
+        parser.add_argument('--poll-interval', type=float, default=None, help="Seconds between polls of an empty queue")
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is due")
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency'] or settings.JOB_WORKERS
+        kwargs = {'poll_interval': options['poll_interval'], 'burst': options['burst']}
+        if options['processes']:
+            # Children must not share the parent's database connection
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            stop = context.Event()
+            workers = [context.Process(target=work, args=(stop,), kwargs=kwargs) for _ in range(concurrency)]
+        else:
+            stop = threading.Event()
+            workers = [threading.Thread(target=work, args=(stop,), kwargs=kwargs) for _ in range(concurrency)]
+
+        def shut_down(signum, frame):
+            # Forked workers inherit this handler; only the parent reports
+            if multiprocessing.parent_process() is None and not stop.is_set():
+                self.stdout.write("Stopping after the running jobs finish")
+            stop.set()
+
+        signal.signal(signal.SIGINT, shut_down)
+        signal.signal(signal.SIGTERM, shut_down)
+        mode = 'processes' if options['processes'] else 'threads'
+        self.stdout.write(f"Running jobs on {concurrency} {mode}")
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.stdout.write(self.style.SUCCESS("Worker stopped"))
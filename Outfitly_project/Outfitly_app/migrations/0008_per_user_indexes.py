@@ -0,0 +1,53 @@
+# Generated by Django 5.0.14 on 2026-10-17 21:34
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def dedupe_follows(apps, schema_editor):
+    """Keeps the oldest row of every duplicated (follower, following) pair"""
+    Follow = apps.get_model('Outfitly_app', 'Follow')
+    duplicates = (
+        Follow.objects.values('follower_id', 'following_id')
+        .annotate(n=Count('id'), keep_id=Min('id'))
+        .filter(n__gt=1)
+    )
+    for row in duplicates.iterator():
+        Follow.objects.filter(
+            follower_id=row['follower_id'], following_id=row['following_id']
+        ).exclude(id=row['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Outfitly_app', '0007_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='outfitplanner',
+            index=models.Index(fields=['user', 'date'], name='planner_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user', '-created_at'], name='post_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wardrobe',
+            index=models.Index(fields=['user', 'subcategory'], name='wardrobe_user_subcat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wardrobe',
+            index=models.Index(fields=['user', 'category'], name='wardrobe_user_cat_idx'),
+        ),
+        # Duplicates must go before the unique constraint can be created.
+        # Follower counters may drift as a result; run reconcile_counters afterwards.
+        migrations.RunPython(dedupe_follows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('follower', 'following'), name='unique_follow'),
+        ),
+    ]
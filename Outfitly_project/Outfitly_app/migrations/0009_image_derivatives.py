@@ -0,0 +1,53 @@
+# Generated by Django 5.0.14 on 2026-10-17 21:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Outfitly_app', '0008_per_user_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outfit',
+            name='photo_path_medium',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='derivatives/'),
+        ),
+        migrations.AddField(
+            model_name='outfit',
+            name='photo_path_thumb',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='derivatives/'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_medium',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='derivatives/'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_thumb',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='derivatives/'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='profile_picture_medium',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='derivatives/'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='profile_picture_thumb',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='derivatives/'),
+        ),
+        migrations.AddField(
+            model_name='wardrobe',
+            name='photo_path_medium',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='derivatives/'),
+        ),
+        migrations.AddField(
+            model_name='wardrobe',
+            name='photo_path_thumb',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='derivatives/'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.14 on 2026-10-17 21:42
+
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_tags(apps, schema_editor):
+    """Builds Tag/WardrobeTag rows from the existing free-text Wardrobe.tags"""
+    Wardrobe = apps.get_model('Outfitly_app', 'Wardrobe')
+    Tag = apps.get_model('Outfitly_app', 'Tag')
+    WardrobeTag = apps.get_model('Outfitly_app', 'WardrobeTag')
+
+    tag_ids = {}
+    links = []
+    rows = Wardrobe.objects.exclude(tags__isnull=True).exclude(tags='').values_list('id', 'user_id', 'tags')
+    for wardrobe_id, user_id, text in rows.iterator(chunk_size=1000):
+        names = {' '.join(tag.split()).lower()[:50] for tag in re.split(r'[,;#]+', text)} - {''}
+        for name in names:
+            if name not in tag_ids:
+                tag_ids[name] = Tag.objects.get_or_create(name=name)[0].id
+            links.append(WardrobeTag(wardrobe_id=wardrobe_id, user_id=user_id, tag_id=tag_ids[name]))
+        if len(links) >= 1000:
+            WardrobeTag.objects.bulk_create(links, ignore_conflicts=True)
+            links = []
+    WardrobeTag.objects.bulk_create(links, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Outfitly_app', '0009_image_derivatives'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WardrobeTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wardrobe_links', to='Outfitly_app.tag')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('wardrobe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='Outfitly_app.wardrobe')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'tag'], name='wardrobetag_user_tag_idx')],
+                'unique_together': {('wardrobe', 'tag')},
+            },
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_duplicates(apps, schema_editor):
+    """Refuses to build the unique indexes over accounts that only differ by case"""
+    User = apps.get_model('auth', 'User')
+    problems = []
+    for field, users in (('username', User.objects.all()), ('email', User.objects.exclude(email=''))):
+        duplicates = (
+            users.values(value=Lower(field)).annotate(n=Count('id')).filter(n__gt=1).values_list('value', flat=True)
+        )
+        problems += [f'{field} {value!r}' for value in duplicates]
+    if problems:
+        raise RuntimeError(
+            'Accounts share a case-insensitive identifier; merge or rename them first: ' + ', '.join(problems)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Outfitly_app', '0010_wardrobe_tags'),
+        # After auth's own table changes, which rebuild auth_user on SQLite and drop foreign indexes
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        # auth.User belongs to Django, so its functional indexes are managed here.
+        # The email predicate matches the `email > ''` term login queries carry.
+        migrations.RunSQL(
+            "CREATE UNIQUE INDEX auth_user_username_lower_uniq ON auth_user (LOWER(username))",
+            "DROP INDEX auth_user_username_lower_uniq",
+        ),
+        migrations.RunSQL(
+            "CREATE UNIQUE INDEX auth_user_email_lower_uniq ON auth_user (LOWER(email)) WHERE email > ''",
+            "DROP INDEX auth_user_email_lower_uniq",
+        ),
+    ]
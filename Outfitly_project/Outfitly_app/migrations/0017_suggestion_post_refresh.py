@@ -0,0 +1,22 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Outfitly_app', '0016_follow_suggestions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuggestionPostRefresh',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='Outfitly_app.post')),
+                ('requested_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -1,4 +1,7 @@
+import uuid
+
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 class UserProfile(models.Model):
@@ -19,11 +22,19 @@ class UserProfile(models.Model):
     )
     
     profile_picture = models.ImageField(upload_to="profile_pics/", blank=True, null=True)
+    # WebP renditions of profile_picture, generated in the background (see images.py)
+    profile_picture_thumb = models.ImageField(upload_to="derivatives/", blank=True, null=True, editable=False)
+    profile_picture_medium = models.ImageField(upload_to="derivatives/", blank=True, null=True, editable=False)
 
     # New fields
     bio = models.TextField(blank=True, null=True, max_length=500)
     location = models.CharField(max_length=100, blank=True, null=True)
 
+    # Denormalized counters, kept in sync by the views (see counters.py)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    posts_count = models.PositiveIntegerField(default=0)
+
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
@@ -66,11 +77,46 @@ class Wardrobe(models.Model):
     season = models.CharField(max_length=15, choices=SEASON_CHOICES, default='All-Season')
     tags = models.TextField(blank=True, null=True)
     photo_path = models.ImageField(upload_to="wardrobe/", blank=True, null=True)
+    photo_path_thumb = models.ImageField(upload_to="derivatives/", blank=True, null=True, editable=False)
+    photo_path_medium = models.ImageField(upload_to="derivatives/", blank=True, null=True, editable=False)
+    # Change timestamp for delta sync (see sync.py)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'subcategory'], name='wardrobe_user_subcat_idx'),
+            models.Index(fields=['user', 'category'], name='wardrobe_user_cat_idx'),
+            models.Index(fields=['user', 'updated_at'], name='wardrobe_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.category} - {self.subcategory or 'General'} ({self.color}) [{self.season}]"
 
 
+# ✅ Tag Models (normalized, indexed form of Wardrobe.tags)
+class Tag(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class WardrobeTag(models.Model):
+    wardrobe = models.ForeignKey(Wardrobe, on_delete=models.CASCADE, related_name="tag_links")
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="wardrobe_links")
+    # Copied from wardrobe.user so tag filters can stay inside one user's rows
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+
+    class Meta:
+        unique_together = ('wardrobe', 'tag')
+        indexes = [
+            models.Index(fields=['user', 'tag'], name='wardrobetag_user_tag_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.wardrobe_id} #{self.tag.name}"
+
+
 # ✅ Outfit Model
 class Outfit(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="outfits")
@@ -82,6 +128,14 @@ class Outfit(models.Model):
     is_hijab_friendly = models.BooleanField(default=False)
     description = models.TextField(blank=True, null=True)
     photo_path = models.ImageField(upload_to="outfits/", blank=True, null=True)
+    photo_path_thumb = models.ImageField(upload_to="derivatives/", blank=True, null=True, editable=False)
+    photo_path_medium = models.ImageField(upload_to="derivatives/", blank=True, null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='outfit_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Outfit {self.pk} - {self.type}"
@@ -92,18 +146,134 @@ class OutfitPlanner(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="planned_outfits")
     outfit = models.ForeignKey(Outfit, on_delete=models.CASCADE, related_name="planned_dates")
     date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='planner_user_date_idx'),
+            models.Index(fields=['user', 'updated_at'], name='planner_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Planned Outfit {self.outfit.pk} for {self.date}"
 
 
+# ✅ Media Blob Model (one stored file per content, see storage.py)
+class MediaBlob(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    digest = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField()
+    # Rows whose file fields point at this name
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+
+# ✅ Upload Session Model (resumable chunked uploads, see uploads.py)
+class UploadSession(models.Model):
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('complete', 'Complete'),
+        ('attached', 'Attached'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)
+    # Sorted, merged [start, end) byte ranges written so far
+    received = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+    # The stored upload until it is attached to a row
+    file = models.FileField(upload_to="uploads/", blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Upload {self.pk} ({self.status})"
+
+
+# ✅ Job Model (background work queued in the database, see jobs.py)
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    # The user who asked for the work; only they can see its status
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    # Higher runs first
+    priority = models.SmallIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers only ever scan queued jobs, in the order they claim them
+            models.Index(
+                fields=['-priority', 'run_at', 'id'], condition=models.Q(status='queued'), name='job_queued_idx'
+            ),
+            models.Index(fields=['status', 'locked_at'], name='job_status_locked_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} job {self.pk} ({self.status})"
+
+
+# ✅ Tombstone Model (deletions of synced rows, pruned after SYNC_TOMBSTONE_RETENTION_DAYS)
+class Tombstone(models.Model):
+    KIND_CHOICES = [
+        ('wardrobe', 'Wardrobe'),
+        ('outfit', 'Outfit'),
+        ('plan', 'OutfitPlanner'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"Deleted {self.kind} {self.object_id}"
+
+
 # ✅ Post Model (Feed)
 class Post(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     outfit = models.ForeignKey(Outfit, on_delete=models.CASCADE, related_name='posts')
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    image_thumb = models.ImageField(upload_to='derivatives/', blank=True, null=True, editable=False)
+    image_medium = models.ImageField(upload_to='derivatives/', blank=True, null=True, editable=False)
     caption = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    likes_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Backs keyset pagination of the public feed on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='post_created_id_idx'),
+            models.Index(fields=['user', '-created_at'], name='post_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"Post by {self.user.username} - {self.created_at.date()}"
@@ -128,5 +298,65 @@ class Follow(models.Model):
     following = models.ForeignKey(User, related_name='followers', on_delete=models.CASCADE)
     followed_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'following'], name='unique_follow'),
+        ]
+
     def __str__(self):
         return f"{self.follower.username} follows {self.following.username}"
+
+
+# ✅ Timeline Entry Model (precomputed following feed)
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    # Copy of post.created_at so the feed can be read from this table alone
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'], name='timeline_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} in {self.user_id}'s timeline"
+
+
+# ✅ Follow Suggestion Model (precomputed "who to follow", see suggestions.py)
+class FollowSuggestion(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='follow_suggestions')
+    suggested = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    # Accounts the user follows that follow `suggested`
+    mutual_follows = models.PositiveIntegerField(default=0)
+    # Posts both of them liked
+    mutual_likes = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-score'], name='suggestion_user_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"Suggest {self.suggested_id} to {self.user_id}"
+
+
+# ✅ Suggestion Refresh Model (users whose follows or likes changed since suggestions were built)
+class SuggestionRefresh(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    requested_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Refresh suggestions around {self.user_id}"
+
+
+# ✅ Suggestion Post Refresh Model (posts whose likers changed since suggestions were built)
+class SuggestionPostRefresh(models.Model):
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    requested_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Refresh suggestions of post {self.post_id}'s likers"
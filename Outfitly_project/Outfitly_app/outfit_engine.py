@@ -0,0 +1,234 @@
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import jobs
+from .models import Outfit, UserProfile, Wardrobe
+from .tags import normalize_tags
+from .versions import get_version
+
+# Items are encoded once per user into NumPy arrays; an outfit takes one item per
+# category slot and combinations are ranked with a vectorized beam search. The
+# arrays are cached in the shared cache under the user's data version, which
+# every wardrobe write replaces, so no worker can read a stale copy.
+
+SEASONS = ['Winter', 'Spring', 'Summer', 'Autumn']
+
+NEUTRAL_COLORS = {
+    'black', 'white', 'grey', 'gray', 'beige', 'navy', 'brown', 'cream',
+    'ivory', 'khaki', 'tan', 'charcoal', 'denim', 'camel',
+}
+
+# Items whose subcategory or tags mention any of these are never offered to
+# users who asked for hijab-friendly outfits
+IMMODEST_KEYWORDS = {
+    'sleeveless', 'tank', 'crop', 'cropped', 'mini', 'shorts', 'strapless',
+    'off-shoulder', 'backless', 'bodycon', 'sheer', 'see-through', 'bikini',
+}
+
+# Relative weight of each pairwise compatibility term
+WEIGHTS = {
+    'season': 1.0,
+    'color': 1.5,
+    'material': 0.3,
+    'tags': 1.0,
+}
+
+FEATURE_FIELDS = ('id', 'category_id', 'subcategory__name', 'color', 'season', 'material', 'tags')
+
+
+class NotEnoughItems(Exception):
+    pass
+
+
+def one_hot(values):
+    """Encodes a list of strings as a (n, vocabulary) float32 one-hot matrix"""
+    vocabulary = {value: i for i, value in enumerate(sorted(set(values)))}
+    matrix = np.zeros((len(values), max(len(vocabulary), 1)), dtype=np.float32)
+    matrix[np.arange(len(values)), [vocabulary[value] for value in values]] = 1.0
+    return matrix
+
+
+def build_features(rows):
+    """Turns wardrobe rows (dicts with FEATURE_FIELDS) into feature arrays"""
+    n = len(rows)
+    colors = [(row['color'] or '').strip().lower() for row in rows]
+    tag_sets = [set(normalize_tags(row['tags'])) for row in rows]
+
+    seasons = np.zeros((n, len(SEASONS)), dtype=np.float32)
+    for i, row in enumerate(rows):
+        if row['season'] in SEASONS:
+            seasons[i, SEASONS.index(row['season'])] = 1.0
+        else:  # All-Season
+            seasons[i, :] = 1.0
+
+    tag_vocabulary = {tag: i for i, tag in enumerate(sorted(set().union(*tag_sets)))}
+    tags = np.zeros((n, max(len(tag_vocabulary), 1)), dtype=np.float32)
+    for i, tag_set in enumerate(tag_sets):
+        tags[i, [tag_vocabulary[tag] for tag in tag_set]] = 1.0
+    norms = np.linalg.norm(tags, axis=1, keepdims=True)
+    tags = np.divide(tags, norms, out=np.zeros_like(tags), where=norms > 0)
+
+    modest = np.array([
+        not (tag_sets[i] | set((row['subcategory__name'] or '').lower().split())) & IMMODEST_KEYWORDS
+        for i, row in enumerate(rows)
+    ], dtype=bool)
+
+    return {
+        'ids': np.array([row['id'] for row in rows], dtype=np.int64),
+        'category': np.array([row['category_id'] or 0 for row in rows], dtype=np.int64),
+        'season': seasons,
+        'color': one_hot(colors),
+        'neutral': np.array([color in NEUTRAL_COLORS for color in colors], dtype=bool),
+        'material': one_hot([(row['material'] or '').strip().lower() for row in rows]),
+        'tags': tags,
+        'modest': modest,
+    }
+
+
+def features_cache_key(user_id, version):
+    return f'outfit_engine:features:{user_id}:{version}'
+
+
+def load_features(user_id):
+    rows = list(Wardrobe.objects.filter(user_id=user_id).order_by('id').values(*FEATURE_FIELDS))
+    return build_features(rows)
+
+
+def get_features(user_id):
+    """Per-user feature arrays, served from the cache until the wardrobe changes"""
+    # Read before the rows, so a write landing in between can only make the key older
+    key = features_cache_key(user_id, get_version(user_id))
+    features = cache.get(key)
+    if features is None:
+        features = load_features(user_id)
+        cache.set(key, features, settings.OUTFIT_ENGINE_CACHE_TTL)
+    return features
+
+
+def pairwise_scores(features, a, b):
+    """Compatibility of every item in index array `a` with every item in `b`, shape (len(a), len(b))"""
+    season_overlap = features['season'][a] @ features['season'][b].T
+    season = np.where(season_overlap > 0, 1.0, -1.0)
+
+    same_color = features['color'][a] @ features['color'][b].T
+    any_neutral = features['neutral'][a][:, None] | features['neutral'][b][None, :]
+    color = np.where(any_neutral, 1.0, np.where(same_color > 0, 0.3, -0.5))
+
+    # Head-to-toe in one material rarely works; penalize repeats slightly
+    material = -(features['material'][a] @ features['material'][b].T)
+
+    tags = features['tags'][a] @ features['tags'][b].T
+
+    return (
+        WEIGHTS['season'] * season
+        + WEIGHTS['color'] * color
+        + WEIGHTS['material'] * material
+        + WEIGHTS['tags'] * tags
+    ).astype(np.float32)
+
+
+def unary_scores(features, candidates, season=None):
+    """Per-item preference; items made for the requested season score higher"""
+    scores = np.zeros(len(candidates), dtype=np.float32)
+    if season in SEASONS:
+        column = features['season'][candidates, SEASONS.index(season)]
+        # Exact-season items beat All-Season ones, which beat off-season ones
+        exact = features['season'][candidates].sum(axis=1) == 1
+        scores += np.where(column > 0, np.where(exact, 2.0, 1.0), -3.0)
+    return scores
+
+
+def generate_outfits(features, season=None, modest=False, top_k=5):
+    """
+    Returns up to `top_k` (item_ids, score) pairs, best first, each with one
+    item per category present in the eligible part of the wardrobe.
+    """
+    candidates = np.flatnonzero(features['category'] > 0)
+    if modest:
+        candidates = candidates[features['modest'][candidates]]
+
+    unary = unary_scores(features, candidates, season)
+    slot_limit = settings.OUTFIT_ENGINE_MAX_CANDIDATES_PER_SLOT
+    slots = []
+    for category in np.unique(features['category'][candidates]):
+        in_slot = np.flatnonzero(features['category'][candidates] == category)
+        # Keep the best-ranked items per slot so very large wardrobes stay bounded
+        in_slot = in_slot[np.argsort(-unary[in_slot], kind='stable')[:slot_limit]]
+        slots.append((candidates[in_slot], unary[in_slot]))
+    if len(slots) < 2:
+        raise NotEnoughItems("Need items from at least two categories to build an outfit")
+
+    # Narrow slots first keeps the beam diverse for the wide ones
+    slots.sort(key=lambda slot: len(slot[0]))
+    pairwise = {
+        (j, s): pairwise_scores(features, slots[j][0], slots[s][0])
+        for s in range(len(slots)) for j in range(s)
+    }
+
+    beam_width = settings.OUTFIT_ENGINE_BEAM_WIDTH
+    beams = np.arange(len(slots[0][0]))[:, None]  # (B, slots so far), positions within each slot
+    scores = slots[0][1].copy()
+    for s in range(1, len(slots)):
+        total = scores[:, None] + slots[s][1][None, :]
+        for j in range(s):
+            total += pairwise[(j, s)][beams[:, j]]
+        flat = total.ravel()
+        keep = min(beam_width, flat.size)
+        best = np.argpartition(-flat, keep - 1)[:keep]
+        rows, cols = np.divmod(best, total.shape[1])
+        beams = np.hstack([beams[rows], cols[:, None]])
+        scores = flat[best]
+
+    order = np.argsort(-scores, kind='stable')[:top_k]
+    return [
+        ([int(features['ids'][slots[s][0][beams[b, s]]]) for s in range(len(slots))], float(scores[b]))
+        for b in order
+    ]
+
+
+def pick_outfit(outfits, rng=None):
+    """Samples one of the top outfits, favouring higher scores, so repeated calls vary"""
+    rng = rng or np.random.default_rng()
+    scores = np.array([score for _, score in outfits], dtype=np.float64)
+    weights = np.exp(scores - scores.max())
+    return outfits[rng.choice(len(outfits), p=weights / weights.sum())]
+
+
+def is_hijab_friendly(features, item_ids):
+    positions = np.flatnonzero(np.isin(features['ids'], item_ids))
+    return bool(len(positions)) and bool(features['modest'][positions].all())
+
+
+def create_outfit_for(user_id, season=None, cached=True):
+    """Generates outfits for the user, saves one of the best and returns (outfit, score)"""
+    modest = UserProfile.objects.filter(user_id=user_id, modesty_preference='Hijab-Friendly').exists()
+    features = get_features(user_id) if cached else load_features(user_id)
+    item_ids, score = pick_outfit(generate_outfits(features, season=season, modest=modest))
+    with transaction.atomic():
+        # Items deleted since the features were read are left out, and the rest
+        # are locked so they cannot go before the outfit links them
+        item_ids = list(
+            Wardrobe.objects.select_for_update().filter(user_id=user_id, id__in=item_ids).values_list('id', flat=True)
+        )
+        if not item_ids:
+            raise NotEnoughItems("The selected items were deleted")
+        outfit = Outfit.objects.create(
+            user_id=user_id,
+            type='AI-generated',
+            is_hijab_friendly=is_hijab_friendly(features, item_ids),
+        )
+        outfit.selected_items.set(item_ids)
+    return outfit, score
+
+
+@jobs.task('generate_outfit')
+def generate_outfit_job(user_id, season=None):
+    # Jobs can run long after they were queued, and one read of the wardrobe costs
+    # little next to the search, so the worker builds the features afresh
+    try:
+        outfit, score = create_outfit_for(user_id, season, cached=False)
+    except NotEnoughItems as e:
+        raise jobs.JobFailed(str(e))
+    return {'outfit_id': outfit.id, 'score': round(score, 3)}
@@ -0,0 +1,82 @@
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(created_at, pk):
+    """Encodes a (created_at, id) position as an opaque URL-safe token"""
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Decodes a token produced by encode_cursor back into (created_at, id)"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+# Helpers read request.GET so they serve both DRF requests and the plain
+# Django requests of the async views.
+
+
+def get_page_size(request):
+    """Reads ?page_size= and clamps it to FEED_MAX_PAGE_SIZE"""
+    try:
+        size = int(request.GET.get("page_size", settings.FEED_PAGE_SIZE))
+    except ValueError:
+        size = settings.FEED_PAGE_SIZE
+    return max(1, min(size, settings.FEED_MAX_PAGE_SIZE))
+
+
+def keyset_filter(cursor, date_field="created_at", id_field="id"):
+    """Q object selecting rows strictly after `cursor` in (date, id) DESC order"""
+    created_at, pk = cursor
+    return Q(**{f"{date_field}__lt": created_at}) | Q(**{date_field: created_at, f"{id_field}__lt": pk})
+
+
+def keyset_page(queryset, request):
+    """The sliced queryset for one page (plus one extra row) and the page size"""
+    page_size = get_page_size(request)
+    cursor = request.GET.get("cursor")
+    if cursor:
+        queryset = queryset.filter(keyset_filter(decode_cursor(cursor)))
+    # Fetch one extra row to know whether another page exists
+    return queryset.order_by("-created_at", "-id")[:page_size + 1], page_size
+
+
+def split_page(items, page_size):
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+    return items, next_cursor
+
+
+def paginate_keyset(queryset, request):
+    """
+    Applies keyset pagination on (created_at, id) DESC.
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    page, page_size = keyset_page(queryset, request)
+    return split_page(list(page), page_size)
+
+
+async def apaginate_keyset(queryset, request):
+    """Async paginate_keyset, for the async views"""
+    page, page_size = keyset_page(queryset, request)
+    return split_page([item async for item in page], page_size)
+
+
+def with_feed_relations(queryset):
+    """Loads everything PostSerializer touches in a fixed number of queries"""
+    return queryset.select_related("user", "outfit").prefetch_related("outfit__selected_items")
@@ -2,23 +2,55 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import (
     UserProfile, Category, SubCategory, Wardrobe, Outfit, 
-    OutfitPlanner, Post, Like, Follow
+    OutfitPlanner, Post, Like, Follow, FollowSuggestion
 )
+from .fieldsets import ShapedSerializerMixin
+from .taxonomy import taxonomy_with
+
+class DerivativeImageMixin:
+    """
+    Drops the original upload fields when the object is rendered inside a list,
+    so list endpoints only ever point clients at the thumb/medium renditions.
+    """
+    original_image_fields = ()
+
+    @property
+    def _readable_fields(self):
+        # Skipped before rendering, so list querysets can leave the originals unloaded
+        skipped = self.original_image_fields if self.in_list() else ()
+        for field in super()._readable_fields:
+            if field.field_name not in skipped:
+                yield field
+
+    def in_list(self):
+        node = self.parent
+        while node is not None:
+            if isinstance(node, serializers.ListSerializer):
+                return True
+            node = node.parent
+        return False
+
 
 # ✅ User Serializer
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email']
 
 
 # ✅ User Profile Serializer
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(DerivativeImageMixin, serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
+    original_image_fields = ["profile_picture"]
     
     class Meta:
         model = UserProfile
-        fields = ["username", "gender", "modesty_preference", "profile_picture", "bio", "location"]
+        fields = [
+            "username", "gender", "modesty_preference",
+            "profile_picture", "profile_picture_thumb", "profile_picture_medium", "bio", "location",
+            "followers_count", "following_count", "posts_count"
+        ]
+        read_only_fields = ["followers_count", "following_count", "posts_count"]
 
 
 # ✅ Category Serializer
@@ -39,11 +71,27 @@ class SubCategorySerializer(serializers.ModelSerializer):
         fields = ["id", "name", "category_id", "category_name"]
 
 
+# ✅ Cached taxonomy fields (same output as CategorySerializer / SubCategorySerializer, no joins;
+# shaped requests get the plain id unless they expand the field)
+class CachedCategoryField(serializers.ReadOnlyField):
+    expandable = True
+
+    def to_representation(self, value):
+        return taxonomy_with('categories', value).category(value)
+
+
+class CachedSubCategoryField(serializers.ReadOnlyField):
+    expandable = True
+
+    def to_representation(self, value):
+        return taxonomy_with('subcategories', value).subcategory(value)
+
+
 # ✅ Wardrobe Serializer
-class WardrobeSerializer(serializers.ModelSerializer):
+class WardrobeSerializer(ShapedSerializerMixin, DerivativeImageMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
-    category = CategorySerializer(read_only=True)
-    subcategory = SubCategorySerializer(read_only=True)
+    category = CachedCategoryField(source="category_id")
+    subcategory = CachedSubCategoryField(source="subcategory_id")
 
     # Keep PrimaryKeyRelatedField for write operations
     category_id = serializers.PrimaryKeyRelatedField(
@@ -52,6 +100,7 @@ class WardrobeSerializer(serializers.ModelSerializer):
     subcategory_id = serializers.PrimaryKeyRelatedField(
         queryset=SubCategory.objects.all(), source="subcategory", write_only=True, allow_null=True, required=False
     )
+    original_image_fields = ["photo_path"]
 
     class Meta:
         model = Wardrobe
@@ -59,7 +108,8 @@ class WardrobeSerializer(serializers.ModelSerializer):
             "id", "user", 
             "category", "category_id", 
             "subcategory", "subcategory_id",
-            "color", "size", "material", "season", "tags", "photo_path"
+            "color", "size", "material", "season", "tags",
+            "photo_path", "photo_path_thumb", "photo_path_medium"
         ]
         read_only_fields = ["user", "category", "subcategory"]
 
@@ -68,8 +118,29 @@ class WardrobeSerializer(serializers.ModelSerializer):
         return data
 
 
+# ✅ Wardrobe Batch Item Serializer (validates one entry of a batch upload)
+class WardrobeBatchItemSerializer(serializers.ModelSerializer):
+    """Validates taxonomy ids against the cached taxonomy instead of querying once per item"""
+    category_id = serializers.IntegerField(required=False, allow_null=True)
+    subcategory_id = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Wardrobe
+        fields = ["category_id", "subcategory_id", "color", "size", "material", "season", "tags", "photo_path"]
+
+    def validate_category_id(self, value):
+        if value is not None and value not in taxonomy_with('categories', value).categories:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
+
+    def validate_subcategory_id(self, value):
+        if value is not None and value not in taxonomy_with('subcategories', value).subcategories:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
+
+
 # ✅ Outfit Serializer
-class OutfitSerializer(serializers.ModelSerializer):
+class OutfitSerializer(ShapedSerializerMixin, DerivativeImageMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
     selected_items = WardrobeSerializer(many=True, read_only=True)
     selected_item_ids = serializers.PrimaryKeyRelatedField(
@@ -78,10 +149,14 @@ class OutfitSerializer(serializers.ModelSerializer):
         write_only=True, 
         source='selected_items'
     )
+    original_image_fields = ["photo_path"]
 
     class Meta:
         model = Outfit
-        fields = ["id", "user", "type", "selected_items", "selected_item_ids", "is_hijab_friendly", "description", "photo_path"]
+        fields = [
+            "id", "user", "type", "selected_items", "selected_item_ids", "is_hijab_friendly", "description",
+            "photo_path", "photo_path_thumb", "photo_path_medium"
+        ]
         read_only_fields = ["user", "selected_items"]
 
     def __init__(self, *args, **kwargs):
@@ -93,7 +168,7 @@ class OutfitSerializer(serializers.ModelSerializer):
 
 
 # ✅ OutfitPlanner Serializer
-class OutfitPlannerSerializer(serializers.ModelSerializer):
+class OutfitPlannerSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
     outfit = OutfitSerializer(read_only=True)
     outfit_id = serializers.PrimaryKeyRelatedField(
@@ -106,7 +181,7 @@ class OutfitPlannerSerializer(serializers.ModelSerializer):
 
 
 # ✅ Post Serializer
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     outfit = OutfitSerializer(read_only=True)
     outfit_id = serializers.PrimaryKeyRelatedField(
@@ -115,7 +190,8 @@ class PostSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Post
-        fields = ['id', 'user', 'outfit', 'outfit_id', 'caption', 'created_at']
+        fields = ['id', 'user', 'outfit', 'outfit_id', 'caption', 'image_thumb', 'image_medium', 'created_at', 'likes_count']
+        read_only_fields = ['likes_count']
 
 
 # ✅ Like Serializer
@@ -142,3 +218,20 @@ class FollowSerializer(serializers.ModelSerializer):
     class Meta:
         model = Follow
         fields = ['id', 'follower', 'following', 'following_id', 'created_at']
+
+
+# ✅ Suggested User Serializer (someone else's account: no email)
+class SuggestedUserSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username']
+
+
+# ✅ Follow Suggestion Serializer
+class FollowSuggestionSerializer(serializers.ModelSerializer):
+    user = SuggestedUserSerializer(source='suggested', read_only=True)
+    profile_picture_thumb = serializers.ImageField(source='suggested.profile.profile_picture_thumb', read_only=True)
+
+    class Meta:
+        model = FollowSuggestion
+        fields = ['user', 'profile_picture_thumb', 'score', 'mutual_follows', 'mutual_likes']
@@ -0,0 +1,137 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.db import models, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .authentication import revoke_tokens, revoke_user_tokens
+from .images import derivatives_built
+from .models import Category, Outfit, OutfitPlanner, Post, SubCategory, UploadSession, UserProfile, Wardrobe
+from .similarity import get_index
+from .storage import release_files
+from .sync import deleted_with_user, record_tombstone
+from .tags import sync_wardrobe_tags
+from .taxonomy import invalidate as invalidate_taxonomy
+from .versions import bump_global_version, bump_version
+
+
+@receiver(post_save, sender=Wardrobe)
+def wardrobe_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'tags' in update_fields:
+        sync_wardrobe_tags([instance])
+
+
+@receiver(post_delete, sender=Wardrobe)
+def wardrobe_deleted(sender, instance, **kwargs):
+    get_index().remove(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Wardrobe)
+@receiver([post_save, post_delete], sender=Outfit)
+@receiver([post_save, post_delete], sender=OutfitPlanner)
+def user_data_changed(sender, instance, **kwargs):
+    bump_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Outfit.selected_items.through)
+def outfit_items_changed(sender, instance, action, reverse, **kwargs):
+    if action.startswith('post_') and not reverse:
+        bump_version(instance.user_id)
+        # update() skips auto_now; item lists are part of the synced outfit
+        Outfit.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=Wardrobe)
+def wardrobe_deleting(sender, instance, origin=None, **kwargs):
+    # The through rows go without m2m_changed; mark the outfits that lose this item as changed
+    if origin is None or not deleted_with_user(origin):
+        Outfit.objects.filter(selected_items=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Wardrobe)
+@receiver(post_delete, sender=Outfit)
+@receiver(post_delete, sender=OutfitPlanner)
+def synced_row_deleted(sender, instance, origin=None, **kwargs):
+    record_tombstone(instance, origin)
+
+
+@receiver(derivatives_built)
+def derivatives_changed(sender, pk, **kwargs):
+    if sender in (Wardrobe, Outfit):
+        user_id = sender.objects.filter(pk=pk).values_list('user_id', flat=True).first()
+        if user_id is not None:
+            bump_version(user_id)
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=SubCategory)
+def taxonomy_changed(sender, **kwargs):
+    invalidate_taxonomy()
+    bump_global_version()
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    revoke_tokens([instance.key])
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields=None, **kwargs):
+    if instance.pk and (update_fields is None or 'password' in update_fields):
+        stored = User.objects.filter(pk=instance.pk).values_list('password', flat=True).first()
+        instance._password_changed = stored is not None and stored != instance.password
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    if getattr(instance, '_password_changed', False):
+        # Sessions end with the old password; token_deleted revokes the cached lookups
+        Token.objects.filter(user=instance).delete()
+    else:
+        # is_active, username and the rest are baked into cached lookups
+        revoke_user_tokens(instance.pk)
+
+
+# Reference counts of content-addressed media (see storage.py)
+FILE_MODELS = (UserProfile, Wardrobe, Outfit, Post, UploadSession)
+
+
+def file_fields(model):
+    return [field for field in model._meta.concrete_fields if isinstance(field, models.FileField)]
+
+
+def release_on_commit(names, storage):
+    names = [name for name in names if name]
+    if names:
+        transaction.on_commit(lambda: release_files(names, storage))
+
+
+def file_row_saving(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None:
+        return
+    fields = [field for field in file_fields(sender) if update_fields is None or field.name in update_fields]
+    if fields and getattr(fields[0].storage, 'reference_counted', False):
+        instance._stored_files = sender.objects.filter(pk=instance.pk).values(*[field.attname for field in fields]).first() or {}
+
+
+def file_row_saved(sender, instance, **kwargs):
+    stored = getattr(instance, '_stored_files', None)
+    if stored:
+        del instance._stored_files
+        replaced = [name for attname, name in stored.items() if name != getattr(instance, attname).name]
+        release_on_commit(replaced, file_fields(sender)[0].storage)
+
+
+def file_row_deleted(sender, instance, **kwargs):
+    fields = file_fields(sender)
+    release_on_commit([getattr(instance, field.attname).name for field in fields], fields[0].storage)
+
+
+# Per model rather than for every sender, so deletes elsewhere stay fast (no row-by-row collection)
+for model in FILE_MODELS:
+    pre_save.connect(file_row_saving, sender=model)
+    post_save.connect(file_row_saved, sender=model)
+    post_delete.connect(file_row_deleted, sender=model)
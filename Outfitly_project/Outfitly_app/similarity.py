@@ -0,0 +1,313 @@
+import fcntl
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .images import get_executor
+from .models import Wardrobe
+
+logger = logging.getLogger(__name__)
+
+# Embedding layout: 12 hue bins + 4 gray-level bins for low-saturation pixels,
+# followed by a 4x4 grid of mean edge strength
+HUE_BINS = 12
+GRAY_BINS = 4
+EDGE_GRID = 4
+DIMENSIONS = HUE_BINS + GRAY_BINS + EDGE_GRID * EDGE_GRID
+
+# Per-row metadata columns stored next to the vectors
+ITEM, OWNER, PUBLIC, CLUSTER = 0, 1, 2, 3
+META_COLUMNS = 4
+
+# Rows appended since the inverted lists were last built are scanned directly;
+# past this many the lists are rebuilt
+MAX_UNLISTED_ROWS = 20_000
+
+
+def embed_image(image):
+    """Compact CPU-only embedding of a PIL image: color histogram + downsampled edge map"""
+    image = ImageOps.exif_transpose(image).convert('RGB')
+
+    hsv = np.asarray(image.resize((64, 64)).convert('HSV'), dtype=np.float32) / 255.0
+    hue, saturation, value = hsv[..., 0].ravel(), hsv[..., 1].ravel(), hsv[..., 2].ravel()
+    colorful = saturation >= 0.2
+    color = np.concatenate([
+        np.bincount((hue[colorful] * HUE_BINS).astype(int) % HUE_BINS, minlength=HUE_BINS),
+        np.bincount(np.minimum((value[~colorful] * GRAY_BINS).astype(int), GRAY_BINS - 1), minlength=GRAY_BINS),
+    ]).astype(np.float32)
+
+    gray = np.asarray(image.resize((32, 32)).convert('L'), dtype=np.float32) / 255.0
+    gx = np.abs(np.diff(gray, axis=1))[:-1, :]
+    gy = np.abs(np.diff(gray, axis=0))[:, :-1]
+    magnitude = np.pad(np.hypot(gx, gy), ((0, 1), (0, 1)))
+    cell = magnitude.shape[0] // EDGE_GRID
+    edges = magnitude.reshape(EDGE_GRID, cell, EDGE_GRID, cell).mean(axis=(1, 3)).ravel()
+
+    parts = [part / (np.linalg.norm(part) or 1.0) for part in (color, edges)]
+    vector = np.concatenate(parts).astype(np.float32)
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+
+def nearest_centroids(vectors, centroids, chunk_size=65536):
+    """Index of the most similar centroid for every row, computed in chunks"""
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = np.asarray(vectors[start:start + chunk_size])
+        assignments[start:start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(sample, clusters, iterations=10, seed=0):
+    """Spherical k-means over a sample of unit vectors"""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = nearest_centroids(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        empty = np.linalg.norm(sums, axis=1) == 0
+        # Re-seed empty clusters with random sample rows
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+    return centroids.astype(np.float32)
+
+
+class SimilarityIndex:
+    """
+    Append-only float32 matrix of embeddings, memory-mapped from disk, plus an
+    int64 (item id, owner id, public flag, cluster) row per vector. Rows are
+    updated in place when an item's photo changes; deleted items get item id -1.
+    Writers serialize on a file lock, readers never block.
+
+    Once centroids are trained, cross-wardrobe searches only score the rows in
+    the `nprobe` clusters closest to the query instead of the whole matrix.
+    """
+
+    def __init__(self, directory, nprobe=16):
+        self.directory = str(directory)
+        self.nprobe = nprobe
+        self.vectors_path = os.path.join(self.directory, 'vectors.f32')
+        self.meta_path = os.path.join(self.directory, 'meta.i64')
+        self.centroids_path = os.path.join(self.directory, 'centroids.f32')
+        self.lock_path = os.path.join(self.directory, 'index.lock')
+        self._mapped = None
+        self._mapped_rows = -1
+        self._centroids = None
+        self._centroids_mtime = None
+        self._lists = None
+        self._thread_lock = threading.Lock()
+
+    def _row_count(self):
+        try:
+            return min(
+                os.path.getsize(self.vectors_path) // (DIMENSIONS * 4),
+                os.path.getsize(self.meta_path) // (META_COLUMNS * 8),
+            )
+        except FileNotFoundError:
+            return 0
+
+    def _load_centroids(self):
+        try:
+            mtime = os.path.getmtime(self.centroids_path)
+        except FileNotFoundError:
+            self._centroids, self._centroids_mtime, self._lists = None, None, None
+            return
+        if mtime != self._centroids_mtime:
+            self._centroids = np.fromfile(self.centroids_path, dtype=np.float32).reshape(-1, DIMENSIONS)
+            self._centroids_mtime = mtime
+            self._lists = None
+
+    def _build_lists(self, meta):
+        """Groups row numbers by cluster: rows of cluster c are order[bounds[c]:bounds[c + 1]]"""
+        clusters = np.array(meta[:, CLUSTER])
+        order = np.argsort(clusters, kind='stable')
+        bounds = np.searchsorted(clusters[order], np.arange(len(self._centroids) + 1))
+        # Rows with cluster -1 (indexed before training) sort first and are always scanned
+        self._lists = (order, bounds, order[:bounds[0]], len(meta))
+
+    def _open(self):
+        """Returns (vectors, meta, centroids, lists), remapping only when rows were appended"""
+        rows = self._row_count()
+        with self._thread_lock:
+            if rows != self._mapped_rows:
+                if rows == 0:
+                    self._mapped = (np.zeros((0, DIMENSIONS), np.float32), np.zeros((0, META_COLUMNS), np.int64))
+                else:
+                    self._mapped = (
+                        np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(rows, DIMENSIONS)),
+                        np.memmap(self.meta_path, dtype=np.int64, mode='r', shape=(rows, META_COLUMNS)),
+                    )
+                self._mapped_rows = rows
+            self._load_centroids()
+            vectors, meta = self._mapped
+            if self._centroids is not None and (self._lists is None or rows - self._lists[3] > MAX_UNLISTED_ROWS):
+                self._build_lists(meta)
+            return vectors, meta, self._centroids, self._lists
+
+    @contextmanager
+    def _writing(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                rows = self._row_count()
+                if rows:
+                    yield (
+                        np.memmap(self.vectors_path, dtype=np.float32, mode='r+', shape=(rows, DIMENSIONS)),
+                        np.memmap(self.meta_path, dtype=np.int64, mode='r+', shape=(rows, META_COLUMNS)),
+                    )
+                else:
+                    yield None, None
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def upsert(self, item_id, owner_id, vector, public=False):
+        with self._thread_lock:
+            self._load_centroids()
+            centroids = self._centroids
+        cluster = int(np.argmax(centroids @ vector)) if centroids is not None else -1
+
+        with self._writing() as (vectors, meta):
+            rows = np.flatnonzero(meta[:, ITEM] == item_id) if meta is not None else []
+            if len(rows):
+                vectors[rows[0]] = vector
+                meta[rows[0]] = [item_id, owner_id, int(public), cluster]
+                vectors.flush()
+                meta.flush()
+                return
+            # Vectors are appended before metadata so readers never see a row without its vector
+            with open(self.vectors_path, 'ab') as f:
+                f.write(np.asarray(vector, dtype=np.float32).tobytes())
+            with open(self.meta_path, 'ab') as f:
+                f.write(np.array([item_id, owner_id, int(public), cluster], dtype=np.int64).tobytes())
+
+    def remove(self, item_id):
+        if not self._row_count():
+            return
+        with self._writing() as (_, meta):
+            if meta is not None:
+                meta[meta[:, ITEM] == item_id, ITEM] = -1
+                meta.flush()
+
+    def set_public(self, item_ids, public=True):
+        if not self._row_count():
+            return
+        with self._writing() as (_, meta):
+            if meta is not None:
+                meta[np.isin(meta[:, ITEM], list(item_ids)), PUBLIC] = int(public)
+                meta.flush()
+
+    def train(self, clusters, sample_size=100_000, seed=0):
+        """(Re)trains the coarse centroids and assigns every existing row to one"""
+        with self._writing() as (vectors, meta):
+            if vectors is None:
+                return 0
+            clusters = max(1, min(clusters, len(vectors) // 40))
+            rng = np.random.default_rng(seed)
+            sample_rows = np.sort(rng.choice(len(vectors), min(sample_size, len(vectors)), replace=False))
+            centroids = train_centroids(np.asarray(vectors[sample_rows]), clusters, seed=seed)
+            meta[:, CLUSTER] = nearest_centroids(vectors, centroids)
+            meta.flush()
+            centroids.tofile(self.centroids_path + '.tmp')
+            os.replace(self.centroids_path + '.tmp', self.centroids_path)
+            return clusters
+
+    def vector_for(self, item_id):
+        vectors, meta, _, _ = self._open()
+        rows = np.flatnonzero(meta[:, ITEM] == item_id)
+        return np.array(vectors[rows[0]]) if len(rows) else None
+
+    def candidate_rows(self, query, meta, centroids, lists):
+        """Row numbers worth scoring for a cross-wardrobe query"""
+        if centroids is None:
+            return None  # untrained index: scan everything
+        order, bounds, unassigned, listed = lists
+        nprobe = min(self.nprobe, len(centroids))
+        probe = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+        parts = [order[bounds[c]:bounds[c + 1]] for c in probe]
+        parts += [unassigned, np.arange(listed, len(meta))]
+        # Sorted row numbers keep memmap reads sequential
+        return np.sort(np.concatenate(parts))
+
+    def search(self, vector, k=10, owner_id=None, public_only=False, exclude_id=None):
+        """Top-k (item_id, cosine similarity) pairs, best first"""
+        vectors, meta, centroids, lists = self._open()
+        if owner_id is not None:
+            # A single wardrobe is small: score only its rows
+            rows = np.flatnonzero(meta[:, OWNER] == owner_id)
+        else:
+            rows = self.candidate_rows(vector, meta, centroids, lists)
+
+        if rows is None:
+            scores = vectors @ vector
+            row_meta = meta
+        else:
+            scores = vectors[rows] @ vector
+            row_meta = meta[rows]
+        item_ids = row_meta[:, ITEM]
+        valid = item_ids >= 0
+        if public_only:
+            valid &= row_meta[:, PUBLIC] == 1
+        if exclude_id is not None:
+            valid &= item_ids != exclude_id
+
+        scores = np.where(valid, scores, -np.inf)
+        k = min(k, int(valid.sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(item_ids[i]), float(scores[i])) for i in top]
+
+
+_index = None
+
+
+def get_index():
+    global _index
+    if _index is None or _index.directory != str(settings.SIMILARITY_INDEX_DIR):
+        _index = SimilarityIndex(settings.SIMILARITY_INDEX_DIR, nprobe=settings.SIMILARITY_NPROBE)
+    return _index
+
+
+def is_public(item_id):
+    """Items become public once an outfit containing them is posted to the feed"""
+    return Wardrobe.objects.filter(pk=item_id, outfit_items__posts__isnull=False).exists()
+
+
+def index_item(item_id, owner_id, photo_name):
+    with default_storage.open(photo_name) as photo:
+        vector = embed_image(Image.open(photo))
+    get_index().upsert(item_id, owner_id, vector, public=is_public(item_id))
+
+
+def schedule_embedding(item):
+    """Embeds a wardrobe item's photo on the background pool once the transaction commits"""
+    if not item.photo_path:
+        return
+    item_id, owner_id, photo_name = item.pk, item.user_id, item.photo_path.name
+    transaction.on_commit(lambda: get_executor().submit(_run, index_item, item_id, owner_id, photo_name))
+
+
+def schedule_publish(item_ids):
+    """Flags items as public in the index after the post that shares them commits"""
+    item_ids = list(item_ids)
+    if item_ids:
+        transaction.on_commit(lambda: get_executor().submit(_run, get_index().set_public, item_ids))
+
+
+def _run(fn, *args):
+    close_old_connections()
+    try:
+        fn(*args)
+    except Exception:
+        logger.exception("Similarity index update %s%r failed", fn.__name__, args)
+    finally:
+        close_old_connections()
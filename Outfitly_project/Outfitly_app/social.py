@@ -0,0 +1,37 @@
+from django.db import transaction
+
+from .counters import adjust_likes, adjust_profile
+from .models import Follow, Like
+from .suggestions import request_refresh
+
+# The write halves of the like/follow toggles, shared by the sync views and
+# the async ones (which run them through sync_to_async, as transactions need).
+
+
+def toggle_like(user_id, post_id):
+    """Likes or unlikes a post and keeps likes_count in step. Returns True if it is now liked."""
+    with transaction.atomic():
+        like, created = Like.objects.get_or_create(user_id=user_id, post_id=post_id)
+        if created:
+            adjust_likes(post_id, 1)
+            request_refresh(user_id, post_id)
+        # Only the request that actually removed the row decrements the counter
+        elif Like.objects.filter(pk=like.pk).delete()[0]:
+            adjust_likes(post_id, -1)
+            request_refresh(user_id, post_id)
+    return created
+
+
+def toggle_follow(follower_id, followee_id):
+    """Follows or unfollows an account and keeps both profile counters in step. Returns True if now following."""
+    with transaction.atomic():
+        follow, created = Follow.objects.get_or_create(follower_id=follower_id, following_id=followee_id)
+        if created:
+            delta = 1
+        else:
+            delta = -1 if Follow.objects.filter(pk=follow.pk).delete()[0] else 0
+        if delta:
+            adjust_profile(follower_id, 'following_count', delta)
+            adjust_profile(followee_id, 'followers_count', delta)
+            request_refresh(follower_id)
+    return created
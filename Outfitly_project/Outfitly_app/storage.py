@@ -0,0 +1,103 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+# Uploads are stored once per content: the file is hashed while it streams to a
+# temporary file and then lives at cas/<2>/<2>/<sha256><ext>, whatever model
+# or upload_to it came from. MediaBlob counts the rows that reference each
+# file; delete() drops one reference and removes the file with the last one,
+# holding the row's lock so a save of the same content waits for it and then
+# links the file in again.
+# Names never change meaning, so they are served with immutable cache headers.
+
+CAS_PREFIX = 'cas'
+CHUNK_SIZE = 64 * 1024
+
+
+def blob_name(digest, original_name):
+    extension = os.path.splitext(original_name)[1].lower()[:10]
+    return f'{CAS_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+@deconstructible(path='Outfitly_app.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+    reference_counted = True
+
+    def get_available_name(self, name, max_length=None):
+        # _save picks the final name from the content; identical uploads share it
+        return name
+
+    def _save(self, name, content):
+        from .models import MediaBlob
+
+        temp_dir = self.path(f'{CAS_PREFIX}/tmp')
+        os.makedirs(temp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        handle, temp_path = tempfile.mkstemp(dir=temp_dir)
+        try:
+            with os.fdopen(handle, 'wb') as temp:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    temp.write(chunk)
+                    size += len(chunk)
+
+            final_name = blob_name(digest.hexdigest(), name)
+            # Count the reference before the file is linked in, so a concurrent last
+            # delete() of the same content cannot remove it from under this upload
+            while not MediaBlob.objects.filter(name=final_name).update(refcount=F('refcount') + 1):
+                try:
+                    with transaction.atomic():
+                        MediaBlob.objects.create(name=final_name, digest=digest.hexdigest(), size=size, refcount=1)
+                    break
+                except IntegrityError:
+                    continue  # created by a concurrent save; count this one on it
+
+            # Linked in even when the file exists: it may be the copy a concurrent
+            # last delete() is about to remove, and the content is the same anyway
+            final_path = self.path(final_name)
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, final_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return final_name
+
+    def delete(self, name):
+        """Drops one reference to `name`; the file goes with the last one"""
+        from .models import MediaBlob
+
+        if not name:
+            raise ValueError("The name must be given to delete().")
+        if not name.startswith(f'{CAS_PREFIX}/'):
+            # Files from before the switch are not counted; leave them alone
+            return
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return
+            if blob.refcount > 1:
+                MediaBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - 1)
+                return
+            # Still locked, so a save of this content cannot count itself in before the file is gone
+            blob.delete()
+            self.purge(name)
+
+    def purge(self, name):
+        """Removes the file whatever its references (maintenance commands only)"""
+        super().delete(name)
+
+
+def release_files(names, storage):
+    """Drops one reference per name on a reference-counted storage; a no-op elsewhere"""
+    if getattr(storage, 'reference_counted', False):
+        for name in names:
+            if name:
+                storage.delete(name)
@@ -0,0 +1,92 @@
+import base64
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .bootstrap import serialize_list
+from .models import Outfit, OutfitPlanner, Tombstone, Wardrobe
+from .serializers import OutfitPlannerSerializer, OutfitSerializer, WardrobeSerializer
+
+# Delta sync for the app's offline copy. A sync token is the server time at
+# which the previous sync read the database, minus SYNC_OVERLAP_SECONDS so
+# rows saved by transactions that were still open at the time are picked up
+# by the next sync. Clients upsert by id, so seeing a row twice is harmless.
+# Deleted rows leave a Tombstone, which is kept for SYNC_TOMBSTONE_RETENTION_DAYS.
+# Older tokens cannot be answered and get a full-resync response.
+
+# Payload key -> (model, serializer, tombstone kind)
+SYNCED = {
+    'wardrobe': (Wardrobe, WardrobeSerializer, 'wardrobe'),
+    'outfits': (Outfit, OutfitSerializer, 'outfit'),
+    'plans': (OutfitPlanner, OutfitPlannerSerializer, 'plan'),
+}
+
+TOMBSTONE_KINDS = {model: kind for model, _, kind in SYNCED.values()}
+
+
+class InvalidSyncToken(Exception):
+    pass
+
+
+class SyncTokenExpired(Exception):
+    pass
+
+
+def encode_token(moment):
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        moment = datetime.fromisoformat(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidSyncToken("Invalid sync token")
+    if timezone.is_naive(moment):
+        raise InvalidSyncToken("Invalid sync token")
+    return moment
+
+
+def retention_cutoff():
+    return timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+
+
+def changes_since(user, token=None):
+    """
+    Rows of `user` created or changed since `token`, plus the ids deleted since
+    then, and the token for the next call. Without a token every row is returned.
+    """
+    next_token = encode_token(timezone.now() - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS))
+    since = decode_token(token) if token else None
+    if since is not None and since < retention_cutoff():
+        raise SyncTokenExpired("Sync token is older than the tombstone retention window")
+
+    payload = {'token': next_token, 'full': since is None}
+    for key, (model, serializer_class, _) in SYNCED.items():
+        rows = model.objects.filter(user=user)
+        if since is not None:
+            rows = rows.filter(updated_at__gte=since)
+        payload[key] = serialize_list(serializer_class, rows.order_by('updated_at', 'id'))
+
+    deleted = {key: [] for key in SYNCED}
+    if since is not None:
+        keys = {kind: key for key, (_, _, kind) in SYNCED.items()}
+        tombstones = Tombstone.objects.filter(user=user, deleted_at__gte=since).order_by('deleted_at', 'id')
+        for kind, object_id in tombstones.values_list('kind', 'object_id'):
+            deleted[keys[kind]].append(object_id)
+    payload['deleted'] = deleted
+    return payload
+
+
+def deleted_with_user(origin):
+    """Whether a delete cascaded from the owning user, whose tombstones would go with them"""
+    model = getattr(origin, 'model', type(origin))
+    return model is User
+
+
+def record_tombstone(instance, origin=None):
+    if origin is not None and deleted_with_user(origin):
+        return
+    Tombstone.objects.create(user_id=instance.user_id, kind=TOMBSTONE_KINDS[type(instance)], object_id=instance.pk)
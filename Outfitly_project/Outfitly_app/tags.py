@@ -0,0 +1,33 @@
+import re
+
+from .models import Tag, WardrobeTag
+
+MAX_TAG_LENGTH = 50
+
+
+def normalize_tags(text):
+    """Splits free-text tags on , ; or # into a sorted list of unique lowercase tags"""
+    tags = set()
+    for tag in re.split(r'[,;#]+', text or ''):
+        tag = ' '.join(tag.split()).lower()[:MAX_TAG_LENGTH]
+        if tag:
+            tags.add(tag)
+    return sorted(tags)
+
+
+def sync_wardrobe_tags(items):
+    """Rewrites the WardrobeTag rows of the given items from their `tags` text"""
+    wanted = {item.pk: normalize_tags(item.tags) for item in items}
+    names = set().union(*wanted.values())
+
+    tags = Tag.objects.in_bulk(names, field_name='name')
+    missing = names - tags.keys()
+    if missing:
+        Tag.objects.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+        tags = Tag.objects.in_bulk(names, field_name='name')
+
+    WardrobeTag.objects.filter(wardrobe_id__in=wanted.keys()).delete()
+    WardrobeTag.objects.bulk_create([
+        WardrobeTag(wardrobe_id=item.pk, user_id=item.user_id, tag=tags[name])
+        for item in items for name in wanted[item.pk]
+    ])
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Category, SubCategory
+
+# Categories and subcategories are loaded once per process and served from
+# memory. Saves and deletes drop the local copy, and a version stamp in the
+# shared TAXONOMY_CACHE_ALIAS cache tells other workers to reload too. A copy is
+# reloaded after TAXONOMY_TTL regardless, and an id it lacks is looked up in the
+# database before being rejected, in case the stamp has not been seen yet.
+
+SHARED_VERSION_KEY = 'taxonomy:version'
+
+
+class Taxonomy:
+    def __init__(self, categories, subcategories, shared_version=None):
+        self.categories = {row['id']: row for row in categories}
+        self.subcategories = {}
+        for row in subcategories:
+            category = self.categories.get(row['category_id'])
+            self.subcategories[row['id']] = {
+                'id': row['id'],
+                'name': row['name'],
+                'category_id': row['category_id'],
+                'category_name': category['name'] if category else None,
+            }
+        self.tree = [
+            {
+                **category,
+                'subcategories': [
+                    {'id': sub['id'], 'name': sub['name']}
+                    for sub in self.subcategories.values() if sub['category_id'] == category['id']
+                ],
+            }
+            for category in self.categories.values()
+        ]
+        self.etag = '"%s"' % hashlib.md5(json.dumps(self.tree, sort_keys=True).encode()).hexdigest()
+        self.shared_version = shared_version
+        self.loaded_at = self.checked_at = time.monotonic()
+
+    def category(self, category_id):
+        row = self.categories.get(category_id)
+        return dict(row) if row else None
+
+    def subcategory(self, subcategory_id):
+        row = self.subcategories.get(subcategory_id)
+        return dict(row) if row else None
+
+    def subcategories_of(self, category_id):
+        return [dict(row) for row in self.subcategories.values() if row['category_id'] == category_id]
+
+
+_taxonomy = None
+_lock = threading.Lock()
+
+
+def shared_cache():
+    alias = getattr(settings, 'TAXONOMY_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def shared_version():
+    cache = shared_cache()
+    if cache is None:
+        return None
+    return cache.get_or_set(SHARED_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def is_current(taxonomy):
+    if time.monotonic() - taxonomy.loaded_at >= settings.TAXONOMY_TTL:
+        return False
+    if shared_cache() is None:
+        return True
+    if time.monotonic() - taxonomy.checked_at < settings.TAXONOMY_CHECK_INTERVAL:
+        return True
+    if shared_version() != taxonomy.shared_version:
+        return False
+    taxonomy.checked_at = time.monotonic()
+    return True
+
+
+def load():
+    # Read the stamp first so a change landing during the load triggers another one
+    version = shared_version()
+    categories = list(Category.objects.order_by('id').values('id', 'name'))
+    subcategories = list(SubCategory.objects.order_by('id').values('id', 'name', 'category_id'))
+    return Taxonomy(categories, subcategories, version)
+
+
+def get_taxonomy():
+    global _taxonomy
+    taxonomy = _taxonomy
+    if taxonomy is not None and is_current(taxonomy):
+        return taxonomy
+    with _lock:
+        if _taxonomy is None or not is_current(_taxonomy):
+            _taxonomy = load()
+        return _taxonomy
+
+
+def taxonomy_with(kind, pk):
+    """
+    The taxonomy, reloaded first if `pk` is missing from `kind` ('categories' or
+    'subcategories') but exists in the database, e.g. one just added elsewhere.
+    """
+    global _taxonomy
+    taxonomy = get_taxonomy()
+    if pk is None or pk in getattr(taxonomy, kind):
+        return taxonomy
+    model = Category if kind == 'categories' else SubCategory
+    if not model.objects.filter(pk=pk).exists():
+        return taxonomy
+    with _lock:
+        if pk not in getattr(_taxonomy, kind):
+            _taxonomy = load()
+        return _taxonomy
+
+
+def invalidate():
+    def drop():
+        global _taxonomy
+        _taxonomy = None
+        cache = shared_cache()
+        if cache is not None:
+            cache.set(SHARED_VERSION_KEY, uuid.uuid4().hex, None)
+    transaction.on_commit(drop)
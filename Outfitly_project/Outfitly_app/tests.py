@@ -1,3 +1,1278 @@
-from django.test import TestCase
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+from collections import Counter, OrderedDict
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+import numpy as np
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import authentication, jobs, outfit_engine, taxonomy
+from .accounts import find_user_by_identifier
+from .checks import check_shared_caches, check_version_cache
+from .counters import adjust_likes, adjust_profile
+from .images import build_derivatives
+from .models import (
+    Category, Follow, FollowSuggestion, Job, Like, MediaBlob, Outfit, OutfitPlanner, Post, SubCategory, SuggestionRefresh,
+    TimelineEntry, Tombstone, UserProfile, Wardrobe,
+)
+from .social import toggle_follow, toggle_like
+from .storage import ContentAddressedStorage
+from .suggestions import build_suggestions
+from .sync import encode_token
+from .timeline import fan_out_post, trim_timelines
+
+# Query counts are asserted against a cache that is not a database table, as with Redis
+LOCAL_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def use_temporary_media(test):
+    """Points MEDIA_ROOT and UPLOAD_SESSION_DIR at a directory removed after `test`"""
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    paths = override_settings(
+        MEDIA_ROOT=os.path.join(directory.name, 'media'),
+        UPLOAD_SESSION_DIR=os.path.join(directory.name, 'uploads'),
+    )
+    paths.enable()
+    test.addCleanup(paths.disable)
+
+
+def png_bytes(size=(64, 64), color='teal'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+# ✅ Query plan checks for per-user hot queries
+class HotQueryIndexTests(TestCase):
+    """Fails if any hot query would be answered by a sequential/full table scan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='planner', email='planner@example.com', password='Pass123!')
+        cls.other = User.objects.create_user(username='other', email='other@example.com', password='Pass123!')
+
+    def hot_queries(self):
+        user, other = self.user, self.other
+        return {
+            'wardrobe by user': Wardrobe.objects.filter(user=user),
+            'wardrobe by user and subcategory': Wardrobe.objects.filter(user=user, subcategory_id=1),
+            'outfits by user': Outfit.objects.filter(user=user),
+            'planner by user and date': OutfitPlanner.objects.filter(user=user, date__gte='2025-01-01').order_by('date'),
+            'posts by user, newest first': Post.objects.filter(user_id__in=[other.id]).order_by('-created_at'),
+            'public feed page': Post.objects.order_by('-created_at', '-id')[:21],
+            'timeline page': TimelineEntry.objects.filter(user=user).order_by('-created_at', '-post_id')[:21],
+            'follow lookup': Follow.objects.filter(follower=user, following=other),
+            'like lookup': Like.objects.filter(user=user, post_id=1),
+        }
+
+    def assertNoSequentialScan(self, name, queryset):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables make a seq scan look cheapest; only a missing index should force one
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+            self.assertNotIn('Seq Scan', plan, f"{name} falls back to a sequential scan:\n{plan}")
+        elif connection.vendor == 'sqlite':
+            plan = queryset.explain()
+            full_scans = re.findall(r'\bSCAN \S+$', plan, re.MULTILINE)
+            self.assertFalse(full_scans, f"{name} falls back to a full table scan:\n{plan}")
+        else:
+            self.skipTest(f"No plan check for {connection.vendor}")
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in self.hot_queries().items():
+            with self.subTest(name):
+                self.assertNoSequentialScan(name, queryset)
+
+
+# ✅ Caches every worker must share
+class SharedCacheCheckTests(TestCase):
+    def test_process_local_cache_is_an_error(self):
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=locmem):
+            self.assertEqual([error.id for error in check_shared_caches(None)], ['Outfitly_app.E001'])
+        self.assertEqual(check_shared_caches(None), [])
+
+    def test_database_cache_is_a_warning(self):
+        database = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'outfitly_cache'}}
+        with override_settings(CACHES=database):
+            self.assertEqual([warning.id for warning in check_version_cache(None)], ['Outfitly_app.W001'])
+            self.assertEqual(check_shared_caches(None), [])
+
+
+# ✅ Sparse fieldsets on the list endpoints
+class SparseFieldsetTests(TestCase):
+    """Shapes that reach a to-many relation through a to-one relation whose own fields are not rendered"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='shaper', email='shaper@example.com', password='Pass123!')
+        author = User.objects.create_user(username='author', email='author@example.com', password='Pass123!')
+        Follow.objects.create(follower=cls.user, following=author)
+        tops = Category.objects.create(name='Tops')
+        for owner in (cls.user, author):
+            item = Wardrobe.objects.create(user=owner, category=tops, color='navy', size='M', material='cotton')
+            outfit = Outfit.objects.create(user=owner)
+            outfit.selected_items.set([item])
+        OutfitPlanner.objects.create(user=cls.user, outfit=Outfit.objects.get(user=cls.user), date='2025-06-01')
+        fan_out_post(Post.objects.create(user=author, outfit=Outfit.objects.get(user=author), caption='Look'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.data
+        return data['results'] if isinstance(data, dict) else data
+
+    def assertSelectedItems(self, rows, **expected):
+        self.assertTrue(rows)
+        for row in rows:
+            self.assertEqual(row['outfit']['selected_items'], [expected])
+
+    def test_public_feed(self):
+        self.assertSelectedItems(self.get('/api/feed/posts/?fields=id,outfit.selected_items.color'), color='navy')
+        for row in self.get('/api/feed/posts/?fields=id,outfit.selected_items'):
+            self.assertEqual(len(row['outfit']['selected_items']), 1)
+
+    def test_following_feed(self):
+        self.assertSelectedItems(self.get('/api/feed/following/?fields=id,outfit.selected_items.color'), color='navy')
+
+    def test_planner(self):
+        self.assertSelectedItems(self.get('/api/planner/?fields=id,outfit.selected_items.color'), color='navy')
+        for row in self.get('/api/planner/?fields=id,outfit.selected_items'):
+            self.assertEqual(len(row['outfit']['selected_items']), 1)
+
+    def test_outfits(self):
+        for row in self.get('/api/outfits/?fields=id,selected_items.color'):
+            self.assertEqual(row['selected_items'], [{'color': 'navy'}])
+
+    def test_unknown_paths_are_rejected(self):
+        response = self.client.get('/api/feed/posts/?fields=id,bogus,user.username,outfit.nope&expand=user.missing')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {
+            'fields': ['Unknown field: bogus', 'Unknown field: outfit.nope'],
+            'expand': ['Unknown field: user.missing'],
+        })
+
+
+# ✅ Reference-counted media storage
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = ContentAddressedStorage(location=directory.name)
+
+    def refcount(self, name):
+        return MediaBlob.objects.filter(name=name).values_list('refcount', flat=True).first()
+
+    def test_refcount_round_trip(self):
+        name = self.storage.save('wardrobe/shirt.jpg', ContentFile(b'same bytes'))
+        self.assertEqual(self.storage.save('outfits/copy.JPG', ContentFile(b'same bytes')), name)
+        self.assertEqual(self.refcount(name), 2)
+
+        self.storage.delete(name)
+        self.assertEqual(self.refcount(name), 1)
+        self.assertTrue(self.storage.exists(name))
+
+        self.storage.delete(name)
+        self.assertIsNone(self.refcount(name))
+        self.assertFalse(self.storage.exists(name))
+
+        name = self.storage.save('wardrobe/shirt.jpg', ContentFile(b'same bytes'))
+        self.storage.purge(name)
+        self.assertFalse(self.storage.exists(name))
+        self.assertEqual(self.refcount(name), 1)
+
+    def test_save_relinks_a_file_removed_under_it(self):
+        name = self.storage.save('a.png', ContentFile(b'content'))
+        os.remove(self.storage.path(name))  # as by a concurrent last delete()
+        self.assertEqual(self.storage.save('b.png', ContentFile(b'content')), name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.refcount(name), 2)
+
+
+# ✅ Resumable chunked uploads
+class ResumableUploadTests(TestCase):
+    def setUp(self):
+        use_temporary_media(self)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='uploader', password='Pass123!'))
+        self.content = png_bytes()
+
+    def put_chunk(self, upload_id, first, last):
+        return self.client.generic(
+            'PUT', f'/api/uploads/{upload_id}/', self.content[first:last + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {first}-{last}/{len(self.content)}',
+        )
+
+    def test_out_of_order_chunks_and_checksum_mismatch(self):
+        size = len(self.content)
+        upload = self.client.post('/api/uploads/', {'filename': 'look.png', 'size': size}).data
+        middle = size // 2
+
+        response = self.put_chunk(upload['id'], middle, size - 1)
+        self.assertEqual(response.data['missing'], [[0, middle]])
+        response = self.client.post(f"/api/uploads/{upload['id']}/complete/", {'sha256': hashlib.sha256(self.content).hexdigest()})
+        self.assertEqual(response.status_code, 400)
+        self.put_chunk(upload['id'], 0, middle - 1)
+
+        response = self.client.post(f"/api/uploads/{upload['id']}/complete/", {'sha256': '0' * 64})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Checksum mismatch')
+        self.assertEqual(response.data['status'], 'open')
+
+        # The part file is back in place, so the upload can still be completed
+        response = self.client.post(f"/api/uploads/{upload['id']}/complete/", {'sha256': hashlib.sha256(self.content).hexdigest()})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['status'], 'complete')
+
+        response = self.put_chunk(upload['id'], 0, middle - 1)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Upload is already complete')
+
+
+# ✅ Database job queue
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        tasks = mock.patch.dict(jobs.TASKS, {'tests.flaky': (self.flaky, 2), 'tests.echo': (self.echo, 3)})
+        tasks.start()
+        self.addCleanup(tasks.stop)
+
+    def flaky(self):
+        self.calls.append('flaky')
+        raise RuntimeError('boom')
+
+    def echo(self, value):
+        self.calls.append(value)
+        return {'value': value}
+
+    def test_claim_in_priority_order_once(self):
+        low = jobs.enqueue('tests.echo', {'value': 'low'})
+        high = jobs.enqueue('tests.echo', {'value': 'high'}, priority=5)
+        jobs.enqueue('tests.echo', {'value': 'later'}, delay=60)
+
+        claimed = jobs.claim_jobs('worker-a', limit=5)
+        self.assertEqual([job.id for job in claimed], [high.id, low.id])
+        self.assertEqual(jobs.claim_jobs('worker-b', limit=5), [])
+        for job in claimed:
+            self.assertEqual((job.status, job.locked_by, job.attempts), ('running', 'worker-a', 1))
+            jobs.run_job(job)
+        self.assertEqual(self.calls, ['high', 'low'])
+        self.assertEqual(Job.objects.get(pk=high.pk).result, {'value': 'high'})
+
+    def test_failed_job_retries_with_backoff_then_fails(self):
+        job = jobs.enqueue('tests.flaky')
+        jobs.run_job(jobs.claim_jobs('worker')[0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertEqual(jobs.claim_jobs('worker'), [])
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        jobs.run_job(jobs.claim_jobs('worker')[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertEqual(job.error, 'RuntimeError: boom')
+        self.assertEqual(self.calls, ['flaky', 'flaky'])
+
+    def test_expired_lease_is_requeued_and_the_old_worker_cannot_finish(self):
+        job = jobs.enqueue('tests.echo', {'value': 'x'})
+        orphaned = jobs.claim_jobs('lost-worker')[0]
+        expired = timezone.now() - timedelta(seconds=settings.JOB_LEASE_SECONDS + 1)
+        Job.objects.filter(pk=job.pk).update(locked_at=expired)
+
+        self.assertEqual(jobs.requeue_expired(), 1)
+        reclaimed = jobs.claim_jobs('new-worker')[0]
+        self.assertEqual(reclaimed.attempts, 2)
+        jobs.run_job(orphaned)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ('running', 'new-worker'))
+
+        jobs.run_job(reclaimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+
+
+# ✅ Cursor pagination of the public feed
+@override_settings(CACHES=LOCAL_CACHES)
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader', email='reader@example.com', password='Pass123!')
+        tops = Category.objects.create(name='Tops')
+        same_time = timezone.now()
+        for index in range(12):
+            item = Wardrobe.objects.create(user=cls.user, category=tops, color='navy', size='M', material='cotton')
+            outfit = Outfit.objects.create(user=cls.user)
+            outfit.selected_items.set([item])
+            post = Post.objects.create(user=cls.user, outfit=outfit, caption=f'look {index}')
+            if index < 6:
+                # Ties on created_at are broken by id
+                Post.objects.filter(pk=post.pk).update(created_at=same_time)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def read_all(self, page_size):
+        ids, cursor = [], None
+        while True:
+            params = {'page_size': page_size, **({'cursor': cursor} if cursor else {})}
+            data = self.client.get('/api/feed/posts/', params).data
+            ids += [post['id'] for post in data['results']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_pages_follow_a_stable_order(self):
+        expected = list(Post.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.read_all(page_size=5), expected)
+        self.assertEqual(self.read_all(page_size=12), expected)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/feed/posts/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'Invalid cursor'})
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        with self.assertNumQueries(2):
+            self.client.get('/api/feed/posts/', {'page_size': 2})
+        with self.assertNumQueries(2):
+            self.client.get('/api/feed/posts/', {'page_size': 12})
+
+
+# ✅ Following feed timelines
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.reader, self.author, self.star, self.fan = (
+            User.objects.create_user(username=name, password='Pass123!') for name in ('reader', 'author', 'star', 'fan')
+        )
+        for user in (self.reader, self.author, self.star, self.fan):
+            UserProfile.objects.create(user=user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def post_as(self, user, caption):
+        client = APIClient()
+        client.force_authenticate(user)
+        outfit = Outfit.objects.create(user=user)
+        response = client.post('/api/feed/posts/create/', {'outfit_id': outfit.id, 'caption': caption})
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def follow(self, user, followee):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post(f'/api/feed/follow/{followee.id}/')
+
+    def timeline(self, user):
+        return list(TimelineEntry.objects.filter(user=user).order_by('-created_at', '-post_id').values_list('post_id', flat=True))
+
+    def feed_captions(self, page_size=3):
+        captions, cursor = [], None
+        while True:
+            params = {'page_size': page_size, **({'cursor': cursor} if cursor else {})}
+            data = self.client.get('/api/feed/following/', params).data
+            captions += [post['caption'] for post in data['results']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                return captions
+
+    @override_settings(TIMELINE_BACKFILL_LENGTH=2)
+    def test_follow_backfills_posts_fan_out_and_unfollow_removes_them(self):
+        older = [self.post_as(self.author, f'old {index}') for index in range(3)]
+        self.assertEqual(self.follow(self.reader, self.author).status_code, 201)
+        self.assertEqual(self.timeline(self.reader), [older[2], older[1]])
+
+        new = self.post_as(self.author, 'new')
+        self.assertEqual(self.timeline(self.reader), [new, older[2], older[1]])
+        self.assertEqual(self.timeline(self.fan), [])
+
+        self.assertEqual(self.follow(self.reader, self.author).status_code, 200)
+        self.assertEqual(self.timeline(self.reader), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_high_fanout_posts_are_merged_at_read_time(self):
+        self.follow(self.reader, self.author)
+        self.follow(self.reader, self.star)
+        self.follow(self.fan, self.star)
+        for index in range(3):
+            self.post_as(self.author, f'author {index}')
+            self.post_as(self.star, f'star {index}')
+
+        self.assertFalse(TimelineEntry.objects.filter(post__user=self.star).exists())
+        self.assertEqual(self.feed_captions(), [
+            'star 2', 'author 2', 'star 1', 'author 1', 'star 0', 'author 0',
+        ])
+
+    @override_settings(TIMELINE_MAX_LENGTH=3, TIMELINE_TRIM_SAMPLE=1)
+    def test_fan_out_trims_sampled_timelines(self):
+        self.follow(self.reader, self.author)
+        posts = [self.post_as(self.author, f'look {index}') for index in range(5)]
+        self.assertEqual(self.timeline(self.reader), posts[:1:-1])
+
+    @override_settings(TIMELINE_MAX_LENGTH=3, TIMELINE_TRIM_SAMPLE=0)
+    def test_sweep_trims_unsampled_timelines(self):
+        self.follow(self.reader, self.author)
+        posts = [self.post_as(self.author, f'look {index}') for index in range(5)]
+        self.assertEqual(len(self.timeline(self.reader)), 5)
+        self.assertEqual(trim_timelines(), (1, 2))
+        self.assertEqual(self.timeline(self.reader), posts[:1:-1])
+
+
+# ✅ Denormalized like, follower and post counters
+class CounterTests(TestCase):
+    def setUp(self):
+        self.fan, self.author = (User.objects.create_user(username=name, password='Pass123!') for name in ('fan', 'author'))
+        for user in (self.fan, self.author):
+            UserProfile.objects.create(user=user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.fan)
+        self.post = Post.objects.create(user=self.author, outfit=Outfit.objects.create(user=self.author))
+
+    def profile(self, user):
+        return UserProfile.objects.get(user=user)
+
+    def test_toggles_keep_counters_in_step(self):
+        response = self.client.post(f'/api/feed/posts/{self.post.id}/like/')
+        self.assertEqual((response.status_code, response.data['likes_count']), (201, 1))
+        response = self.client.post(f'/api/feed/posts/{self.post.id}/like/')
+        self.assertEqual((response.status_code, response.data['likes_count']), (200, 0))
+
+        response = self.client.post(f'/api/feed/follow/{self.author.id}/')
+        self.assertEqual((response.data['followers_count'], response.data['following_count']), (1, 1))
+        response = self.client.post(f'/api/feed/follow/{self.author.id}/')
+        self.assertEqual((response.data['followers_count'], response.data['following_count']), (0, 0))
+
+    def test_decrements_never_go_below_zero(self):
+        adjust_likes(self.post.id, -1)
+        adjust_profile(self.author.id, 'followers_count', -1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+        self.assertEqual(self.profile(self.author).followers_count, 0)
+
+        # A like counted before the counter existed: unliking leaves zero, not -1
+        Like.objects.create(user=self.fan, post=self.post)
+        response = self.client.post(f'/api/feed/posts/{self.post.id}/like/')
+        self.assertEqual(response.data['likes_count'], 0)
+
+    def test_reconcile_fixes_drift(self):
+        Like.objects.create(user=self.fan, post=self.post)
+        Follow.objects.create(follower=self.fan, following=self.author)
+        UserProfile.objects.update(followers_count=7, following_count=7, posts_count=7)
+        call_command('reconcile_counters', batch_size=1, stdout=io.StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(
+            (self.profile(self.author).followers_count, self.profile(self.author).posts_count), (1, 1)
+        )
+        self.assertEqual((self.profile(self.fan).following_count, self.profile(self.fan).posts_count), (1, 0))
+
+
+# ✅ Image derivatives
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        use_temporary_media(self)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='stylist', password='Pass123!'))
+
+    def photo(self, color):
+        return SimpleUploadedFile('shirt.png', png_bytes((1200, 800), color), 'image/png')
+
+    def build(self, item):
+        # Renditions are built off the request thread once it commits; build them inline here
+        build_derivatives(Wardrobe, item.pk, 'photo_path', item.photo_path.name)
+        item.refresh_from_db()
+
+    def test_renditions_are_webp_within_their_boxes(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/wardrobe/upload/', {
+                'color': 'red', 'size': 'M', 'material': 'cotton', 'photo_path': self.photo('red'),
+            })
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertTrue(callbacks)
+        item = Wardrobe.objects.get(pk=response.data['id'])
+        self.assertFalse(item.photo_path_thumb)
+
+        self.build(item)
+        for field, size in (('photo_path_thumb', (256, 256)), ('photo_path_medium', (1024, 683))):
+            with Image.open(getattr(item, field).path) as rendition:
+                self.assertEqual((rendition.format, rendition.size), ('WEBP', size))
+        self.assertTrue(self.client.get('/api/wardrobe/').data[0]['photo_path_thumb'])
+
+    def test_replacing_the_photo_clears_its_renditions(self):
+        with self.captureOnCommitCallbacks():
+            response = self.client.post('/api/wardrobe/upload/', {
+                'color': 'red', 'size': 'M', 'material': 'cotton', 'photo_path': self.photo('red'),
+            })
+        item = Wardrobe.objects.get(pk=response.data['id'])
+        self.build(item)
+        old_thumb = item.photo_path_thumb.name
+
+        with self.captureOnCommitCallbacks():
+            response = self.client.put(f'/api/wardrobe/update/{item.pk}/', {'photo_path': self.photo('blue')})
+        self.assertEqual(response.status_code, 200, response.data)
+        item.refresh_from_db()
+        self.assertFalse(item.photo_path_thumb)
+        self.assertFalse(item.photo_path_medium)
+
+        self.build(item)
+        self.assertNotEqual(item.photo_path_thumb.name, old_thumb)
+
+
+# ✅ Streaming wardrobe and outfit exports
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='exporter', password='Pass123!')
+        tops = Category.objects.create(name='Tops')
+        cls.items = [
+            Wardrobe.objects.create(user=cls.user, category=tops, color=color, size='M', material='cotton')
+            for color in ('navy', 'red, "dark"', 'multi\nline')
+        ]
+        cls.outfit = Outfit.objects.create(user=cls.user, description='Work; "smart", casual')
+        cls.outfit.selected_items.set(cls.items[:2])
+        Wardrobe.objects.create(user=User.objects.create_user(username='other', password='Pass123!'), color='x', size='S', material='x')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_has_one_serialized_row_per_line(self):
+        response, body = self.export('/api/wardrobe/export/')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="wardrobe.ndjson"')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [item.id for item in self.items])
+        self.assertEqual([row['color'] for row in rows], ['navy', 'red, "dark"', 'multi\nline'])
+        self.assertEqual(rows[0]['category'], {'id': self.items[0].category_id, 'name': 'Tops'})
+
+    def test_csv_quotes_cells_and_flattens_relations(self):
+        response, body = self.export('/api/outfits/export/', output='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        header, *rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(len(rows), 1)
+        row = dict(zip(header, rows[0]))
+        self.assertEqual(row['description'], 'Work; "smart", casual')
+        self.assertEqual(row['selected_items'], ';'.join(str(item.id) for item in self.items[:2]))
+
+        _, body = self.export('/api/wardrobe/export/', output='csv')
+        header, *rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual([dict(zip(header, row))['color'] for row in rows], ['navy', 'red, "dark"', 'multi\nline'])
+
+    def test_unknown_format_is_rejected(self):
+        self.assertEqual(self.client.get('/api/outfits/export/', {'output': 'xml'}).status_code, 400)
+
+
+# ✅ Batch wardrobe uploads
+@override_settings(CACHES=LOCAL_CACHES)
+class BatchUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='packer', password='Pass123!')
+        cls.tops = Category.objects.create(name='Tops')
+        cls.shirt = SubCategory.objects.create(category=cls.tops, name='Shirt')
+
+    def setUp(self):
+        use_temporary_media(self)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def item(self, **fields):
+        return {'color': 'red', 'size': 'M', 'material': 'cotton', 'category_id': self.tops.id, 'subcategory_id': self.shirt.id, **fields}
+
+    def test_valid_items_are_created_and_invalid_ones_reported_by_index(self):
+        items = [self.item(tags='casual'), 'not an object', self.item(category_id=999), {'size': 'M'}, self.item()]
+        response = self.client.post('/api/wardrobe/upload/batch/', {
+            'items': json.dumps(items), 'photo_4': SimpleUploadedFile('shirt.png', png_bytes(), 'image/png'),
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual([row['index'] for row in response.data['created']], [0, 4])
+        self.assertEqual([row['index'] for row in response.data['errors']], [1, 2, 3])
+        self.assertEqual(response.data['errors'][0]['errors'], {'non_field_errors': ['Expected an object']})
+        self.assertIn('category_id', response.data['errors'][1]['errors'])
+        self.assertEqual(set(response.data['errors'][2]['errors']), {'color', 'material'})
+
+        created = Wardrobe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(created.count(), 2)
+        self.assertFalse(created[0].photo_path)
+        self.assertTrue(created[1].photo_path)
+        self.assertEqual(list(created[0].tag_links.values_list('tag__name', flat=True)), ['casual'])
+
+    def test_only_invalid_items_is_a_400(self):
+        response = self.client.post('/api/wardrobe/upload/batch/', {'items': [{'size': 'M'}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], [])
+        for items in ([], 'not json', [self.item()] * (settings.WARDROBE_BATCH_MAX_ITEMS + 1)):
+            with self.subTest(items=str(items)[:20]):
+                self.assertEqual(self.client.post('/api/wardrobe/upload/batch/', {'items': items}, format='json').status_code, 400)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        self.client.post('/api/wardrobe/upload/batch/', {'items': [self.item(tags='casual')]}, format='json')
+        for size in (3, 12):
+            with self.assertNumQueries(4):
+                response = self.client.post('/api/wardrobe/upload/batch/', {'items': [self.item(tags='casual')] * size}, format='json')
+            self.assertEqual(len(response.data['created']), size)
+
+
+# ✅ Outfit generation engine
+@override_settings(CACHES=LOCAL_CACHES)
+class OutfitEngineTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='dresser', password='Pass123!')
+        self.profile = UserProfile.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tops = Category.objects.create(name='Tops')
+        self.bottoms = Category.objects.create(name='Bottoms')
+        self.tank = SubCategory.objects.create(category=self.tops, name='Tank Top')
+
+    def add(self, category, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Wardrobe.objects.create(user=self.user, category=category, size='M', **{'material': 'cotton', 'color': 'navy', **fields})
+
+    def test_one_item_per_category_favouring_the_season(self):
+        summer_top = self.add(self.tops, season='Summer')
+        self.add(self.tops, season='Winter', color='red')
+        jeans = self.add(self.bottoms, material='denim')
+        self.add(None, color='pink')  # uncategorized items fill no slot
+
+        outfits = outfit_engine.generate_outfits(outfit_engine.load_features(self.user.id), season='Summer')
+        self.assertLessEqual(len(outfits), 5)
+        self.assertEqual(sorted(outfits[0][0]), sorted([summer_top.id, jeans.id]))
+        scores = [score for _, score in outfits]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_modest_users_never_get_flagged_items(self):
+        self.profile.modesty_preference = 'Hijab-Friendly'
+        self.profile.save()
+        self.add(self.tops, subcategory=self.tank)
+        self.add(self.tops, tags='sleeveless, summer')
+        jeans = self.add(self.bottoms, material='denim')
+        self.assertEqual(self.client.post('/api/outfits/ai-generate/').status_code, 400)
+
+        blouse = self.add(self.tops, color='white')
+        response = self.client.post('/api/outfits/ai-generate/')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(sorted(item['id'] for item in response.data['selected_items']), sorted([blouse.id, jeans.id]))
+        self.assertTrue(response.data['is_hijab_friendly'])
+        self.assertEqual(response.data['type'], 'AI-generated')
+
+    def test_invalid_requests(self):
+        self.add(self.tops)
+        response = self.client.post('/api/outfits/ai-generate/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Need items from at least two categories to build an outfit')
+        self.assertEqual(self.client.post('/api/outfits/ai-generate/', {'season': 'Monsoon'}).status_code, 400)
+
+    def test_cached_features_follow_wardrobe_writes(self):
+        self.add(self.tops)
+        self.add(self.bottoms)
+        ids = list(outfit_engine.get_features(self.user.id)['ids'])
+        with self.assertNumQueries(0):
+            self.assertEqual(list(outfit_engine.get_features(self.user.id)['ids']), ids)
+        shoes = self.add(Category.objects.create(name='Shoes'))
+        self.assertEqual(list(outfit_engine.get_features(self.user.id)['ids']), ids + [shoes.id])
+
+    def test_respond_async_queues_a_job(self):
+        self.add(self.tops)
+        self.add(self.bottoms)
+        response = self.client.post('/api/outfits/ai-generate/', HTTP_PREFER='respond-async')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Location'], response.data['status_url'])
+
+        jobs.run_job(jobs.claim_jobs('worker')[0])
+        job = self.client.get(f"/api/jobs/{response.data['id']}/").data
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertTrue(Outfit.objects.filter(pk=job['result']['outfit_id'], user=self.user).exists())
+
+
+# ✅ Tag index and faceted wardrobe search
+@override_settings(CACHES=LOCAL_CACHES)
+class WardrobeSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='searcher', password='Pass123!')
+        cls.tops = Category.objects.create(name='Tops')
+        client = APIClient()
+        client.force_authenticate(cls.user)
+        for fields in (
+            {'color': 'red', 'material': 'cotton', 'tags': 'Casual, Summer#work', 'category_id': cls.tops.id},
+            {'color': 'blue', 'material': 'wool', 'tags': 'casual', 'season': 'Winter'},
+            {'color': 'red', 'material': 'silk', 'tags': 'party; summer'},
+        ):
+            client.post('/api/wardrobe/upload/', {'size': 'M', **fields})
+        other = User.objects.create_user(username='other', password='Pass123!')
+        Wardrobe.objects.create(user=other, color='red', size='S', material='silk', tags='summer')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, **params):
+        response = self.client.get('/api/wardrobe/search/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def colors(self, data):
+        return sorted(item['color'] + '/' + item['material'] for item in data['results'])
+
+    def test_tags_match_all_or_any(self):
+        self.assertEqual(self.colors(self.search(tags='summer,CASUAL')), ['red/cotton'])
+        self.assertEqual(self.colors(self.search(tags='summer,casual', tags_mode='any')), ['blue/wool', 'red/cotton', 'red/silk'])
+
+    def test_facets_combine_with_and_or_or(self):
+        self.assertEqual(self.colors(self.search(color='red', material='silk')), ['red/silk'])
+        self.assertEqual(self.colors(self.search(color='red', season='Winter', mode='or')), ['blue/wool', 'red/cotton', 'red/silk'])
+        self.assertEqual(self.colors(self.search(category=str(self.tops.id))), ['red/cotton'])
+        self.assertEqual(self.colors(self.search(color='red,blue', material='wool')), ['blue/wool'])
+
+    def test_facet_counts_describe_the_matches(self):
+        facets = self.search(color='red')['facets']
+        self.assertEqual(facets['color'], {'red': 2})
+        self.assertEqual(facets['material'], {'cotton': 1, 'silk': 1})
+        self.assertEqual(facets['category'], {self.tops.id: 1})
+        self.assertEqual(facets['tags'], {'summer': 2, 'casual': 1, 'work': 1, 'party': 1})
+
+    def test_editing_tags_reindexes_the_item(self):
+        item = Wardrobe.objects.get(user=self.user, color='blue')
+        self.client.put(f'/api/wardrobe/update/{item.id}/', {'tags': 'formal'})
+        self.assertEqual(self.colors(self.search(tags='formal')), ['blue/wool'])
+        self.assertEqual(self.search(tags='casual')['count'], 1)
+
+    def test_invalid_parameters(self):
+        for params in ({'category': 'tops'}, {'mode': 'xor'}, {'tags_mode': 'some'}):
+            with self.subTest(params):
+                self.assertEqual(self.client.get('/api/wardrobe/search/', params).status_code, 400)
+
+    def test_query_count_does_not_grow_with_the_results(self):
+        self.search()  # loads the taxonomy
+        # The items, seven facet counts, and nothing per item
+        with self.assertNumQueries(8):
+            self.search(tags='summer', color='red')
+        with self.assertNumQueries(8):
+            self.search()
+
+
+# ✅ ETags from per-user data versions
+@override_settings(CACHES=LOCAL_CACHES)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='cacher', password='Pass123!')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tops = Category.objects.create(name='Tops')
+        self.item = Wardrobe.objects.create(user=self.user, category=self.tops, color='navy', size='M', material='cotton')
+        self.outfit = Outfit.objects.create(user=self.user)
+        self.outfit.selected_items.set([self.item])
+        self.plan = OutfitPlanner.objects.create(user=self.user, outfit=self.outfit, date='2026-01-01')
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_matching_etag_is_a_304_without_queries(self):
+        for url in ('/api/wardrobe/', '/api/outfits/', '/api/planner/', '/api/wardrobe/search/?color=navy'):
+            with self.subTest(url):
+                etag = self.etag(url)
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual((response['ETag'], response['Cache-Control']), (etag, 'private, no-cache'))
+
+    def test_query_string_and_accept_are_part_of_the_etag(self):
+        etag = self.etag('/api/wardrobe/')
+        self.assertNotEqual(self.etag('/api/wardrobe/?fields=id'), etag)
+        self.assertNotEqual(self.client.get('/api/wardrobe/', HTTP_ACCEPT='text/html')['ETag'], etag)
+
+    def test_every_write_path_changes_the_etag(self):
+        writes = {
+            'upload': lambda: self.client.post('/api/wardrobe/upload/', {'color': 'red', 'size': 'M', 'material': 'wool'}),
+            'batch upload': lambda: self.client.post('/api/wardrobe/upload/batch/', {'items': [{'color': 'red', 'size': 'M', 'material': 'wool'}]}, format='json'),
+            'item update': lambda: self.client.put(f'/api/wardrobe/update/{self.item.id}/', {'color': 'black'}),
+            'outfit create': lambda: self.client.post('/api/outfits/create/', {'type': 'User-created', 'selected_item_ids': [self.item.id]}),
+            'outfit items': lambda: self.outfit.selected_items.clear(),
+            'plan create': lambda: self.client.post('/api/planner/plan/', {'outfit_id': self.outfit.id, 'date': '2026-02-01'}),
+            'plan update': lambda: self.client.put(f'/api/planner/update/{self.plan.id}/', {'date': '2026-03-01'}),
+            'plan delete': lambda: self.client.delete(f'/api/planner/delete/{self.plan.id}/'),
+            'category rename': lambda: Category.objects.filter(pk=self.tops.pk).first().save(),
+            'item delete': lambda: Wardrobe.objects.get(pk=self.item.pk).delete(),
+        }
+        for name, write in writes.items():
+            with self.subTest(name):
+                etags = {url: self.etag(url) for url in ('/api/wardrobe/', '/api/outfits/', '/api/planner/')}
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = write()
+                if hasattr(response, 'status_code'):  # the API writes; the rest go through the ORM
+                    self.assertLess(response.status_code, 300, response.data)
+                for url, etag in etags.items():
+                    self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200, url)
+
+    def test_other_users_writes_leave_the_etag_alone(self):
+        etag = self.etag('/api/wardrobe/')
+        other = User.objects.create_user(username='other', password='Pass123!')
+        with self.captureOnCommitCallbacks(execute=True):
+            Wardrobe.objects.create(user=other, color='red', size='S', material='silk')
+        self.assertEqual(self.client.get('/api/wardrobe/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+# ✅ Cached Category/SubCategory taxonomy
+@override_settings(CACHES=LOCAL_CACHES)
+class TaxonomyTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(taxonomy, '_taxonomy', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='sorter', password='Pass123!')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tops = Category.objects.create(name='Tops')
+            self.shirt = SubCategory.objects.create(category=self.tops, name='Shirt')
+        for _ in range(3):
+            Wardrobe.objects.create(user=self.user, category=self.tops, subcategory=self.shirt, color='navy', size='M', material='cotton')
+
+    def test_lists_name_categories_without_joins(self):
+        self.client.get('/api/categories/')
+        with self.assertNumQueries(1):
+            rows = self.client.get('/api/wardrobe/').data
+        self.assertEqual(rows[0]['category'], {'id': self.tops.id, 'name': 'Tops'})
+        self.assertEqual(rows[0]['subcategory'], {
+            'id': self.shirt.id, 'name': 'Shirt', 'category_id': self.tops.id, 'category_name': 'Tops',
+        })
+
+    def test_category_tree_etag_follows_edits(self):
+        response = self.client.get('/api/categories/')
+        self.assertEqual(response.data, [{'id': self.tops.id, 'name': 'Tops', 'subcategories': [{'id': self.shirt.id, 'name': 'Shirt'}]}])
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.TAXONOMY_MAX_AGE}')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tops.name = 'Upper'
+            self.tops.save()
+        renamed = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(renamed.status_code, 200)
+        self.assertEqual(renamed.data[0]['name'], 'Upper')
+        self.assertEqual(self.client.get(f'/api/categories/{self.tops.id}/subcategories/').data[0]['category_name'], 'Upper')
+
+    def test_unknown_ids_are_looked_up_before_being_rejected(self):
+        self.client.get('/api/categories/')
+        # Added elsewhere: this worker's copy has not been told yet
+        with self.captureOnCommitCallbacks(execute=False):
+            bottoms = Category.objects.create(name='Bottoms')
+            jeans = SubCategory.objects.create(category=bottoms, name='Jeans')
+        self.assertEqual(self.client.get(f'/api/wardrobe/subcategory/{jeans.id}/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/categories/{bottoms.id}/subcategories/').data[0]['name'], 'Jeans')
+        response = self.client.post('/api/wardrobe/upload/batch/', {'items': [
+            {'color': 'blue', 'size': 'M', 'material': 'denim', 'category_id': bottoms.id, 'subcategory_id': jeans.id},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'][0]['subcategory']['name'], 'Jeans')
+
+        self.assertEqual(self.client.get('/api/wardrobe/subcategory/999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/categories/999/subcategories/').status_code, 404)
+
+    @override_settings(TAXONOMY_CHECK_INTERVAL=0)
+    def test_other_workers_edits_reload_the_copy(self):
+        loaded = taxonomy.get_taxonomy()
+        self.assertIs(taxonomy.get_taxonomy(), loaded)
+        cache.set(taxonomy.SHARED_VERSION_KEY, 'changed by another worker')
+        self.assertIsNot(taxonomy.get_taxonomy(), loaded)
+
+
+# ✅ Cached token authentication
+@override_settings(CACHES=LOCAL_CACHES)
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        for name, value in (('_entries', OrderedDict()), ('_stats', Counter())):
+            patcher = mock.patch.object(authentication, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='holder', password='Old!pass1')
+        UserProfile.objects.create(user=self.user)
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def stats(self):
+        stats = authentication.cache_stats()
+        return {name: stats[name] for name in ('hits', 'misses', 'revoked')}
+
+    def test_cached_lookups_skip_the_database(self):
+        etag = self.client.get('/api/wardrobe/')['ETag']
+        # Authentication and the ETag check are all a 304 takes
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/wardrobe/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.stats(), {'hits': 1, 'misses': 1, 'revoked': 0})
+        self.assertEqual(authentication.cache_stats()['hit_rate'], 0.5)
+
+    def test_logout_and_password_change_revoke_at_once(self):
+        self.client.get('/api/profile/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/api/logout/').status_code, 200)
+        self.assertEqual(self.client.get('/api/profile/').status_code, 401)
+
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(self.client.get('/api/profile/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('New!pass1')
+            self.user.save()
+        self.assertEqual(self.client.get('/api/profile/').status_code, 401)
+
+    def test_deactivating_the_user_revokes(self):
+        self.client.get('/api/profile/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get('/api/profile/').status_code, 401)
+
+    def revoke_in_another_worker(self):
+        # That worker deletes the token and replaces the shared stamp; this one keeps its entry
+        Token.objects.filter(pk=self.token.pk).delete()
+        authentication.revocation_cache().set(authentication.revocation_key(self.token.key), 'revoked elsewhere')
+
+    def test_other_workers_revocations_are_seen_at_the_next_check(self):
+        self.client.get('/api/profile/')
+        with self.captureOnCommitCallbacks(execute=False):
+            self.revoke_in_another_worker()
+        self.assertEqual(self.client.get('/api/profile/').status_code, 200)
+        with override_settings(AUTH_TOKEN_REVOCATION_CHECK_INTERVAL=0):
+            self.assertEqual(self.client.get('/api/profile/').status_code, 401)
+        self.assertEqual(self.stats(), {'hits': 1, 'misses': 2, 'revoked': 1})
+
+    def test_entries_whose_stamp_is_gone_are_misses(self):
+        self.client.get('/api/profile/')
+        authentication.revocation_cache().clear()
+        with override_settings(AUTH_TOKEN_REVOCATION_CHECK_INTERVAL=0):
+            self.assertEqual(self.client.get('/api/profile/').status_code, 200)
+        self.assertEqual(self.stats(), {'hits': 0, 'misses': 2, 'revoked': 1})
+
+
+# ✅ Case-insensitive registration and login
+class AccountIdentifierTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def register(self, username, email):
+        return self.client.post('/api/register/', {'username': username, 'email': email, 'password': 'Pass123!'})
+
+    def test_identifiers_are_unique_whatever_their_case(self):
+        self.assertEqual(self.register('Bob', 'Bob@Example.com').status_code, 201)
+        response = self.register('bob', 'other@example.com')
+        self.assertEqual((response.status_code, response.data['error']), (400, 'Username already exists'))
+        response = self.register('bobby', 'BOB@example.COM')
+        self.assertEqual((response.status_code, response.data['error']), (400, 'Email already registered'))
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_login_by_email_or_username_in_any_case(self):
+        user_id = self.register('Bob', 'bob@example.com').data['user_id']
+        for identifier in ('bob', 'BOB', ' Bob@Example.COM '):
+            with self.subTest(identifier):
+                response = self.client.post('/api/login/', {'username': identifier, 'password': 'Pass123!'})
+                self.assertEqual((response.status_code, response.data['user_id']), (200, user_id))
+        self.assertEqual(self.client.post('/api/login/', {'username': 'bob', 'password': 'Wrong!1'}).status_code, 401)
+        self.assertEqual(self.client.post('/api/login/', {'username': 'nobody', 'password': 'Pass123!'}).status_code, 404)
+
+    def test_resolution_is_one_query_and_prefers_email(self):
+        owner = User.objects.create_user(username='mixed', email='mixed@example.com')
+        User.objects.create_user(username='mixed@example.com', email='z@example.com')
+        User.objects.create_user(username='blank1', email='')
+        User.objects.create_user(username='blank2', email='')
+        with self.assertNumQueries(1):
+            self.assertEqual(find_user_by_identifier('MIXED@example.com'), owner)
+        self.assertEqual(find_user_by_identifier('Mixed'), owner)
+        with self.assertNumQueries(0):
+            self.assertIsNone(find_user_by_identifier('  '))
+
+
+# ✅ Date-windowed planner and iCalendar export
+@override_settings(CACHES=LOCAL_CACHES)
+class PlannerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='planner', password='Pass123!')
+        item = Wardrobe.objects.create(user=cls.user, color='navy', size='M', material='cotton')
+        Wardrobe.objects.filter(pk=item.pk).update(photo_path_thumb='derivatives/wardrobe/item_thumb.webp')
+        cls.described = Outfit.objects.create(user=cls.user, type='User-created', description='Light, airy; for work\n' + 'x' * 100)
+        cls.described.selected_items.set([item])
+        cls.pictured = Outfit.objects.create(user=cls.user, type='AI-generated')
+        Outfit.objects.filter(pk=cls.pictured.pk).update(photo_path_thumb='derivatives/outfit/outfit_thumb.webp')
+        for day, outfit in (('2026-01-05', cls.described), ('2026-01-05', cls.pictured), ('2026-01-31', cls.described), ('2026-02-01', cls.pictured)):
+            OutfitPlanner.objects.create(user=cls.user, outfit=outfit, date=day)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_window_is_inclusive(self):
+        response = self.client.get('/api/planner/', {'from': '2026-01-05', 'to': '2026-01-31'})
+        self.assertEqual([plan['date'] for plan in response.data], ['2026-01-05', '2026-01-05', '2026-01-31'])
+        response = self.client.get('/api/planner/', {'from': '2026-01-06'})
+        self.assertEqual([plan['date'] for plan in response.data], ['2026-01-31', '2026-02-01'])
+
+    def test_invalid_dates_and_months_are_rejected(self):
+        for params in ({'from': '2026-13-01'}, {'to': 'tomorrow'}, {'month': '2026-1x'}, {'month': ''}):
+            with self.subTest(params):
+                self.assertEqual(self.client.get('/api/planner/', params).status_code, 400)
+        self.assertEqual(self.client.get('/api/planner/export.ics', {'from': '2026-02-30'}).status_code, 400)
+
+    def test_month_lists_thumbnails_per_day(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/planner/', {'month': '2026-01'})
+        self.assertEqual(response.data['month'], '2026-01')
+        self.assertEqual(sorted(response.data['days']), ['2026-01-05', '2026-01-31'])
+        first_day = response.data['days']['2026-01-05']
+        self.assertEqual([entry['outfit_id'] for entry in first_day], [self.described.id, self.pictured.id])
+        # An outfit without a photo borrows its first item's thumbnail
+        self.assertTrue(first_day[0]['thumbnail'].endswith('item_thumb.webp'))
+        self.assertTrue(first_day[1]['thumbnail'].endswith('outfit_thumb.webp'))
+
+    def test_ics_escapes_and_folds_lines(self):
+        response = self.client.get('/api/planner/export.ics', {'to': '2026-01-31'})
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n') and body.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 3)
+        self.assertIn('DTSTART;VALUE=DATE:20260131\r\nDTEND;VALUE=DATE:20260201\r\n', body)
+
+        lines = body.split('\r\n')
+        self.assertTrue(all(len(line.encode()) <= 75 for line in lines))
+        unfolded = body.replace('\r\n ', '')
+        self.assertIn('DESCRIPTION:Light\\, airy\\; for work\\n' + 'x' * 100 + '\r\n', unfolded)
+        self.assertIn(f'SUMMARY:Outfit #{self.pictured.id} (AI-generated)\r\n', unfolded)
+
+
+# ✅ Bootstrap endpoint
+@override_settings(CACHES=LOCAL_CACHES)
+class BootstrapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='launcher', email='launcher@example.com', password='Pass123!')
+        UserProfile.objects.create(user=cls.user, gender='female')
+        cls.tops = Category.objects.create(name='Tops')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.client.get('/api/categories/')  # loads the taxonomy
+
+    def add_looks(self, count):
+        items = [
+            Wardrobe.objects.create(user=self.user, category=self.tops, color='navy', size='M', material='cotton')
+            for _ in range(count)
+        ]
+        for index in range(count):
+            outfit = Outfit.objects.create(user=self.user)
+            outfit.selected_items.set(items)
+            day = timezone.localdate() + timedelta(days=index if index % 2 else -(settings.BOOTSTRAP_PLAN_HISTORY_DAYS + 1))
+            OutfitPlanner.objects.create(user=self.user, outfit=outfit, date=day)
+        return items
+
+    def test_payload_is_gzipped_and_normalized(self):
+        items = self.add_looks(2)
+        response = self.client.get('/api/bootstrap/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))
+
+        self.assertEqual((data['user']['id'], data['profile']['username']), (self.user.id, 'launcher'))
+        self.assertEqual([item['id'] for item in data['wardrobe']], [item.id for item in items])
+        self.assertEqual(data['wardrobe'][0]['category'], self.tops.id)
+        self.assertEqual(sorted(data['outfits'][0]['selected_items']), [item.id for item in items])
+        # Plans older than BOOTSTRAP_PLAN_HISTORY_DAYS are left out
+        self.assertEqual(len(data['plans']), 1)
+        self.assertIsInstance(data['plans'][0]['outfit'], int)
+        self.assertEqual(data['taxonomy']['categories'][0]['name'], 'Tops')
+
+        plain = self.client.get('/api/bootstrap/')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(json.loads(plain.content)['wardrobe'], data['wardrobe'])
+
+    def test_query_count_does_not_grow_with_the_data(self):
+        self.add_looks(2)
+        with self.assertNumQueries(5):
+            self.client.get('/api/bootstrap/')
+        self.add_looks(6)
+        with self.assertNumQueries(5):
+            self.client.get('/api/bootstrap/')
+
+
+# ✅ Delta sync
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='syncer', password='Pass123!')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.items = [Wardrobe.objects.create(user=self.user, color='navy', size='M', material='cotton') for _ in range(3)]
+        self.outfit = Outfit.objects.create(user=self.user)
+        self.outfit.selected_items.set(self.items)
+        self.plan = OutfitPlanner.objects.create(user=self.user, outfit=self.outfit, date='2026-01-01')
+        Wardrobe.objects.create(user=User.objects.create_user(username='other'), color='red', size='S', material='silk')
+
+    def sync(self, since=None):
+        response = self.client.get('/api/sync/', {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def age(self, *instances):
+        earlier = timezone.now() - timedelta(minutes=2)
+        for instance in instances:
+            type(instance).objects.filter(pk=instance.pk).update(updated_at=earlier)
+
+    def test_full_sync_without_a_token(self):
+        data = self.sync()
+        self.assertTrue(data['full'])
+        self.assertEqual([item['id'] for item in data['wardrobe']], [item.id for item in self.items])
+        self.assertEqual((len(data['outfits']), len(data['plans'])), (1, 1))
+        self.assertEqual(data['deleted'], {'wardrobe': [], 'outfits': [], 'plans': []})
+
+    def test_changes_and_tombstones_since_a_token(self):
+        token = encode_token(timezone.now() - timedelta(minutes=1))
+        self.age(*self.items, self.outfit, self.plan)
+        data = self.sync(token)
+        self.assertFalse(data['full'])
+        self.assertEqual((data['wardrobe'], data['outfits'], data['plans']), ([], [], []))
+
+        self.items[0].save()
+        gone = self.items[1].id
+        self.items[1].delete()
+        self.assertEqual(self.client.delete(f'/api/planner/delete/{self.plan.id}/').status_code, 200)
+
+        data = self.sync(token)
+        self.assertEqual([item['id'] for item in data['wardrobe']], [self.items[0].id])
+        # Losing an item changes the outfits that held it
+        self.assertEqual(sorted(data['outfits'][0]['selected_items']), [self.items[0].id, self.items[2].id])
+        self.assertEqual(data['deleted'], {'wardrobe': [gone], 'outfits': [], 'plans': [self.plan.id]})
+
+        # The returned token overlaps the read, so a follow-up sync sees those rows again
+        self.assertEqual([item['id'] for item in self.sync(data['token'])['wardrobe']], [self.items[0].id])
+
+    def test_invalid_and_expired_tokens(self):
+        self.assertEqual(self.client.get('/api/sync/', {'since': 'garbage'}).status_code, 400)
+        expired = encode_token(timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1))
+        response = self.client.get('/api/sync/', {'since': expired})
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.data['resync'])
+
+    def test_prune_tombstones_past_retention(self):
+        self.items[0].delete()
+        self.outfit.delete()
+        self.assertEqual(Tombstone.objects.count(), 3)
+        Tombstone.objects.filter(kind='wardrobe').update(deleted_at=timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1))
+        call_command('prune_tombstones', batch_size=1, stdout=io.StringIO())
+        self.assertEqual(sorted(Tombstone.objects.values_list('kind', flat=True)), ['outfit', 'plan'])
+
+    def test_deleting_the_user_leaves_no_tombstones(self):
+        self.user.delete()
+        self.assertFalse(Tombstone.objects.exists())
+
+
+# ✅ Follow suggestions
+class FollowSuggestionTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f'user{index}', email=f'user{index}@example.com') for index in range(8)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def follow(self, follower, followee):
+        toggle_follow(self.users[follower].id, self.users[followee].id)
+
+    def suggested(self, user, **filters):
+        return list(
+            FollowSuggestion.objects.filter(user=self.users[user], **filters).order_by('-score', 'suggested_id')
+            .values_list('suggested_id', 'mutual_follows', 'mutual_likes')
+        )
+
+    def test_friends_of_friends_and_co_likers_are_ranked(self):
+        u = self.users
+        for follower, followee in ((0, 1), (0, 2), (1, 3), (2, 3), (2, 4), (1, 0)):
+            self.follow(follower, followee)
+        post = Post.objects.create(user=u[7], outfit=Outfit.objects.create(user=u[7]))
+        toggle_like(u[0].id, post.id)
+        toggle_like(u[5].id, post.id)
+
+        self.assertEqual(build_suggestions(), (8, FollowSuggestion.objects.count()))
+        # Two mutual follows, then one, then a co-like worth FOLLOW_SUGGESTIONS_LIKE_WEIGHT discounted by popularity
+        self.assertEqual(self.suggested(0), [(u[3].id, 2, 0), (u[4].id, 1, 0), (u[5].id, 0, 1)])
+        scores = dict(FollowSuggestion.objects.filter(user=u[0]).values_list('suggested_id', 'score'))
+        self.assertAlmostEqual(scores[u[5].id], settings.FOLLOW_SUGGESTIONS_LIKE_WEIGHT / np.log2(3))
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/feed/suggestions/', {'limit': 2})
+        self.assertEqual([row['user'] for row in response.data], [
+            {'id': u[3].id, 'username': 'user3'}, {'id': u[4].id, 'username': 'user4'},
+        ])
+        # Follows made since the build are left out at once
+        self.follow(0, 3)
+        response = self.client.get('/api/feed/suggestions/')
+        self.assertEqual([row['user']['id'] for row in response.data], [u[4].id, u[5].id])
+
+    def test_incremental_build_recomputes_only_affected_users(self):
+        for follower, followee in ((0, 2), (2, 3), (2, 4)):
+            self.follow(follower, followee)
+        build_suggestions()
+        SuggestionRefresh.objects.all().delete()
+        FollowSuggestion.objects.filter(user=self.users[0]).update(score=99)
+
+        self.follow(6, 2)
+        build_suggestions(incremental=True)
+        self.assertEqual({row[0] for row in self.suggested(6)}, {self.users[3].id, self.users[4].id})
+        # user0 does not follow user6, so its rows are left alone
+        self.assertEqual(FollowSuggestion.objects.filter(user=self.users[0], score=99).count(), 2)
+
+    def test_unlike_refreshes_the_other_likers(self):
+        a, b, author = self.users[:3]
+        post = Post.objects.create(user=author, outfit=Outfit.objects.create(user=author))
+        toggle_like(a.id, post.id)
+        toggle_like(b.id, post.id)
+        build_suggestions()
+        self.assertTrue(FollowSuggestion.objects.filter(user=b, suggested=a).exists())
+
+        toggle_like(a.id, post.id)
+        build_suggestions(incremental=True)
+        self.assertFalse(FollowSuggestion.objects.filter(user=b, suggested=a).exists())
+
+    def test_batch_size_does_not_change_the_result(self):
+        rng = np.random.default_rng(1)
+        for follower, followee in rng.integers(0, len(self.users), (30, 2)):
+            if follower != followee and not Follow.objects.filter(follower=self.users[follower], following=self.users[followee]).exists():
+                self.follow(follower, followee)
+        build_suggestions(budget=10 ** 9)
+        whole = set(FollowSuggestion.objects.values_list('user_id', 'suggested_id', 'score'))
+        build_suggestions(budget=1)
+        self.assertEqual(set(FollowSuggestion.objects.values_list('user_id', 'suggested_id', 'score')), whole)
+        self.assertTrue(whole)
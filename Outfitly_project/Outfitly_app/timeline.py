@@ -0,0 +1,194 @@
+import random
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .models import Follow, Post, TimelineEntry, UserProfile
+from .pagination import decode_cursor, encode_cursor, get_page_size, keyset_filter, with_feed_relations
+
+
+def follower_count(user_id):
+    count = UserProfile.objects.filter(user_id=user_id).values_list('followers_count', flat=True).first()
+    if count is None:
+        return Follow.objects.filter(following_id=user_id).count()
+    return count
+
+
+def is_high_fanout(user_id):
+    """Authors above TIMELINE_FANOUT_LIMIT are not pushed to timelines"""
+    return follower_count(user_id) > settings.TIMELINE_FANOUT_LIMIT
+
+
+def high_fanout_followees(user):
+    """Ids of the accounts `user` follows whose posts are merged at read time"""
+    followee_ids = Follow.objects.filter(follower=user).values('following_id')
+    return (
+        UserProfile.objects.filter(user_id__in=followee_ids, followers_count__gt=settings.TIMELINE_FANOUT_LIMIT)
+        .values_list('user_id', flat=True)
+    )
+
+
+def high_fanout_followee_ids(user):
+    return list(high_fanout_followees(user))
+
+
+def fan_out_post(post):
+    """Pushes a new post into the timeline of every follower of its author"""
+    if is_high_fanout(post.user_id):
+        return
+
+    batch_size = settings.TIMELINE_FANOUT_BATCH_SIZE
+    follower_ids = (
+        Follow.objects.filter(following_id=post.user_id)
+        .values_list('follower_id', flat=True)
+        .iterator(chunk_size=batch_size)
+    )
+    entries = []
+    for follower_id in follower_ids:
+        entries.append(TimelineEntry(user_id=follower_id, post_id=post.id, created_at=post.created_at))
+        if len(entries) >= batch_size:
+            push_entries(entries)
+            entries = []
+    if entries:
+        push_entries(entries)
+
+
+def push_entries(entries):
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    # Checking every recipient would count each timeline on every post; a random
+    # share keeps them near TIMELINE_MAX_LENGTH between rebuild_timelines --trim runs
+    sample = [entry.user_id for entry in entries if random.random() < settings.TIMELINE_TRIM_SAMPLE]
+    if sample:
+        for user_id in overlong_timelines(TimelineEntry.objects.filter(user_id__in=sample)):
+            trim_timeline(user_id)
+
+
+def backfill_followee(follower_id, followee_id):
+    """Copies a newly followed account's recent posts into the follower's timeline"""
+    if is_high_fanout(followee_id):
+        return
+
+    recent = (
+        Post.objects.filter(user_id=followee_id)
+        .order_by('-created_at', '-id')
+        .values_list('id', 'created_at')[:settings.TIMELINE_BACKFILL_LENGTH]
+    )
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=follower_id, post_id=pk, created_at=created_at) for pk, created_at in recent],
+        ignore_conflicts=True,
+    )
+    trim_timeline(follower_id)
+
+
+def remove_followee(follower_id, followee_id):
+    """Drops an unfollowed account's posts from the follower's timeline"""
+    TimelineEntry.objects.filter(user_id=follower_id, post__user_id=followee_id).delete()
+
+
+def trim_timeline(user_id):
+    """Deletes everything past the newest TIMELINE_MAX_LENGTH entries"""
+    cutoff = (
+        TimelineEntry.objects.filter(user_id=user_id)
+        .order_by('-created_at', '-post_id')
+        .values_list('created_at', 'post_id')[settings.TIMELINE_MAX_LENGTH:settings.TIMELINE_MAX_LENGTH + 1]
+    )
+    cutoff = list(cutoff)
+    if not cutoff:
+        return 0
+    created_at, post_id = cutoff[0]
+    deleted, _ = TimelineEntry.objects.filter(
+        Q(created_at__lt=created_at) | Q(created_at=created_at, post_id__lte=post_id),
+        user_id=user_id,
+    ).delete()
+    return deleted
+
+
+def overlong_timelines(entries):
+    """Ids of the users whose timeline, among `entries`, is longer than TIMELINE_MAX_LENGTH"""
+    return (
+        entries.values('user_id').annotate(entries=Count('post_id'))
+        .filter(entries__gt=settings.TIMELINE_MAX_LENGTH).values_list('user_id', flat=True)
+    )
+
+
+def trim_timelines():
+    """
+    Trims every timeline longer than TIMELINE_MAX_LENGTH, including those fan-out
+    has not sampled lately; run periodically with `rebuild_timelines --trim`.
+    Returns (timelines trimmed, entries deleted).
+    """
+    trimmed = deleted = 0
+    for user_id in overlong_timelines(TimelineEntry.objects.all()).iterator(chunk_size=1000):
+        deleted += trim_timeline(user_id)
+        trimmed += 1
+    return trimmed, deleted
+
+
+def timeline_positions(user, cursor, page_size):
+    """(created_at, post_id) of the page's timeline entries, plus one extra"""
+    entries = TimelineEntry.objects.filter(user=user)
+    if cursor:
+        entries = entries.filter(keyset_filter(cursor, id_field='post_id'))
+    return entries.order_by('-created_at', '-post_id').values_list('created_at', 'post_id')[:page_size + 1]
+
+
+def merged_positions(followee_ids, cursor, page_size):
+    """(created_at, id) of the page's posts by high-fanout followees, plus one extra"""
+    merged = Post.objects.filter(user_id__in=followee_ids)
+    if cursor:
+        merged = merged.filter(keyset_filter(cursor))
+    return merged.order_by('-created_at', '-id').values_list('created_at', 'id')[:page_size + 1]
+
+
+def cut_positions(positions, page_size):
+    positions = sorted(positions, reverse=True)
+    next_cursor = None
+    if len(positions) > page_size:
+        positions = positions[:page_size]
+        next_cursor = encode_cursor(*positions[-1])
+    return positions, next_cursor
+
+
+def feed_posts(positions, queryset=None):
+    if queryset is None:
+        queryset = with_feed_relations(Post.objects.all())
+    return queryset.filter(id__in=[pk for _, pk in positions])
+
+
+def in_page_order(posts, positions):
+    # A post can vanish between the two reads; skip it rather than fail the page
+    return [posts[pk] for _, pk in positions if pk in posts]
+
+
+def read_feed_params(request):
+    cursor = request.GET.get('cursor')
+    return (decode_cursor(cursor) if cursor else None), get_page_size(request)
+
+
+def following_feed_page(user, request, queryset=None):
+    """
+    Reads one cursor page of `user`'s following feed from their timeline,
+    merged with posts from high-fanout followees that were never pushed.
+    Posts are loaded from `queryset` (with_feed_relations by default).
+    Returns (posts, next_cursor).
+    """
+    cursor, page_size = read_feed_params(request)
+    positions = set(timeline_positions(user, cursor, page_size))
+    high_fanout_ids = high_fanout_followee_ids(user)
+    if high_fanout_ids:
+        positions.update(merged_positions(high_fanout_ids, cursor, page_size))
+
+    positions, next_cursor = cut_positions(positions, page_size)
+    return in_page_order(feed_posts(positions, queryset).in_bulk(), positions), next_cursor
+
+
+async def afollowing_feed_page(user, request, queryset=None):
+    """Async following_feed_page, for the async views"""
+    cursor, page_size = read_feed_params(request)
+    positions = {row async for row in timeline_positions(user, cursor, page_size)}
+    high_fanout_ids = [pk async for pk in high_fanout_followees(user)]
+    if high_fanout_ids:
+        positions.update([row async for row in merged_positions(high_fanout_ids, cursor, page_size)])
+
+    positions, next_cursor = cut_positions(positions, page_size)
+    return in_page_order(await feed_posts(positions, queryset).ain_bulk(), positions), next_cursor
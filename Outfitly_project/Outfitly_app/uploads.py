@@ -0,0 +1,201 @@
+import fcntl
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+
+from .models import UploadSession
+
+# Resumable uploads. A session reserves a preallocated part file of the
+# declared size; chunks are streamed from the request straight into it at
+# their offset, in any order, and the written byte ranges are recorded on the
+# session. Completing checks that every byte arrived and that the SHA-256
+# matches, then moves the file into media storage. Chunk writers hold a shared
+# flock on the part file; completion renames it first, so no new chunk can open
+# it, then takes an exclusive flock to wait out the writes in flight. The session holds that
+# stored file until a view attaches it to an image field with
+# <field>_upload_id, which hands the storage reference over to the row.
+
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    pass
+
+
+def part_path(session):
+    return os.path.join(settings.UPLOAD_SESSION_DIR, f'{session.pk}.part')
+
+
+def merge_range(ranges, start, end):
+    """Adds [start, end) to a sorted list of disjoint [start, end) ranges"""
+    merged = []
+    for low, high in sorted(ranges + [[start, end]]):
+        if merged and low <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], high)
+        else:
+            merged.append([low, high])
+    return merged
+
+
+def missing_ranges(session):
+    missing, position = [], 0
+    for low, high in session.received:
+        if low > position:
+            missing.append([position, low])
+        position = high
+    if position < session.size:
+        missing.append([position, session.size])
+    return missing
+
+
+def create_session(user, filename, size, sha256=''):
+    if not 0 < size <= settings.UPLOAD_MAX_SIZE:
+        raise UploadError(f'size must be between 1 and {settings.UPLOAD_MAX_SIZE} bytes')
+    session = UploadSession.objects.create(
+        user=user, filename=os.path.basename(filename)[:255] or 'upload', size=size, sha256=sha256.lower(),
+        expires_at=timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL),
+    )
+    os.makedirs(settings.UPLOAD_SESSION_DIR, exist_ok=True)
+    with open(part_path(session), 'wb') as part:
+        part.truncate(size)  # sparse on most filesystems; chunks fill it in
+    return session
+
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+def chunk_position(request):
+    """(offset, length) from `Content-Range: bytes first-last/total` or ?offset= and Content-Length"""
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        raise UploadError('Invalid Content-Length')
+    header = request.META.get('HTTP_CONTENT_RANGE')
+    if header:
+        match = CONTENT_RANGE.match(header.strip())
+        if not match or int(match[2]) - int(match[1]) + 1 != length:
+            raise UploadError('Content-Range must be "bytes first-last/total" and match Content-Length')
+        return int(match[1]), length
+    try:
+        return int(request.query_params['offset']), length
+    except (KeyError, ValueError):
+        raise UploadError('Send Content-Range or ?offset=')
+
+
+def write_chunk(session, offset, length, stream):
+    """
+    Streams `length` bytes from `stream` into the part file at `offset`, then
+    records the range. Returns the session with its updated ranges.
+    """
+    if session.status != 'open':
+        raise UploadError('Upload is already complete')
+    if length <= 0 or length > settings.UPLOAD_CHUNK_MAX_SIZE:
+        raise UploadError(f'Chunks must be between 1 and {settings.UPLOAD_CHUNK_MAX_SIZE} bytes')
+    if offset < 0 or offset + length > session.size:
+        raise UploadError(f'Chunk [{offset}, {offset + length}) is outside the {session.size}-byte upload')
+
+    try:
+        fd = os.open(part_path(session), os.O_WRONLY)
+    except FileNotFoundError:
+        # Renamed away by complete_session
+        raise UploadError('Upload is already complete')
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        position, remaining = offset, length
+        while remaining:
+            data = stream.read(min(READ_SIZE, remaining))
+            if not data:
+                raise UploadError('Request body is shorter than Content-Length')
+            os.pwrite(fd, data, position)
+            position += len(data)
+            remaining -= len(data)
+    finally:
+        os.close(fd)
+
+    # Ranges from concurrent chunks are merged under the row lock
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.status != 'open':
+            raise UploadError('Upload is already complete')
+        session.received = merge_range(session.received, offset, offset + length)
+        session.save(update_fields=['received'])
+    return session
+
+
+def complete_session(session, sha256=''):
+    """Verifies the part file and moves it into media storage; must run inside a transaction"""
+    # The row lock makes a repeated completion wait, then fail on the status check
+    session = UploadSession.objects.select_for_update().get(pk=session.pk)
+    if session.status != 'open':
+        raise UploadError('Upload is already complete')
+    missing = missing_ranges(session)
+    if missing:
+        raise UploadError(f'Missing byte ranges: {missing}')
+    expected = (sha256 or session.sha256).lower()
+    if not expected:
+        raise UploadError('sha256 is required')
+
+    # Chunks sent from here on fail to open the part file instead of changing it under the hash
+    path = part_path(session)
+    sealed = f'{path}.complete'
+    os.replace(path, sealed)
+    try:
+        digest = hashlib.sha256()
+        with open(sealed, 'rb') as part:
+            fcntl.flock(part, fcntl.LOCK_EX)
+            for chunk in iter(lambda: part.read(1024 * 1024), b''):
+                digest.update(chunk)
+        if digest.hexdigest() != expected:
+            raise UploadError('Checksum mismatch')
+        try:
+            with Image.open(sealed) as image:
+                image.verify()
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+            raise UploadError('Upload is not an image')
+
+        with open(sealed, 'rb') as part:
+            session.file.save(session.filename, File(part), save=False)
+    except Exception:
+        # The session stays open, so chunks can be resent and completion retried
+        os.replace(sealed, path)
+        raise
+    session.status = 'complete'
+    session.save(update_fields=['file', 'status'])
+    os.remove(sealed)
+    return session
+
+
+def claim_uploads(request, field_names):
+    """
+    Stored file names for every `<field>_upload_id` in the request, claimed so
+    each completed upload is attached once. Call inside the transaction that
+    saves the row. Raises UploadError for unknown or unfinished uploads.
+    """
+    files = {}
+    for field_name in field_names:
+        upload_id = request.data.get(f'{field_name}_upload_id')
+        if not upload_id:
+            continue
+        try:
+            session = UploadSession.objects.select_for_update().get(pk=upload_id, user=request.user, status='complete')
+        except (UploadSession.DoesNotExist, ValidationError):
+            raise UploadError(f'{field_name}_upload_id is not a completed upload')
+        files[field_name] = session.file.name
+        # update() skips the file-release signals: the storage reference moves to the row
+        UploadSession.objects.filter(pk=session.pk).update(status='attached', file=None)
+    return files
+
+
+def discard_part(session):
+    try:
+        os.remove(part_path(session))
+    except FileNotFoundError:
+        pass
@@ -1,31 +1,62 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
-    register_user, login_user, get_user_profile, update_user_profile,
-    upload_clothing, get_wardrobe, update_clothing,
-    create_outfit, get_outfits, ai_generate_outfit,
-    plan_outfit, get_planned_outfits,
-    create_post, get_all_posts, toggle_like_post, toggle_follow, get_following_feed
+    register_user, login_user, logout_user, get_auth_cache_stats, get_user_profile, update_user_profile,
+    get_bootstrap, sync_changes, get_job, create_upload, upload_session, complete_upload,
+    upload_clothing, upload_clothing_batch, get_wardrobe, export_wardrobe, search_wardrobe,
+    update_clothing, get_similar_items, get_wardrobe_by_subcategory,
+    get_category_tree, get_subcategories_by_category,
+    create_outfit, get_outfits, export_outfits, ai_generate_outfit,
+    plan_outfit, get_planned_outfits, export_planned_outfits_ics, update_planned_outfit, delete_planned_outfit,
+    create_post, get_follow_suggestions,
 )
 
+# OUTFITLY_ASYNC_VIEWS serves the feed and social endpoints from async_views under ASGI
+if settings.OUTFITLY_ASYNC_VIEWS:
+    from .async_views import get_all_posts, toggle_like_post, toggle_follow, get_following_feed
+else:
+    from .views import get_all_posts, toggle_like_post, toggle_follow, get_following_feed
+
 urlpatterns = [
     path('register/', register_user, name='register_user'),
     path('login/', login_user, name='login_user'),
+    path('logout/', logout_user, name='logout_user'),
+    path('auth/cache-stats/', get_auth_cache_stats, name='get_auth_cache_stats'),
     path('profile/', get_user_profile, name='get_user_profile'),
     path('profile/update/', update_user_profile, name='update_user_profile'),
+    path('bootstrap/', get_bootstrap, name='get_bootstrap'),
+    path('sync/', sync_changes, name='sync_changes'),
+    path('jobs/<int:job_id>/', get_job, name='get_job'),
+    path('uploads/', create_upload, name='create_upload'),
+    path('uploads/<uuid:upload_id>/', upload_session, name='upload_session'),
+    path('uploads/<uuid:upload_id>/complete/', complete_upload, name='complete_upload'),
 
     # Wardrobe APIs
     path('wardrobe/upload/', upload_clothing, name='upload_clothing'),
+    path('wardrobe/upload/batch/', upload_clothing_batch, name='upload_clothing_batch'),
     path('wardrobe/', get_wardrobe, name='get_wardrobe'),
+    path('wardrobe/export/', export_wardrobe, name='export_wardrobe'),
+    path('wardrobe/search/', search_wardrobe, name='search_wardrobe'),
     path('wardrobe/update/<int:item_id>/', update_clothing, name='update_clothing'),
+    path('wardrobe/<int:item_id>/similar/', get_similar_items, name='get_similar_items'),
+    path('wardrobe/subcategory/<int:subcategory_id>/', get_wardrobe_by_subcategory, name='get_wardrobe_by_subcategory'),
+
+    # Category APIs
+    path('categories/', get_category_tree, name='get_category_tree'),
+    path('categories/<int:category_id>/subcategories/', get_subcategories_by_category, name='get_subcategories_by_category'),
 
     # Outfit APIs
     path('outfits/create/', create_outfit, name='create_outfit'),
     path('outfits/', get_outfits, name='get_outfits'),
+    path('outfits/export/', export_outfits, name='export_outfits'),
     path('outfits/ai-generate/', ai_generate_outfit, name='ai_generate_outfit'),
 
     # Outfit Planner APIs
     path('planner/', get_planned_outfits, name='get_planned_outfits'),
     path('planner/plan/', plan_outfit, name='plan_outfit'),
+    path('planner/export.ics', export_planned_outfits_ics, name='export_planned_outfits_ics'),
+    path('planner/update/<int:plan_id>/', update_planned_outfit, name='update_planned_outfit'),
+    path('planner/delete/<int:plan_id>/', delete_planned_outfit, name='delete_planned_outfit'),
 
     # Feed APIs
     path('feed/posts/create/', create_post, name='create_post'),
@@ -33,4 +64,5 @@ urlpatterns = [
     path('feed/posts/<int:post_id>/like/', toggle_like_post, name='toggle_like_post'),
     path('feed/follow/<int:user_id>/', toggle_follow, name='toggle_follow'),
     path('feed/following/', get_following_feed, name='get_following_feed'),
+    path('feed/suggestions/', get_follow_suggestions, name='get_follow_suggestions'),
 ]
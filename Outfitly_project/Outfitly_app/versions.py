@@ -0,0 +1,73 @@
+import hashlib
+import uuid
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+# Every user has an opaque data version that changes whenever their wardrobe,
+# outfits or plans are written. List endpoints derive their ETag from it, so a
+# client that already holds the current payload gets a 304 without the view
+# touching the database. The stamps live in the default cache, which is shared
+# between workers (settings.CACHES, enforced by the Outfitly_app.E001 check).
+# That cache must be Redis for a 304 to skip the database entirely: with the
+# DatabaseCache fallback reading the stamps is itself a query (Outfitly_app.W001).
+
+GLOBAL_VERSION_KEY = 'data_version:global'
+
+
+def version_key(user_id):
+    return f'data_version:user:{user_id}'
+
+
+def new_stamp():
+    return uuid.uuid4().hex
+
+
+def bump_version(user_id):
+    # Bumping before the commit would let a reader tag the old rows with the new stamp
+    transaction.on_commit(lambda: cache.set(version_key(user_id), new_stamp(), None))
+
+
+def bump_global_version():
+    """For shared data embedded in every user's payload (categories, subcategories)"""
+    transaction.on_commit(lambda: cache.set(GLOBAL_VERSION_KEY, new_stamp(), None))
+
+
+def get_version(user_id):
+    keys = [version_key(user_id), GLOBAL_VERSION_KEY]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # add() keeps a stamp a concurrent writer has just bumped
+            cache.add(key, new_stamp(), None)
+            versions[key] = cache.get(key)
+    return ':'.join(versions[key] for key in keys)
+
+
+def compute_etag(request, version):
+    # The query string and Accept header change the payload, so they are part of the tag
+    source = f"{version}|{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}"
+    return '"%s"' % hashlib.md5(source.encode()).hexdigest()
+
+
+def etag_from_user_version(view):
+    """
+    Wraps an authenticated GET view. The version is read before the view runs,
+    so a write landing mid-request can only make the tag older, never newer.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        etag = compute_etag(request, get_version(request.user.id))
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = view(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+    return wrapper
@@ -1,12 +1,43 @@
 from django.contrib.auth.models import User
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework import status
-from .models import Category, Follow, Like, Post, SubCategory, Wardrobe, Outfit, OutfitPlanner, UserProfile
-from .serializers import PostSerializer, SubCategorySerializer, WardrobeSerializer, OutfitSerializer, OutfitPlannerSerializer, UserProfileSerializer
+from .models import Category, Follow, FollowSuggestion, Job, Post, SubCategory, UploadSession, Wardrobe, WardrobeTag, Outfit, OutfitPlanner, UserProfile
+from .serializers import FollowSuggestionSerializer, PostSerializer, WardrobeSerializer, WardrobeBatchItemSerializer, OutfitSerializer, OutfitPlannerSerializer, UserProfileSerializer
+from .pagination import InvalidCursor, paginate_keyset
+from .fieldsets import Shape, planned_queryset, shaped_list
+from .bootstrap import build_bootstrap
+from .sync import InvalidSyncToken, SyncTokenExpired, changes_since
+from .storage import CAS_PREFIX
+from .uploads import UploadError, chunk_position, claim_uploads, complete_session, create_session, missing_ranges, write_chunk
+from .exports import EXPORT_FORMATS, streaming_export, streaming_ics
+from . import jobs, outfit_engine
+from .images import cleared_derivatives, schedule_derivatives
+from .tags import normalize_tags, sync_wardrobe_tags
+from .taxonomy import get_taxonomy, taxonomy_with
+from .versions import bump_version, etag_from_user_version
+from .authentication import cache_stats
+from .accounts import duplicate_identifier_field, find_user_by_identifier
+from .similarity import get_index, schedule_embedding, schedule_publish
+from .counters import adjust_profile, likes_count, profile_counts
+from .social import toggle_like, toggle_follow as toggle_follow_rows
+from .timeline import backfill_followee, fan_out_post, following_feed_page, remove_followee
+from django.conf import settings
 from django.contrib.auth import authenticate, login
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
 from django.http import JsonResponse
+from django.urls import reverse
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags
+from django.views.decorators.gzip import gzip_page
+from django.views.static import serve
+from datetime import datetime
+import calendar
+import os
 import json
 import re
 from rest_framework.authtoken.models import Token
@@ -22,6 +53,12 @@ def is_complex_password(password):
         re.search(r"[!@#$%^&*(),.?\":{}|<>]", password)
     )
 
+# ✅ Serve content-addressed media (a name's content never changes, so it is cached for good)
+def serve_media_blob(request, path):
+    response = serve(request, path, document_root=os.path.join(settings.MEDIA_ROOT, CAS_PREFIX))
+    response['Cache-Control'] = f'public, max-age={settings.MEDIA_BLOB_MAX_AGE}, immutable'
+    return response
+
 # ✅ Register a new user
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -39,15 +76,16 @@ def register_user(request):
     if not is_complex_password(password):
         return Response({'error': 'Password must contain uppercase, number, symbol and be at least 6 characters'}, status=status.HTTP_400_BAD_REQUEST)
 
-    if User.objects.filter(username__iexact=username).exists():
+    # Case-insensitive uniqueness is enforced by the database (see accounts.py)
+    try:
+        with transaction.atomic():
+            user = User.objects.create_user(username=username, email=email, password=password)
+            UserProfile.objects.create(user=user)  # Create associated profile
+            token, _ = Token.objects.get_or_create(user=user)
+    except IntegrityError as e:
+        if duplicate_identifier_field(e) == 'email':
+            return Response({'error': 'Email already registered'}, status=status.HTTP_400_BAD_REQUEST)
         return Response({'error': 'Username already exists'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    if User.objects.filter(email=email).exists():
-        return Response({'error': 'Email already registered'}, status=status.HTTP_400_BAD_REQUEST)
-
-    user = User.objects.create_user(username=username, email=email, password=password)
-    UserProfile.objects.create(user=user)  # Create associated profile
-    token, _ = Token.objects.get_or_create(user=user)
 
     return Response({'message': 'User registered successfully', 'token': token.key, 'user_id': user.id}, status=status.HTTP_201_CREATED)
 
@@ -62,19 +100,11 @@ def login_user(request):
     if not identifier or not password:
         return Response({'error': 'Email/Username and password are required'}, status=status.HTTP_400_BAD_REQUEST)
 
-    identifier = identifier.strip()
+    user_obj = find_user_by_identifier(identifier)
+    if user_obj is None:
+        return Response({'error': 'No account found with that email or username'}, status=status.HTTP_404_NOT_FOUND)
 
-    try:
-        user_obj = User.objects.get(email__iexact=identifier)
-        username = user_obj.username
-    except User.DoesNotExist:
-        try:
-            user_obj = User.objects.get(username__iexact=identifier)
-            username = user_obj.username
-        except User.DoesNotExist:
-            return Response({'error': 'No account found with that email or username'}, status=status.HTTP_404_NOT_FOUND)
-
-    user = authenticate(username=username, password=password)
+    user = authenticate(username=user_obj.username, password=password)
     if user:
         token, _ = Token.objects.get_or_create(user=user)
         return Response({'message': 'Login successful', 'token': token.key, 'user_id': user.id}, status=status.HTTP_200_OK)
@@ -82,6 +112,21 @@ def login_user(request):
         return Response({'error': 'Incorrect password'}, status=status.HTTP_401_UNAUTHORIZED)
 
 
+# ✅ Logout (deletes the token everywhere at once)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout_user(request):
+    Token.objects.filter(user=request.user).delete()
+    return Response({'message': 'Logged out successfully'}, status=status.HTTP_200_OK)
+
+
+# ✅ Token cache statistics for this worker (admins only)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_auth_cache_stats(request):
+    return Response(cache_stats())
+
+
 # ✅ Get profile for logged-in user
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -105,17 +150,143 @@ def update_user_profile(request):
         profile.location = request.data.get('location', profile.location)
         profile.gender = request.data.get('gender', profile.gender)
         profile.modesty_preference = request.data.get('modesty_preference', profile.modesty_preference)
-        # ✅ Handle profile picture if included
+        # ✅ Handle profile picture if included (as a file part or a completed upload's id)
         if 'profile_picture' in request.FILES:
             profile.profile_picture = request.FILES['profile_picture']
 
-        profile.save()
+        with transaction.atomic():
+            files = claim_uploads(request, ['profile_picture'])
+            if files:
+                profile.profile_picture = files['profile_picture']
+            if 'profile_picture' in request.FILES or files:
+                for name, value in cleared_derivatives('profile_picture').items():
+                    setattr(profile, name, value)
+            profile.save()
+        if 'profile_picture' in request.FILES or files:
+            schedule_derivatives(profile, 'profile_picture')
         serializer = UserProfileSerializer(profile)
         return Response(serializer.data)
+    except UploadError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         print("Error:", str(e))
         return Response({'error': 'Something went wrong'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+# ✅ App bootstrap (everything the app loads on launch, gzip-compressed)
+@gzip_page
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_bootstrap(request):
+    """Returns the user, profile, wardrobe, outfits, recent plans and taxonomy in one normalized payload"""
+    return Response(build_bootstrap(request.user))
+
+# ✅ Background Jobs (queued work the client polls for, see jobs.py)
+def prefers_async(request):
+    return 'respond-async' in request.headers.get('Prefer', '')
+
+def job_data(request, job):
+    return {
+        'id': job.id,
+        'task': job.task,
+        'status': job.status,
+        'attempts': job.attempts,
+        'result': job.result,
+        'error': job.error or None,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'status_url': request.build_absolute_uri(reverse('get_job', args=[job.id])),
+    }
+
+def job_accepted(request, job):
+    data = job_data(request, job)
+    return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': data['status_url']})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_job(request, job_id):
+    """Status of a queued job; `result` is set once it has succeeded"""
+    job = Job.objects.filter(id=job_id, user=request.user).first()
+    if job is None:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job_data(request, job))
+
+# ✅ Resumable Uploads (start a session, PUT chunks in any order, complete, then attach by id)
+def upload_session_data(session):
+    return {
+        'id': str(session.pk),
+        'filename': session.filename,
+        'size': session.size,
+        'status': session.status,
+        'received': session.received,
+        'missing': missing_ranges(session),
+        'max_chunk_size': settings.UPLOAD_CHUNK_MAX_SIZE,
+        'expires_at': session.expires_at,
+    }
+
+def get_upload_session(request, upload_id):
+    return UploadSession.objects.filter(pk=upload_id, user=request.user, expires_at__gt=timezone.now()).first()
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_upload(request):
+    """Starts an upload of `size` bytes named `filename`; `sha256` can be sent now or on completion"""
+    try:
+        size = int(request.data.get('size', 0))
+        session = create_session(request.user, str(request.data.get('filename', '')), size, str(request.data.get('sha256', '')))
+    except (TypeError, ValueError):
+        return Response({'error': 'size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    except UploadError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(upload_session_data(session), status=status.HTTP_201_CREATED)
+
+@api_view(['GET', 'PUT'])
+@permission_classes([IsAuthenticated])
+def upload_session(request, upload_id):
+    """
+    GET reports the received and missing byte ranges, for resuming.
+    PUT writes the raw request body at `Content-Range: bytes first-last/total` (or ?offset=).
+    """
+    session = get_upload_session(request, upload_id)
+    if session is None:
+        return Response({'error': 'Upload not found or expired'}, status=status.HTTP_404_NOT_FOUND)
+    if request.method == 'PUT':
+        try:
+            offset, length = chunk_position(request)
+            session = write_chunk(session, offset, length, request.stream)
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(upload_session_data(session))
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def complete_upload(request, upload_id):
+    """Checks that every byte arrived and matches `sha256`, then stores the file for attaching"""
+    session = get_upload_session(request, upload_id)
+    if session is None:
+        return Response({'error': 'Upload not found or expired'}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        with transaction.atomic():
+            session = complete_session(session, str(request.data.get('sha256', '')))
+    except UploadError as e:
+        return Response({'error': str(e), **upload_session_data(session)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({**upload_session_data(session), 'url': session.file.url})
+
+# ✅ Delta sync (rows changed or deleted since the last sync)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync_changes(request):
+    """
+    Returns wardrobe items, outfits and plans changed since ?since=<token>, the ids
+    deleted since then, and the token for the next call. Without ?since= every row
+    is returned. Tokens older than the tombstone retention get 410: resync in full.
+    """
+    try:
+        return Response(changes_since(request.user, request.query_params.get('since')))
+    except InvalidSyncToken:
+        return Response({'error': 'Invalid sync token'}, status=status.HTTP_400_BAD_REQUEST)
+    except SyncTokenExpired:
+        return Response({'error': 'Sync token expired, resync in full', 'resync': True}, status=status.HTTP_410_GONE)
+
 # ✅ Upload Clothing Item (User can add clothes)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -123,19 +294,149 @@ def upload_clothing(request):
     """Uploads clothing to the user's wardrobe"""
     serializer = WardrobeSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save(user=request.user)  # Associate with the logged-in user
+        try:
+            with transaction.atomic():
+                # photo_path_upload_id attaches a completed resumable upload instead of a file part
+                item = serializer.save(user=request.user, **claim_uploads(request, ['photo_path']))
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        schedule_derivatives(item, 'photo_path')
+        schedule_embedding(item)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+# ✅ Batch Upload Clothing Items
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_clothing_batch(request):
+    """
+    Uploads many clothing items in one request. `items` is a JSON list of item
+    fields; the photo for items[i] is sent as the file `photo_<i>`.
+    Valid items are bulk-inserted, invalid ones are reported by index.
+    """
+    items = request.data.get('items')
+    if isinstance(items, str):
+        try:
+            items = json.loads(items)
+        except ValueError:
+            return Response({'error': 'items must be a JSON list'}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(items, list) or not items:
+        return Response({'error': 'items must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > settings.WARDROBE_BATCH_MAX_ITEMS:
+        return Response({'error': f'At most {settings.WARDROBE_BATCH_MAX_ITEMS} items per batch'}, status=status.HTTP_400_BAD_REQUEST)
+
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'errors': {'non_field_errors': ['Expected an object']}})
+            continue
+        data = dict(item)
+        if f'photo_{index}' in request.FILES:
+            data['photo_path'] = request.FILES[f'photo_{index}']
+        serializer = WardrobeBatchItemSerializer(data=data)
+        if serializer.is_valid():
+            valid.append((index, Wardrobe(user=request.user, **serializer.validated_data)))
+        else:
+            errors.append({'index': index, 'errors': serializer.errors})
+
+    Wardrobe.objects.bulk_create([wardrobe_item for _, wardrobe_item in valid])
+    # bulk_create skips post_save, so do the signal handlers' work by hand
+    bump_version(request.user.id)
+    sync_wardrobe_tags([wardrobe_item for _, wardrobe_item in valid])
+    created = []
+    for index, wardrobe_item in valid:
+        schedule_derivatives(wardrobe_item, 'photo_path')
+        schedule_embedding(wardrobe_item)
+        created.append({'index': index, **WardrobeSerializer(wardrobe_item).data})
+
+    response_status = status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+    return Response({'created': created, 'errors': errors}, status=response_status)
+
 # ✅ Get All Wardrobe Items (User's Clothes)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@etag_from_user_version
 def get_wardrobe(request):
-    """Retrieves all wardrobe items for the logged-in user"""
-    items = Wardrobe.objects.filter(user=request.user)
-    serializer = WardrobeSerializer(items, many=True)
+    """Retrieves all wardrobe items for the logged-in user; supports ?fields= and ?expand="""
+    serializer = shaped_list(WardrobeSerializer, request, Wardrobe.objects.filter(user=request.user))
     return Response(serializer.data)
 
+# ✅ Export Wardrobe (streamed NDJSON or CSV)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_wardrobe(request):
+    """Streams every wardrobe item of the logged-in user as ?output=ndjson (default) or csv"""
+    export_format = request.query_params.get('output', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return Response({'error': 'output must be ndjson or csv'}, status=status.HTTP_400_BAD_REQUEST)
+    items = Wardrobe.objects.filter(user=request.user).order_by('id')
+    return streaming_export(items, WardrobeSerializer, export_format, 'wardrobe')
+
+# ✅ Search Wardrobe by Facets
+WARDROBE_FACETS = {
+    'category': 'category_id',
+    'subcategory': 'subcategory_id',
+    'season': 'season',
+    'color': 'color',
+    'material': 'material',
+    'size': 'size',
+}
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@etag_from_user_version
+def search_wardrobe(request):
+    """
+    Filters the user's wardrobe by facets and returns matching items plus facet counts.
+    Each facet takes comma-separated values (OR within a facet); facets are combined
+    with ?mode=and (default) or ?mode=or. ?tags= matches all listed tags, or any
+    of them with ?tags_mode=any.
+    """
+    mode = request.query_params.get('mode', 'and')
+    tags_mode = request.query_params.get('tags_mode', 'all')
+    if mode not in ('and', 'or') or tags_mode not in ('all', 'any'):
+        return Response({'error': 'mode must be and/or and tags_mode must be all/any'}, status=status.HTTP_400_BAD_REQUEST)
+
+    conditions = []
+    for param, field in WARDROBE_FACETS.items():
+        values = [value.strip() for value in request.query_params.get(param, '').split(',') if value.strip()]
+        if not values:
+            continue
+        if field.endswith('_id') and not all(value.isdigit() for value in values):
+            return Response({'error': f'{param} must be a list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+        conditions.append(Q(**{f'{field}__in': values}))
+
+    tags = normalize_tags(request.query_params.get('tags'))
+    if tags:
+        links = WardrobeTag.objects.filter(user=request.user, tag__name__in=tags).values('wardrobe_id')
+        if tags_mode == 'all':
+            links = links.annotate(matched=Count('tag_id')).filter(matched=len(tags))
+        conditions.append(Q(id__in=links.values('wardrobe_id')))
+
+    items = Wardrobe.objects.filter(user=request.user)
+    if conditions:
+        combined = conditions[0]
+        for condition in conditions[1:]:
+            combined = combined & condition if mode == 'and' else combined | condition
+        items = items.filter(combined)
+
+    facets = {
+        param: {
+            row[field]: row['count']
+            for row in items.order_by().values(field).annotate(count=Count('id')).order_by('-count')
+            if row[field] is not None
+        }
+        for param, field in WARDROBE_FACETS.items()
+    }
+    facets['tags'] = {
+        row['tag__name']: row['count']
+        for row in WardrobeTag.objects.filter(user=request.user, wardrobe__in=items.values('id'))
+        .values('tag__name').annotate(count=Count('id')).order_by('-count')
+    }
+
+    serializer = shaped_list(WardrobeSerializer, request, items)
+    return Response({'count': len(serializer.data), 'results': serializer.data, 'facets': facets})
+
 # ✅ Update Clothing Item
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
@@ -145,21 +446,71 @@ def update_clothing(request, item_id):
         item = Wardrobe.objects.get(id=item_id, user=request.user)
         serializer = WardrobeSerializer(instance=item, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            try:
+                with transaction.atomic():
+                    files = claim_uploads(request, ['photo_path'])
+                    if 'photo_path' in request.FILES or files:
+                        files.update(cleared_derivatives('photo_path'))
+                    item = serializer.save(**files)
+            except UploadError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if 'photo_path' in request.FILES or files:
+                schedule_derivatives(item, 'photo_path')
+                schedule_embedding(item)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     except Wardrobe.DoesNotExist:
         return Response({'error': 'Clothing item not found'}, status=status.HTTP_404_NOT_FOUND)
+
+# ✅ Find Similar Wardrobe Items
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_similar_items(request, item_id):
+    """
+    Returns wardrobe items that look like the given one, ranked by image similarity.
+    ?scope=own (default) searches the user's wardrobe, ?scope=public searches items in posted outfits.
+    """
+    scope = request.query_params.get('scope', 'own')
+    if scope not in ('own', 'public'):
+        return Response({'error': 'scope must be own or public'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        k = max(1, min(int(request.query_params.get('k', 10)), settings.SIMILARITY_MAX_RESULTS))
+    except ValueError:
+        return Response({'error': 'k must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    public_items = Wardrobe.objects.filter(outfit_items__posts__isnull=False)
+    if not Wardrobe.objects.filter(Q(user=request.user) | Q(id__in=public_items), id=item_id).exists():
+        return Response({'error': 'Clothing item not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    index = get_index()
+    vector = index.vector_for(item_id)
+    if vector is None:
+        return Response({'error': 'Item has no indexed photo yet'}, status=status.HTTP_404_NOT_FOUND)
+
+    if scope == 'own':
+        matches = index.search(vector, k, owner_id=request.user.id, exclude_id=item_id)
+        items = Wardrobe.objects.filter(user=request.user)
+    else:
+        matches = index.search(vector, k, public_only=True, exclude_id=item_id)
+        # The index flag can lag behind deleted posts; the database has the final say
+        items = public_items
+    serializer = WardrobeSerializer(many=True, shape=Shape.from_request(request))
+    found = planned_queryset(items, serializer).filter(id__in=[pk for pk, _ in matches]).in_bulk()
+
+    matches = [(pk, score) for pk, score in matches if pk in found]
+    serializer.instance = [found[pk] for pk, _ in matches]
+    return Response([{**item, 'score': round(score, 4)} for item, (_, score) in zip(serializer.data, matches)])
+
     # ✨ NEW: Get Wardrobe Items by SubCategory ✨
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_wardrobe_by_subcategory(request, subcategory_id):
     """Retrieves wardrobe items for the logged-in user filtered by subcategory"""
+    items = Wardrobe.objects.filter(user=request.user, subcategory_id=subcategory_id)
+    serializer = shaped_list(WardrobeSerializer, request, items)
     try:
-        # Check if subcategory exists (optional, but good practice)
-        subcategory = SubCategory.objects.get(id=subcategory_id)
-        items = Wardrobe.objects.filter(user=request.user, subcategory_id=subcategory_id)
-        serializer = WardrobeSerializer(items, many=True)
+        if subcategory_id not in taxonomy_with('subcategories', subcategory_id).subcategories:
+            raise SubCategory.DoesNotExist
         return Response(serializer.data)
     except SubCategory.DoesNotExist:
         return Response({"error": "SubCategory not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -171,17 +522,30 @@ def get_wardrobe_by_subcategory(request, subcategory_id):
 def get_subcategories_by_category(request, category_id):
     """Retrieves all subcategories belonging to a specific category"""
     try:
-        # Ensure the category exists
-        category = Category.objects.get(id=category_id)
-        subcategories = SubCategory.objects.filter(category_id=category_id)
-        serializer = SubCategorySerializer(subcategories, many=True)
-        return Response(serializer.data)
+        taxonomy = taxonomy_with('categories', category_id)
+        if category_id not in taxonomy.categories:
+            raise Category.DoesNotExist
+        return Response(taxonomy.subcategories_of(category_id))
     except Category.DoesNotExist:
         return Response({"error": "Category not found"}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         print(f"Error in get_subcategories_by_category: {e}")
         return Response({"error": "An internal error occurred"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+# ✅ Full Category Tree (served from the taxonomy cache)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_category_tree(request):
+    """Returns every category with its subcategories; clients may cache it for a day"""
+    taxonomy = get_taxonomy()
+    if taxonomy.etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(taxonomy.tree)
+    response['ETag'] = taxonomy.etag
+    response['Cache-Control'] = f'public, max-age={settings.TAXONOMY_MAX_AGE}'
+    return response
+
 # ✅ Create an Outfit (User Selects Clothes)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -189,26 +553,55 @@ def create_outfit(request):
     """Allows users to create outfits manually by selecting items from their wardrobe"""
     serializer = OutfitSerializer(data=request.data)
     if serializer.is_valid():
-        outfit = serializer.save(user=request.user)  # Associate with the user
+        try:
+            with transaction.atomic():
+                outfit = serializer.save(user=request.user, **claim_uploads(request, ['photo_path']))
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        schedule_derivatives(outfit, 'photo_path')
         return Response(OutfitSerializer(outfit).data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # ✅ Get All Outfits (User's Saved Outfits)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@etag_from_user_version
 def get_outfits(request):
-    """Retrieves all outfits for the logged-in user"""
-    outfits = Outfit.objects.filter(user=request.user)
-    serializer = OutfitSerializer(outfits, many=True)
+    """Retrieves all outfits for the logged-in user; supports ?fields= and ?expand="""
+    serializer = shaped_list(OutfitSerializer, request, Outfit.objects.filter(user=request.user))
     return Response(serializer.data)
 
-# ✅ AI Generates an Outfit (Basic API Placeholder)
+# ✅ Export Outfits (streamed NDJSON or CSV)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_outfits(request):
+    """Streams every outfit of the logged-in user as ?output=ndjson (default) or csv"""
+    export_format = request.query_params.get('output', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return Response({'error': 'output must be ndjson or csv'}, status=status.HTTP_400_BAD_REQUEST)
+    outfits = Outfit.objects.filter(user=request.user).order_by('id').prefetch_related('selected_items')
+    return streaming_export(outfits, OutfitSerializer, export_format, 'outfits')
+
+# ✅ AI Generates an Outfit
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def ai_generate_outfit(request):
-    """Allows AI to generate a full outfit (Placeholder API)"""
-    # TODO: Integrate AI model (TensorFlow, OpenCV, or pre-trained API)
-    return Response({'message': 'AI outfit generation coming soon!'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+    """
+    Builds and saves an outfit from the user's wardrobe, one item per category.
+    With `Prefer: respond-async` the work is queued and 202 points at the job to poll.
+    """
+    season = request.data.get('season')
+    if season is not None and season not in outfit_engine.SEASONS:
+        return Response({'error': f"season must be one of {', '.join(outfit_engine.SEASONS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if prefers_async(request):
+        job = jobs.enqueue('generate_outfit', {'user_id': request.user.id, 'season': season}, user=request.user, priority=10)
+        return job_accepted(request, job)
+    try:
+        outfit, score = outfit_engine.create_outfit_for(request.user.id, season)
+    except outfit_engine.NotEnoughItems as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({**OutfitSerializer(outfit).data, 'score': round(score, 3)}, status=status.HTTP_201_CREATED)
 
 # ✅ Plan an Outfit for a Date
 @api_view(['POST'])
@@ -221,15 +614,95 @@ def plan_outfit(request):
         return Response(OutfitPlannerSerializer(plan).data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def planned_outfits_in_window(request):
+    """The user's plans limited by optional ?from= and ?to= dates (inclusive), or an error message"""
+    plans = OutfitPlanner.objects.filter(user=request.user)
+    for param, lookup in (('from', 'date__gte'), ('to', 'date__lte')):
+        value = request.query_params.get(param)
+        if not value:
+            continue
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            return None, f'{param} must be a date in YYYY-MM-DD format'
+        plans = plans.filter(**{lookup: day})
+    return plans, None
+
+
+def month_window(value):
+    """First and last day of a YYYY-MM month, or None"""
+    try:
+        first = datetime.strptime(value, '%Y-%m').date()
+    except (TypeError, ValueError):
+        return None
+    return first, first.replace(day=calendar.monthrange(first.year, first.month)[1])
+
+
+def planner_month(user, first, last):
+    rows = list(
+        OutfitPlanner.objects.filter(user=user, date__range=(first, last))
+        .order_by('date', 'id')
+        .values('id', 'date', 'outfit_id', 'outfit__photo_path_thumb')
+    )
+    # Outfits without a photo of their own borrow the first item's thumbnail
+    fallback = {}
+    missing = {row['outfit_id'] for row in rows if not row['outfit__photo_path_thumb']}
+    if missing:
+        links = (
+            Outfit.selected_items.through.objects.filter(outfit_id__in=missing)
+            .exclude(wardrobe__photo_path_thumb__isnull=True).exclude(wardrobe__photo_path_thumb='')
+            .order_by('id').values_list('outfit_id', 'wardrobe__photo_path_thumb')
+        )
+        for outfit_id, thumb in links:
+            fallback.setdefault(outfit_id, thumb)
+
+    days = {}
+    for row in rows:
+        thumb = row['outfit__photo_path_thumb'] or fallback.get(row['outfit_id'])
+        days.setdefault(row['date'].isoformat(), []).append({
+            'plan_id': row['id'],
+            'outfit_id': row['outfit_id'],
+            'thumbnail': default_storage.url(thumb) if thumb else None,
+        })
+    return {'month': first.strftime('%Y-%m'), 'days': days}
+
+
 # ✅ Get All Planned Outfits (User's Calendar)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@etag_from_user_version
 def get_planned_outfits(request):
-    """Retrieves all planned outfits for the logged-in user"""
-    plans = OutfitPlanner.objects.filter(user=request.user)
-    serializer = OutfitPlannerSerializer(plans, many=True)
+    """
+    Retrieves planned outfits for the logged-in user, optionally between ?from= and ?to=.
+    ?month=YYYY-MM returns a compact calendar instead: outfit ids and thumbnails per day.
+    The full list supports ?fields= and ?expand=.
+    """
+    if 'month' in request.query_params:
+        window = month_window(request.query_params['month'])
+        if window is None:
+            return Response({'error': 'month must be in YYYY-MM format'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(planner_month(request.user, *window))
+
+    plans, error = planned_outfits_in_window(request)
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = shaped_list(OutfitPlannerSerializer, request, plans.order_by('date', 'id'))
     return Response(serializer.data)
 
+
+# ✅ Export Planned Outfits (streamed iCalendar)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_planned_outfits_ics(request):
+    """Streams the user's plans, optionally between ?from= and ?to=, as all-day iCalendar events"""
+    plans, error = planned_outfits_in_window(request)
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    plans = plans.order_by('date', 'id').values('id', 'date', 'outfit_id', 'outfit__type', 'outfit__description')
+    return streaming_ics(plans, 'outfit-plans')
+
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def delete_planned_outfit(request, plan_id):
@@ -262,17 +735,24 @@ def create_post(request):
 
     try:
         outfit = Outfit.objects.get(id=outfit_id, user=request.user)
-        post = Post.objects.create(user=request.user, outfit=outfit, caption=caption)
+        with transaction.atomic():
+            post = Post.objects.create(user=request.user, outfit=outfit, caption=caption)
+            adjust_profile(request.user.id, 'posts_count', 1)
+        fan_out_post(post)
+        schedule_publish(outfit.selected_items.values_list('id', flat=True))
         return Response(PostSerializer(post).data, status=status.HTTP_201_CREATED)
     except Outfit.DoesNotExist:
         return Response({'error': 'Outfit not found or not owned by user'}, status=status.HTTP_404_NOT_FOUND)
 
 @api_view(['GET'])
 def get_all_posts(request):
-    """Retrieve all posts from all users (public feed)"""
-    posts = Post.objects.all().order_by('-created_at')
-    serializer = PostSerializer(posts, many=True)
-    return Response(serializer.data)
+    """Retrieve posts from all users (public feed), newest first, one cursor page at a time"""
+    serializer = shaped_list(PostSerializer, request, Post.objects.all(), 'created_at')
+    try:
+        serializer.instance, next_cursor = paginate_keyset(serializer.instance, request)
+    except InvalidCursor:
+        return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'results': serializer.data, 'next_cursor': next_cursor})
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -280,11 +760,11 @@ def toggle_like_post(request, post_id):
     """Like or unlike a post"""
     try:
         post = Post.objects.get(id=post_id)
-        like, created = Like.objects.get_or_create(user=request.user, post=post)
+        created = toggle_like(request.user.id, post.id)
+
         if not created:
-            like.delete()
-            return Response({'message': 'Unliked post'}, status=status.HTTP_200_OK)
-        return Response({'message': 'Liked post'}, status=status.HTTP_201_CREATED)
+            return Response({'message': 'Unliked post', 'likes_count': likes_count(post.id)}, status=status.HTTP_200_OK)
+        return Response({'message': 'Liked post', 'likes_count': likes_count(post.id)}, status=status.HTTP_201_CREATED)
     except Post.DoesNotExist:
         return Response({'error': 'Post not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -297,19 +777,45 @@ def toggle_follow(request, user_id):
         if request.user == to_follow:
             return Response({'error': 'Cannot follow yourself'}, status=status.HTTP_400_BAD_REQUEST)
 
-        follow, created = Follow.objects.get_or_create(follower=request.user, following=to_follow)
+        created = toggle_follow_rows(request.user.id, to_follow.id)
+
+        counts = {
+            'followers_count': profile_counts(to_follow.id)['followers_count'],
+            'following_count': profile_counts(request.user.id)['following_count'],
+        }
         if not created:
-            follow.delete()
-            return Response({'message': 'Unfollowed user'}, status=status.HTTP_200_OK)
-        return Response({'message': 'Followed user'}, status=status.HTTP_201_CREATED)
+            remove_followee(request.user.id, to_follow.id)
+            return Response({'message': 'Unfollowed user', **counts}, status=status.HTTP_200_OK)
+        backfill_followee(request.user.id, to_follow.id)
+        return Response({'message': 'Followed user', **counts}, status=status.HTTP_201_CREATED)
     except User.DoesNotExist:
         return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_following_feed(request):
-    """Get posts only from followed users"""
-    following_users = Follow.objects.filter(follower=request.user).values_list('following_id', flat=True)
-    posts = Post.objects.filter(user_id__in=following_users).order_by('-created_at')
-    serializer = PostSerializer(posts, many=True)
-    return Response(serializer.data)
+    """Get posts only from followed users, read from the precomputed timeline"""
+    serializer = shaped_list(PostSerializer, request, Post.objects.all())
+    try:
+        serializer.instance, next_cursor = following_feed_page(request.user, request, serializer.instance)
+    except InvalidCursor:
+        return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'results': serializer.data, 'next_cursor': next_cursor})
+
+# ✅ Who to Follow (precomputed by build_follow_suggestions)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_follow_suggestions(request):
+    """Accounts the user may want to follow, best first; ?limit= (default 10, at most FOLLOW_SUGGESTIONS_TOP_K)"""
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), settings.FOLLOW_SUGGESTIONS_TOP_K)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    suggestions = (
+        FollowSuggestion.objects.filter(user=request.user)
+        # Follows made since the last build
+        .exclude(suggested__in=Follow.objects.filter(follower=request.user).values('following'))
+        .select_related('suggested', 'suggested__profile')
+        .order_by('-score', 'suggested_id')[:limit]
+    )
+    return Response(FollowSuggestionSerializer(suggestions, many=True).data)
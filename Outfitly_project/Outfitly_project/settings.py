@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -93,6 +94,31 @@ DATABASES = {
 }
 
 
+# Cache
+# ETag version stamps, token revocation stamps, the taxonomy version and the
+# outfit engine's features must be seen by every worker process, so the default
+# cache is shared: Redis when REDIS_URL is set, otherwise a database table
+# (create it with manage.py createcachetable). Process-local backends fail the
+# Outfitly_app.E001 system check. Production needs Redis: with the database
+# table every ETag check costs a query, so 304s are not query-free
+# (Outfitly_app.W001).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'outfitly_cache',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -174,7 +200,7 @@ CORS_ALLOW_ALL_ORIGINS = True  # Allow all for dev, restrict in prod
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'Outfitly_app.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -183,3 +209,86 @@ REST_FRAMEWORK = {
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Feed pagination (cursor-based, newest first)
+FEED_PAGE_SIZE = 20
+FEED_MAX_PAGE_SIZE = 100
+
+# Following feed timelines (fan-out on write)
+TIMELINE_MAX_LENGTH = 800  # entries kept per user; rebuild_timelines --trim sweeps every timeline
+TIMELINE_TRIM_SAMPLE = 0.05  # share of fan-out recipients whose timeline is checked and trimmed per post
+TIMELINE_BACKFILL_LENGTH = 50  # recent posts copied in when following someone
+TIMELINE_FANOUT_LIMIT = 5000  # authors with more followers are merged at read time
+TIMELINE_FANOUT_BATCH_SIZE = 1000
+
+# Image derivatives (thumb/medium WebP renditions built off the request thread)
+IMAGE_DERIVATIVE_WORKERS = 2
+IMAGE_DERIVATIVE_QUALITY = 80
+
+# Streaming exports
+EXPORT_CHUNK_SIZE = 500
+
+# Batch wardrobe uploads
+WARDROBE_BATCH_MAX_ITEMS = 200
+
+# AI outfit engine
+OUTFIT_ENGINE_BEAM_WIDTH = 256
+OUTFIT_ENGINE_MAX_CANDIDATES_PER_SLOT = 300
+OUTFIT_ENGINE_CACHE_TTL = 60 * 60 * 24  # feature matrices are keyed on the user's data version, so writes replace them
+
+# Visual similarity index (memory-mapped embeddings)
+SIMILARITY_INDEX_DIR = BASE_DIR / 'similarity_index'
+SIMILARITY_MAX_RESULTS = 50
+SIMILARITY_CLUSTERS = 1024  # coarse centroids, trained by build_similarity_index --train
+SIMILARITY_NPROBE = 16  # clusters scanned per cross-wardrobe query
+
+# Category/SubCategory cache
+TAXONOMY_CACHE_ALIAS = 'default'  # a shared cache (checked), so edits reach every worker
+TAXONOMY_CHECK_INTERVAL = 5  # seconds between shared version checks
+TAXONOMY_TTL = 300  # seconds before a worker reloads its copy even without a version change
+TAXONOMY_MAX_AGE = 60 * 60 * 24  # Cache-Control max-age of the category tree
+
+# Cached token authentication
+AUTH_TOKEN_CACHE_SIZE = 10000  # tokens kept per worker (LRU)
+AUTH_TOKEN_CACHE_TTL = 300  # seconds before a cached lookup is re-read from the database
+AUTH_TOKEN_REVOCATION_CACHE = 'default'  # a shared cache (checked), so revocation reaches every worker
+AUTH_TOKEN_REVOCATION_CHECK_INTERVAL = 5  # seconds between a worker's stamp checks per token; 0 checks every request
+
+# Async feed/social views (run under ASGI: Outfitly_project/asgi.py)
+OUTFITLY_ASYNC_VIEWS = False
+
+# App bootstrap endpoint
+BOOTSTRAP_WORKERS = 4  # threads (and database connections) per process for its concurrent queries
+BOOTSTRAP_PLAN_HISTORY_DAYS = 30  # past plans included; upcoming ones are always included
+
+# Delta sync
+SYNC_TOMBSTONE_RETENTION_DAYS = 30  # older sync tokens must resync in full; prune_tombstones deletes older rows
+SYNC_OVERLAP_SECONDS = 5  # tokens start this far back so rows from in-flight transactions are not missed
+
+# Content-addressed media: each upload is stored once per content and reference-counted
+STORAGES = {
+    'default': {'BACKEND': 'Outfitly_app.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+MEDIA_BLOB_MAX_AGE = 60 * 60 * 24 * 365  # Cache-Control max-age of /media/cas/ files
+
+# Resumable chunked uploads
+UPLOAD_SESSION_DIR = BASE_DIR / 'upload_sessions'  # part files while uploads are in progress
+UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+UPLOAD_CHUNK_MAX_SIZE = 8 * 1024 * 1024
+UPLOAD_SESSION_TTL = 60 * 60 * 24  # seconds; prune_uploads removes expired sessions
+
+# Background jobs (jobs.py; run workers with manage.py run_worker)
+JOB_WORKERS = 2
+JOB_POLL_INTERVAL = 1.0  # seconds an idle worker waits before looking again
+JOB_LEASE_SECONDS = 600  # a job running longer is assumed orphaned and queued again
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BACKOFF_SECONDS = 10  # doubled per attempt, with jitter
+JOB_RETRY_BACKOFF_MAX = 60 * 60
+JOB_RETENTION_DAYS = 7  # finished jobs are deleted after this
+
+# Follow suggestions (suggestions.py; rebuilt by manage.py build_follow_suggestions)
+FOLLOW_SUGGESTIONS_TOP_K = 20
+FOLLOW_SUGGESTIONS_LIKE_WEIGHT = 0.5  # a shared like on a post with one other liker, relative to a mutual follow
+FOLLOW_SUGGESTIONS_MAX_POST_LIKERS = 1000  # posts liked by more users are ignored for co-liker pairs
+FOLLOW_SUGGESTIONS_BATCH_PAIRS = 5_000_000  # candidate pairs scored per batch; bounds memory
@@ -16,9 +16,11 @@ Including another URLconf
 """
 from django.http import JsonResponse
 from django.contrib import admin
-from django.urls import path,include
+from django.urls import path,include,re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from Outfitly_app.storage import CAS_PREFIX
+from Outfitly_app.views import serve_media_blob
 
 def home_view(request):
     return JsonResponse({"message": "Welcome to Outfitly API!"})
@@ -27,6 +29,8 @@ urlpatterns = [
     path('', home_view), 
     path('admin/', admin.site.urls),
     path('api/', include('Outfitly_app.urls')),
+    # Content-addressed uploads, with immutable cache headers (a front server should add the same)
+    re_path(r'^%s%s/(?P<path>.+)$' % (settings.MEDIA_URL.lstrip('/'), CAS_PREFIX), serve_media_blob),
 ]
 
 if settings.DEBUG: